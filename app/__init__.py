@@ -19,9 +19,10 @@ def create_app(test_config=None):
     from . import db
     db.init_app(app)
 
-    # Initialize Database
-    from . import db
-    db.init_app(app)
+    # Keep session data server-side; the cookie only carries the session id
+    if app.config.get('SESSION_BACKEND', 'sqlite') == 'sqlite':
+        from .services.session_store import SQLiteSessionInterface
+        app.session_interface = SQLiteSessionInterface()
     
     # Register Blueprints
     from .routes import auth, dashboard, interview, api
@@ -30,4 +31,9 @@ def create_app(test_config=None):
     app.register_blueprint(interview.bp)
     app.register_blueprint(api.bp)
 
+    # Warm up the shared Whisper pool so the first /interact doesn't load models
+    if app.config.get('WHISPER_WARMUP') and not app.config.get('TESTING'):
+        from .services.transcription_service import warm_up_in_background
+        warm_up_in_background(app.config)
+
     return app
\ No newline at end of file
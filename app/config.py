@@ -6,16 +6,35 @@ load_dotenv()
 class Config:
     # Secret key for session management
     SECRET_KEY = os.getenv('SECRET_KEY', 'secretkey') # Default fallback provided
+    # 'sqlite': session data lives in the DB and the cookie only holds an id; 'cookie': Flask's signed-cookie session
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
 
     # API Keys
     HEYGEN_API_KEY = os.getenv("HEYGEN_API_KEY")
     HEYGEN_AVATAR_ID = os.getenv("HEYGEN_AVATAR_ID")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+    # HeyGen HTTP client: API root (point at a local stub for tests), connect/read timeouts in seconds,
+    # retries on connection errors and 429/503 only, and background dispatcher threads for streaming.task
+    HEYGEN_BASE_URL = os.getenv('HEYGEN_BASE_URL', 'https://api.heygen.com/v1')
+    HEYGEN_CONNECT_TIMEOUT = float(os.getenv('HEYGEN_CONNECT_TIMEOUT', '3.05'))
+    HEYGEN_READ_TIMEOUT = float(os.getenv('HEYGEN_READ_TIMEOUT', '15'))
+    HEYGEN_RETRIES = int(os.getenv('HEYGEN_RETRIES', '2'))
+    HEYGEN_DISPATCH_WORKERS = int(os.getenv('HEYGEN_DISPATCH_WORKERS', '4'))
+    # Create the avatar token + session in the background before "Start"; unclaimed sessions are stopped after the TTL (seconds).
+    # Off by default: a warm session is billed by HeyGen until it is claimed or stopped.
+    HEYGEN_PREWARM_ENABLED = os.getenv('HEYGEN_PREWARM_ENABLED', 'false').lower() == 'true'
+    HEYGEN_PREWARM_TTL = float(os.getenv('HEYGEN_PREWARM_TTL', '60'))
+
     # Database Path (Saved in 'instance' folder)
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     INSTANCE_DIR = os.path.join(os.path.dirname(BASE_DIR), 'instance')
     DATABASE_URI = os.path.join(INSTANCE_DIR, 'chat.db')
+    # SQLite connection tuning (WAL is always on): lock wait, durability, page cache and mmap sizes
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
 
     # Upload Paths
     UPLOAD_FOLDER = os.path.join(INSTANCE_DIR, 'uploads')
@@ -27,6 +46,80 @@ class Config:
     OLLAMA_TOOL_MODEL = os.getenv('OLLAMA_TOOL_MODEL', 'gpt-oss:20b-cloud')
     OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
     GOOGLE_CHAT_MODEL = os.getenv('GOOGLE_CHAT_MODEL', 'gemini-2.5-flash')
+    # Per-call timeout (seconds) for resume analysis and routed Gemini/Ollama calls
+    LLM_CALL_TIMEOUT = float(os.getenv('LLM_CALL_TIMEOUT', '90'))
+    # Circuit breaker: consecutive failures before a backend is skipped, and seconds until it is re-probed
+    LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '3'))
+    LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+    # Interview prompt budget (estimated tokens), recent messages kept verbatim, and the rolling summary
+    # of older turns (refreshed once this many messages left the window; capped at this many tokens)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+    CONTEXT_RECENT_MESSAGES = int(os.getenv('CONTEXT_RECENT_MESSAGES', '6'))
+    CONTEXT_SUMMARY_BATCH = int(os.getenv('CONTEXT_SUMMARY_BATCH', '4'))
+    CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv('CONTEXT_SUMMARY_MAX_TOKENS', '250'))
+
+    # Speech-to-text (shared Whisper pool). Pool size defaults to half the cores (capped at 4);
+    # threads default to the cores split evenly between the pooled models.
+    WHISPER_MODEL_SIZE = os.getenv('WHISPER_MODEL_SIZE', 'tiny.en')
+    WHISPER_DEVICE = os.getenv('WHISPER_DEVICE', 'cpu')
+    WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+    WHISPER_POOL_SIZE = int(os.getenv('WHISPER_POOL_SIZE', '0')) or None
+    WHISPER_CPU_THREADS = int(os.getenv('WHISPER_CPU_THREADS', '0')) or None
+    WHISPER_WARMUP = os.getenv('WHISPER_WARMUP', 'true').lower() == 'true'
+    # Uploads larger than this spill from memory to a private temp file before decoding
+    AUDIO_MAX_IN_MEMORY_BYTES = int(os.getenv('AUDIO_MAX_IN_MEMORY_BYTES', str(10 * 1024 * 1024)))
+    # Streaming uploads: a pause this long (ms) closes a segment for transcription, a longer one ends the
+    # utterance; idle streams are dropped after AUDIO_STREAM_TTL seconds, and a user keeps at most
+    # AUDIO_STREAM_MAX_PER_USER open streams
+    VAD_PAUSE_MS = int(os.getenv('VAD_PAUSE_MS', '300'))
+    VAD_END_OF_UTTERANCE_MS = int(os.getenv('VAD_END_OF_UTTERANCE_MS', '1000'))
+    AUDIO_STREAM_MAX_SECONDS = int(os.getenv('AUDIO_STREAM_MAX_SECONDS', '120'))
+    AUDIO_STREAM_TTL = int(os.getenv('AUDIO_STREAM_TTL', '120'))
+    AUDIO_STREAM_WORKERS = int(os.getenv('AUDIO_STREAM_WORKERS', '2'))
+    AUDIO_STREAM_MAX_PER_USER = int(os.getenv('AUDIO_STREAM_MAX_PER_USER', '2'))
+
+    # Emotion tracking: idle interview sessions are forgotten after this many seconds
+    EMOTION_SESSION_TTL = int(os.getenv('EMOTION_SESSION_TTL', '1800'))
+    # Background FER worker: sessions drained per worker pass, and how old a queued frame may get
+    EMOTION_BATCH_SIZE = int(os.getenv('EMOTION_BATCH_SIZE', '8'))
+    EMOTION_MAX_FRAME_AGE = float(os.getenv('EMOTION_MAX_FRAME_AGE', '2.0'))
+    # Frames are decoded at 1/N scale (1, 2, 4 or 8) and then capped at this width
+    EMOTION_DECODE_REDUCTION = int(os.getenv('EMOTION_DECODE_REDUCTION', '1'))
+    EMOTION_FRAME_MAX_WIDTH = int(os.getenv('EMOTION_FRAME_MAX_WIDTH', '480'))
+    # Scene-change sampling: skip FER when the frame barely changed (0 disables), up to N frames in a row
+    EMOTION_SCENE_THRESHOLD = float(os.getenv('EMOTION_SCENE_THRESHOLD', '4.0'))
+    EMOTION_MAX_SKIP = int(os.getenv('EMOTION_MAX_SKIP', '10'))
+    # How often the interview page captures a webcam frame (200 ms = 5 fps)
+    EMOTION_CAPTURE_INTERVAL_MS = int(os.getenv('EMOTION_CAPTURE_INTERVAL_MS', '200'))
+
+    # PDF text / OCR extraction cache bounds (least recently used rows are evicted)
+    EXTRACTION_CACHE_MAX_DOCUMENTS = int(os.getenv('EXTRACTION_CACHE_MAX_DOCUMENTS', '500'))
+    OCR_PAGE_CACHE_MAX_PAGES = int(os.getenv('OCR_PAGE_CACHE_MAX_PAGES', '2000'))
+
+    # Scanned-PDF OCR: render resolution, page budget per document, and parallelism
+    OCR_DPI = int(os.getenv('OCR_DPI', '300'))
+    OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '20'))
+    OCR_RENDER_WORKERS = int(os.getenv('OCR_RENDER_WORKERS', '0')) or None
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', '2'))
+
+    # Background transcript analysis: worker threads, and when a 'running' job counts as orphaned (seconds)
+    ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))
+    ANALYSIS_JOB_STALE_AFTER = int(os.getenv('ANALYSIS_JOB_STALE_AFTER', '600'))
+
+    # Coding round hint / evaluation cache (entries kept in memory, seconds a result stays reusable)
+    CODE_CACHE_MAX_ENTRIES = int(os.getenv('CODE_CACHE_MAX_ENTRIES', '512'))
+    CODE_CACHE_TTL = int(os.getenv('CODE_CACHE_TTL', '86400'))
+
+    # Local test execution for Python submissions (per-test timeout in seconds, memory cap, parallel runs).
+    # Off by default: it runs candidate code on this host. It also needs isolation: either SANDBOX_WRAPPER,
+    # a jail command prefix (e.g. nsjail/bwrap: no network, read-only root, non-root user), or running the
+    # app as root so each run gets its own network namespace and drops to SANDBOX_USER.
+    CODE_EXECUTION_ENABLED = os.getenv('CODE_EXECUTION_ENABLED', 'false').lower() == 'true'
+    SANDBOX_TIMEOUT = float(os.getenv('SANDBOX_TIMEOUT', '2'))
+    SANDBOX_MEMORY_MB = int(os.getenv('SANDBOX_MEMORY_MB', '256'))
+    SANDBOX_WORKERS = int(os.getenv('SANDBOX_WORKERS', '2'))
+    SANDBOX_USER = os.getenv('SANDBOX_USER', 'nobody')
+    SANDBOX_WRAPPER = os.getenv('SANDBOX_WRAPPER', '')
 
     # Ensure directories exist
     @staticmethod
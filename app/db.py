@@ -1,15 +1,31 @@
+import os
 import sqlite3
 import click
 from flask import current_app, g
 from app.config import Config
 
+def _configure(conn, config):
+    """
+    WAL lets the dashboard read while /interact or /evaluate_code write; the busy
+    timeout makes concurrent writers wait for the lock instead of failing.
+    """
+    conn.execute(f"PRAGMA busy_timeout = {int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    # NORMAL is durable across app crashes in WAL mode (only an OS crash can lose the last commits)
+    conn.execute(f"PRAGMA synchronous = {config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    conn.execute(f"PRAGMA cache_size = -{int(config.get('SQLITE_CACHE_SIZE_KB', 20000))}")
+    conn.execute(f"PRAGMA mmap_size = {int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
 def get_db():
     if 'db' not in g:
         g.db = sqlite3.connect(
             current_app.config['DATABASE_URI'],
-            detect_types=sqlite3.PARSE_DECLTYPES
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=current_app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0
         )
         g.db.row_factory = sqlite3.Row
+        _configure(g.db, current_app.config)
     return g.db
 
 def close_db(e=None):
@@ -94,6 +110,7 @@ def init_db():
             code TEXT,
             result_json TEXT,
             status TEXT,
+            cache_key TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
@@ -109,14 +126,194 @@ def init_db():
             FOREIGN KEY (jd_id) REFERENCES job_descriptions(id)
         )
     """)
-    
+
     db.commit()
+    migrate_db()
+
+# --- Versioned Migrations ---
+# Applied in order on top of the tables above; PRAGMA user_version records the
+# last one applied. Append new steps, never edit released ones.
+
+def _add_code_checks_cache_key(db):
+    # Older databases predate the response cache column
+    if 'cache_key' not in [r['name'] for r in db.execute("PRAGMA table_info(code_checks)")]:
+        db.execute("ALTER TABLE code_checks ADD COLUMN cache_key TEXT")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_code_checks_cache_key ON code_checks (cache_key)")
+
+def _add_chat_counters(db):
+    """Denormalized per-chat message count and latest scores, kept current by triggers."""
+    columns = [r['name'] for r in db.execute("PRAGMA table_info(chats)")]
+    for name, decl in [("message_count", "INTEGER NOT NULL DEFAULT 0"), ("technical_score", "REAL"),
+                       ("emotional_score", "REAL"), ("code_score", "REAL")]:
+        if name not in columns:
+            db.execute(f"ALTER TABLE chats ADD COLUMN {name} {decl}")
+
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_count_insert AFTER INSERT ON messages
+        BEGIN
+            UPDATE chats SET message_count = message_count + 1 WHERE id = NEW.chat_id;
+        END
+    """)
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_count_delete AFTER DELETE ON messages
+        BEGIN
+            UPDATE chats SET message_count = message_count - 1 WHERE id = OLD.chat_id;
+        END
+    """)
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_scores_latest AFTER INSERT ON evaluation_scores
+        BEGIN
+            UPDATE chats SET
+                technical_score = CASE WHEN NEW.score_type = 'technical' THEN NEW.score_value ELSE technical_score END,
+                emotional_score = CASE WHEN NEW.score_type = 'emotional' THEN NEW.score_value ELSE emotional_score END,
+                code_score = CASE WHEN NEW.score_type = 'code' THEN NEW.score_value ELSE code_score END
+            WHERE id = NEW.chat_id;
+        END
+    """)
+
+    # Backfill from existing rows
+    db.execute("UPDATE chats SET message_count = (SELECT COUNT(*) FROM messages m WHERE m.chat_id = chats.id)")
+    for score_type in ("technical", "emotional", "code"):
+        db.execute(f"""
+            UPDATE chats SET {score_type}_score = (
+                SELECT score_value FROM evaluation_scores s
+                WHERE s.chat_id = chats.id AND s.score_type = ? ORDER BY s.id DESC LIMIT 1
+            )
+        """, (score_type,))
+
+    # Keyset pagination orders by (started_at, id)
+    db.execute("DROP INDEX IF EXISTS idx_chats_username")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_chats_username_started ON chats (username, started_at, id)")
+
+def _add_chat_summaries(db):
+    """Rolling summary of the turns that left the /interact context window."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS chat_summaries (
+            chat_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            through_message_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def _add_server_sessions(db):
+    """Server-side Flask sessions (the cookie only holds the id); analysis context kept apart."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS server_sessions (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            analysis TEXT,
+            expires_at REAL NOT NULL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_server_sessions_expires ON server_sessions (expires_at)")
+
+def _add_extraction_caches(db):
+    """PDF text keyed by file content hash, and OCR text keyed by per-page content hash."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            content_hash TEXT PRIMARY KEY,
+            text TEXT,
+            last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_page_cache (
+            page_hash TEXT PRIMARY KEY,
+            text TEXT,
+            last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def _add_analysis_jobs(db):
+    """Background transcript analysis queue."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            username TEXT,
+            status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    # At most one active job per chat; duplicate enqueues are ignored
+    db.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_jobs_active
+        ON analysis_jobs (chat_id) WHERE status IN ('queued', 'running')
+    """)
+
+def _add_session_analyses(db):
+    """LLM transcript analysis, keyed by transcript version (message count and last id)."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS session_analyses (
+            chat_id TEXT PRIMARY KEY,
+            transcript_digest TEXT NOT NULL,
+            analysis TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+MIGRATIONS = [
+    (1, "code_checks.cache_key", _add_code_checks_cache_key),
+    (2, "indexes for hot query paths", [
+        # Transcript reads, digests and history windows: WHERE chat_id ... ORDER BY id
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages (chat_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_scores_chat_id ON evaluation_scores (chat_id, score_type)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_scores_username ON evaluation_scores (username)",
+        "CREATE INDEX IF NOT EXISTS idx_chats_username ON chats (username, started_at)",
+        "CREATE INDEX IF NOT EXISTS idx_job_descriptions_user_hash ON job_descriptions (user_id, content_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_job_descriptions_user_uploaded ON job_descriptions (user_id, uploaded_at)",
+        "CREATE INDEX IF NOT EXISTS idx_code_checks_user_question ON code_checks (user_id, question_context)",
+    ]),
+    (3, "chats.message_count and latest score columns", _add_chat_counters),
+    (4, "chat_summaries", _add_chat_summaries),
+    (5, "server_sessions", _add_server_sessions),
+    (6, "extraction_cache and ocr_page_cache", _add_extraction_caches),
+    (7, "analysis_jobs", _add_analysis_jobs),
+    (8, "session_analyses", _add_session_analyses),
+]
+
+def migrate_db():
+    """Applies pending migrations, each in its own transaction."""
+    db = get_db()
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    for target, description, step in MIGRATIONS:
+        if target <= version:
+            continue
+        db.execute("BEGIN")
+        try:
+            if callable(step):
+                step(db)
+            else:
+                for sql in step:
+                    db.execute(sql)
+            db.execute(f"PRAGMA user_version = {target}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"Applied DB migration {target}: {description}")
 
 @click.command('init-db')
 def init_db_command():
     init_db()
     click.echo('Initialized the database.')
 
+@click.command('migrate-db')
+def migrate_db_command():
+    migrate_db()
+    click.echo('Database is up to date.')
+
 def init_app(app):
     app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_db_command)
+
+    # Bring an existing database up to date at startup (new ones go through init-db)
+    db_path = app.config.get('DATABASE_URI')
+    if not app.config.get('TESTING') and db_path and os.path.exists(db_path):
+        with app.app_context():
+            migrate_db()
\ No newline at end of file
@@ -1,12 +1,10 @@
-import json
-import re
 from flask import Blueprint, request, jsonify, session, render_template, current_app
-from app.services.emotion_service import EmotionService
-from app.services.llm_factory import LLMFactory
 from app.db import get_db
+from app.services.llm_factory import LLMFactory
+from app.services.session_analysis import transcript_digest, get_saved_analysis, load_scores
+from app.services.analysis_jobs import get_analysis_queue, ACTIVE_STATUSES
 
 bp = Blueprint('api', __name__)
-emotion_service = EmotionService()
 
 # --- Helper Functions ---
 
@@ -19,36 +17,45 @@ def get_code_evaluator():
 
     if "code_evaluator" not in ex:
         from app.services.code_evaluator import CodeEvaluator
-        ex["code_evaluator"] = CodeEvaluator()
+        sandbox = None
+        if current_app.config.get('CODE_EXECUTION_ENABLED', False):
+            from app.services.code_sandbox import CodeSandbox
+            sandbox = CodeSandbox(
+                timeout=current_app.config.get('SANDBOX_TIMEOUT', 2.0),
+                memory_mb=current_app.config.get('SANDBOX_MEMORY_MB', 256),
+                max_workers=current_app.config.get('SANDBOX_WORKERS', 2),
+                user=current_app.config.get('SANDBOX_USER', 'nobody'),
+                wrapper=current_app.config.get('SANDBOX_WRAPPER'),
+            )
+            if not sandbox.isolated:
+                print("Code execution disabled: set SANDBOX_WRAPPER or run as root with SANDBOX_USER")
+                sandbox = None
+        ex["code_evaluator"] = CodeEvaluator(
+            cache_max_entries=current_app.config.get('CODE_CACHE_MAX_ENTRIES', 512),
+            cache_ttl=current_app.config.get('CODE_CACHE_TTL', 86400),
+            sandbox=sandbox,
+        )
     return ex["code_evaluator"]
 
-def _parse_scores_from_text(text):
-    """Extracts numerical scores from LLM analysis text."""
-    if not text:
-        return None, None
-
-    try:
-        j = json.loads(text)
-        return (float(j.get('technical')) if j.get('technical') is not None else None,
-                float(j.get('emotional')) if j.get('emotional') is not None else None)
-    except Exception:
-        pass
-
-    def find_score(name):
-        # Group the alternation so the capture group is always part of the same branch
-        pattern_num = rf'(?:{name})[^0-9\n]*([0-9]+(?:\.[0-9]+)?)'
-        m = re.search(pattern_num, text, re.I)
-        if m and m.group(1):
-            return float(m.group(1))
-        pattern_frac = rf'(?:{name})[^/]*([0-9]+)\/([0-9]+)'
-        m = re.search(pattern_frac, text, re.I)
-        if m and m.group(1) and m.group(2):
-            return float(m.group(1)) / float(m.group(2)) * 10.0
-        return None
-
-    tech = find_score('technical')
-    emo = find_score('emotional|emotion')
-    return tech, emo
+def get_emotion_service():
+    """Lazily create and cache the shared EmotionService (per-session state lives inside it)."""
+    ex = current_app.extensions
+    if "emotion_service" not in ex:
+        from app.services.emotion_service import EmotionService
+        ex["emotion_service"] = EmotionService(
+            session_ttl=current_app.config.get('EMOTION_SESSION_TTL', 1800),
+            batch_size=current_app.config.get('EMOTION_BATCH_SIZE', 8),
+            max_frame_age=current_app.config.get('EMOTION_MAX_FRAME_AGE', 2.0),
+            max_frame_width=current_app.config.get('EMOTION_FRAME_MAX_WIDTH', 480),
+            decode_reduction=current_app.config.get('EMOTION_DECODE_REDUCTION', 1),
+            scene_threshold=current_app.config.get('EMOTION_SCENE_THRESHOLD', 4.0),
+            max_skip=current_app.config.get('EMOTION_MAX_SKIP', 10),
+        )
+    return ex["emotion_service"]
+
+def _emotion_session_key():
+    """Emotion frames are aggregated per interview (chat_id)."""
+    return session.get('chat_id') or 'anonymous'
 
 # --- Coding Round ---
 
@@ -65,6 +72,8 @@ def coding_page():
 
 @bp.route('/evaluate_code', methods=['POST'])
 def evaluate():
+    if 'user_id' not in session:
+        return jsonify({"error": "Login required"}), 401
     data = request.json
     chat_id = data.get('chat_id')
     user_id = session.get('user_id')
@@ -98,81 +107,109 @@ def hint():
     h = ce.get_hint(request.json.get('question'))
     return jsonify({"hint": h})
 
+@bp.route('/code_cache_stats', methods=['GET'])
+def code_cache_stats():
+    """Exposes hint / evaluation cache hit and miss counters."""
+    return jsonify(get_code_evaluator().cache.stats())
+
 # --- Emotion Tracking ---
 
 @bp.route('/track_emotion', methods=['POST'])
 def track_emotion():
-    frame = request.json.get("frame")
-    if frame:
-        emotion_service.process_frame(frame)
-        return jsonify({"success": True})
-    return jsonify({"success": False}), 400
+    """
+    Accepts a webcam frame as raw JPEG bytes (multipart 'frame' field or an
+    image/jpeg / application/octet-stream body), or as legacy base64 JSON.
+    """
+    service = get_emotion_service()
+
+    # Decode here so bad frames fail fast; detection happens on the background worker
+    try:
+        if 'frame' in request.files:
+            image = service.decode_frame_bytes(request.files['frame'].read())
+        elif request.is_json:
+            frame = request.json.get("frame")
+            if not frame:
+                return jsonify({"success": False}), 400
+            image = service.decode_frame(frame)
+        else:
+            image = service.decode_frame_bytes(request.get_data())
+    except Exception:
+        image = None
+    if image is None:
+        return jsonify({"success": False}), 400
+
+    service.submit_frame(image, _emotion_session_key())
+    return jsonify({"success": True, "queued": True}), 202
+
+@bp.route('/emotion_stats', methods=['GET'])
+def emotion_stats():
+    """Exposes inference worker counters (submitted / processed / dropped frames)."""
+    return jsonify(get_emotion_service().stats())
+
+@bp.route('/llm_stats', methods=['GET'])
+def llm_stats():
+    """Exposes per-backend LLM client health (calls, errors, latency)."""
+    return jsonify(LLMFactory.stats())
 
 @bp.route('/get_and_clear_emotion_avg', methods=['GET'])
 def get_emotions():
-    return jsonify(emotion_service.get_and_reset_average())
+    return jsonify(get_emotion_service().get_and_reset_average(_emotion_session_key()))
 
 # --- Analytics & Session Management ---
 
+def _queue_analysis(db, chat_id):
+    """Enqueues background analysis for the chat (deduplicated per chat) and returns the job."""
+    queue = get_analysis_queue(current_app._get_current_object())
+    return queue.enqueue(db, chat_id, session.get('username', 'user'))
+
+def _analysis_state(db, chat_id):
+    """Returns (analysis_text or None, job status) for the chat's current transcript."""
+    analysis_text = get_saved_analysis(db, chat_id, transcript_digest(db, chat_id))
+    if analysis_text is not None:
+        return analysis_text, "done"
+    job = get_analysis_queue(current_app._get_current_object()).latest_job(db, chat_id)
+    if job is None:
+        return None, "none"
+    # A finished job for an older transcript means new messages arrived since
+    if job['status'] == 'done':
+        return None, "stale"
+    return None, job['status']
+
 @bp.route('/analytics/<chat_id>', methods=['GET'])
 def analytics(chat_id):
+    """
+    Returns the analysis when it is ready (200). Otherwise queues it and returns
+    202 with the job status; poll /analysis_status/<chat_id> until it is 'done'.
+    """
     db = get_db()
-    
-    # 1. Check if we already have scores (Avoid re-running LLM on refresh)
-    existing_scores = db.execute("""
-        SELECT score_type, score_value FROM evaluation_scores WHERE chat_id = ?
-    """, (chat_id,)).fetchall()
-    
-    tech_score = next((r['score_value'] for r in existing_scores if r['score_type'] == 'technical'), None)
-    emo_score = next((r['score_value'] for r in existing_scores if r['score_type'] == 'emotional'), None)
-    
-    # If we have both scores, return early (Fast Path)
-    # We also need the analysis text. Typically, you'd store this in a 'chat_analysis' table.
-    # For now, if scores exist, we might just return them. 
-    # But if the user wants the TEXT analysis, we might need to re-generate or store it.
-    # To keep it simple: if scores exist, we assume analysis is done. 
-    # Ideally, store the analysis text in the DB too. 
-    
-    if tech_score is not None and emo_score is not None:
-        # For this version, we'll re-generate text or return a placeholder if strict speed is needed.
-        # But let's re-run ONLY if missing.
-        pass 
-
-    # 2. Fetch Transcript
-    rows = db.execute("SELECT role, message, emotion_context, timestamp FROM messages WHERE chat_id = ? ORDER BY id ASC", (chat_id,)).fetchall()
-    transcript = ""
-    for row in rows:
-        transcript += f"[{row['timestamp']}] {row['role'].upper()}: {row['message']}\n"
-        if row['emotion_context'] and row['emotion_context'] != "{}":
-            transcript += f"  [EMOTION]: {row['emotion_context']}\n"
-
-    # 3. Run LLM Analysis
-    llm = LLMFactory.get_ollama_chat()
-    prompt = f"Analyze this interview transcript for technical and emotional performance. Provide a Technical Score (0-10) and Emotional Score (0-10) and constructive feedback:\n{transcript}"
-    analysis_text = llm.invoke(prompt)
-
-    # 4. Parse & Save Scores (Only if they don't exist yet to avoid duplicates)
-    new_tech, new_emo = _parse_scores_from_text(analysis_text)
-    
-    # Fallbacks
-    if new_tech is None: new_tech = 5.0
-    if new_emo is None: new_emo = 5.0
+    analysis_text, status = _analysis_state(db, chat_id)
+    if analysis_text is None:
+        job = _queue_analysis(db, chat_id)
+        return jsonify({"chat_id": chat_id, "status": job['status'], "job_id": job['id']}), 202
 
-    username = session.get('username', 'user')
+    scores = load_scores(db, chat_id)
+    return jsonify({"analysis": analysis_text, "technical_score": scores['technical'], "emotional_score": scores['emotional']})
 
-    if tech_score is None:
-        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES (?, ?, ?, ?)",
-                   (chat_id, username, 'technical', new_tech))
-        tech_score = new_tech
-
-    if emo_score is None:
-        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES (?, ?, ?, ?)",
-                   (chat_id, username, 'emotional', new_emo))
-        emo_score = new_emo
-        
-    db.commit()
-
-    return jsonify({"analysis": analysis_text, "technical_score": tech_score, "emotional_score": emo_score})
+@bp.route('/analysis_status/<chat_id>', methods=['GET'])
+def analysis_status(chat_id):
+    """
+    Cheap polling endpoint for background analysis (no LLM work happens here).
+    Ends in 'done', 'failed' or 'none' (never requested); a transcript that changed
+    since the last run is re-queued, so pollers never see 'stale'.
+    """
+    db = get_db()
+    analysis_text, status = _analysis_state(db, chat_id)
+    if status == 'stale':
+        status = _queue_analysis(db, chat_id)['status']
+    result = {"chat_id": chat_id, "status": status}
+    if analysis_text is not None:
+        scores = load_scores(db, chat_id)
+        result.update({"analysis": analysis_text, "technical_score": scores['technical'], "emotional_score": scores['emotional']})
+    elif status == 'failed':
+        result["error"] = "Failed to generate analysis."
+    elif status == 'none':
+        result["error"] = "No analysis has been requested for this session."
+    return jsonify(result)
 
 @bp.route('/analysis_page')
 def analysis_page():
@@ -182,75 +219,78 @@ def analysis_page():
 @bp.route('/get_session_data', methods=['GET'])
 def get_session_data():
     """
-    Returns the Master List of sessions for the Dashboard Sidebar.
-    Joins Chats + Job Descriptions + Scores.
+    Returns the Master List of sessions for the Dashboard Sidebar, newest first.
+    Message counts and latest scores are denormalized on chats (kept by triggers),
+    so a page costs the same however much history the user has.
+
+    Keyset pagination: ?limit=N (default 50, max 200) and ?before=<next_before of the previous page>.
     """
     db = get_db()
-    
-    # Query: Get all chats for current user, ordered by latest activity
+    username = session.get('username')
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+
     # We join Job Descriptions to get the 'Role Name' (filename)
     query = """
         SELECT 
             c.id as chat_id,
             c.started_at,
             c.last_activity,
-            jd.filename as role_name,
-            (SELECT COUNT(*) FROM messages m WHERE m.chat_id = c.id) as message_count
+            c.message_count,
+            c.technical_score,
+            c.emotional_score,
+            c.code_score,
+            jd.filename as role_name
         FROM chats c
         LEFT JOIN job_descriptions jd ON c.jd_id = jd.id
         WHERE c.username = ?
-        ORDER BY c.started_at DESC
-    """
-    
-    username = session.get('username')
-    cursor = db.execute(query, (username,))
-    sessions_raw = cursor.fetchall()
-    
-    # Fetch all scores for these chats efficiently
-    scores_query = """
-        SELECT chat_id, score_type, score_value 
-        FROM evaluation_scores 
-        WHERE username = ?
     """
-    scores_cursor = db.execute(scores_query, (username,))
-    all_scores = scores_cursor.fetchall()
-    
-    # Map scores to chat_ids
-    scores_map = {}
-    for s in all_scores:
-        if s['chat_id'] not in scores_map:
-            scores_map[s['chat_id']] = {}
-        scores_map[s['chat_id']][s['score_type']] = s['score_value']
+    params = [username]
+    before = request.args.get('before')
+    if before and '|' in before:
+        started_at, cid = before.rsplit('|', 1)
+        query += " AND (c.started_at < ? OR (c.started_at = ? AND c.id < ?))"
+        params += [started_at, started_at, cid]
+    query += " ORDER BY c.started_at DESC, c.id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = db.execute(query, params).fetchall()
+
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = f"{rows[-1]['started_at']}|{rows[-1]['chat_id']}"
 
     # Build final JSON
     sessions_list = []
-    for s in sessions_raw:
+    flat_scores = []
+    for s in rows:
         cid = s['chat_id']
-        s_scores = scores_map.get(cid, {})
+        s_scores = {"technical": s['technical_score'], "emotional": s['emotional_score'], "code": s['code_score']}
         sessions_list.append({
             "chat_id": cid,
             "role_name": s['role_name'] if s['role_name'] else "General Interview",
             "date": s['started_at'],
             "last_time": s['last_activity'],
             "message_count": s['message_count'],
-            "scores": {
-                "technical": s_scores.get('technical', '-'),
-                "emotional": s_scores.get('emotional', '-'),
-                "code": s_scores.get('code', '-')
-            }
-        })
-        
-    # We also return a flat list of scores for the aggregate charts
-    # (filtering out incomplete sessions if needed)
-    flat_scores = []
-    for s in all_scores:
-        flat_scores.append({
-            "chat_id": s['chat_id'],
-            "score_type": s['score_type'],
-            "score_value": s['score_value']
+            "scores": {k: (v if v is not None else '-') for k, v in s_scores.items()}
         })
+        # Flat list of this page's latest scores (analysis page groups it by chat_id)
+        for score_type, value in s_scores.items():
+            if value is not None:
+                flat_scores.append({"chat_id": cid, "score_type": score_type, "score_value": value})
+
+    # Averages over all of the user's sessions for the aggregate cards
+    avg = db.execute("""
+        SELECT AVG(technical_score) AS technical, AVG(emotional_score) AS emotional, AVG(code_score) AS code
+        FROM chats WHERE username = ?
+    """, (username,)).fetchone()
+    score_averages = {k: (round(avg[k], 1) if avg[k] is not None else None) for k in ("technical", "emotional", "code")}
 
-    return jsonify({"sessions": sessions_list, "evaluation_scores": flat_scores})
+    return jsonify({
+        "sessions": sessions_list,
+        "evaluation_scores": flat_scores,
+        "score_averages": score_averages,
+        "next_before": next_before
+    })
 
 @bp.route('/get_session_details/<chat_id>', methods=['GET'])
 def get_session_details(chat_id):
@@ -281,43 +321,22 @@ def get_session_details(chat_id):
     ]
 
     # 3. Fetch Scores
-    score_rows = db.execute("SELECT score_type, score_value FROM evaluation_scores WHERE chat_id = ?", (chat_id,)).fetchall()
-    scores = {"technical": None, "emotional": None, "code": None}
-    for r in score_rows:
-        scores[r["score_type"]] = r["score_value"]
+    scores = load_scores(db, chat_id)
 
-    # 4. Generate Analysis (On the fly)
-    analysis_text = ""
+    # 4. Analysis: served from session_analyses, otherwise generated in the background
+    analysis_status = "done"
+    scores_stale = False
     if len(transcript) > 2:
-        # Always generate analysis for sessions with sufficient transcript
-        transcript_text = ""
-        for msg in transcript:
-            transcript_text += f"[{msg['timestamp']}] {msg['role'].upper()}: {msg['message']}\n"
-            if msg['emotion_context'] and msg['emotion_context'] != "{}":
-                transcript_text += f"  [EMOTION]: {msg['emotion_context']}\n"
-        
-        llm = LLMFactory.get_ollama_chat()
-        prompt = f"Analyze this interview transcript for technical and emotional performance. Provide a Technical Score (0-10) and Emotional Score (0-10) and constructive feedback:\n{transcript_text}"
-        try:
-            analysis_text = llm.invoke(prompt)
-        except Exception as e:
+        analysis_text, analysis_status = _analysis_state(db, chat_id)
+        # Technical/emotional scores belong to an older transcript until the analysis is redone
+        scores_stale = analysis_text is None
+        if analysis_status == 'failed':
+            # Not retried on every dashboard load; /analytics and /stop_session re-queue it
             analysis_text = "Failed to generate analysis."
-    
-        # Parse and insert scores only if not already present
-        new_tech, new_emo = _parse_scores_from_text(analysis_text)
-        if new_tech is None: new_tech = 5.0
-        if new_emo is None: new_emo = 5.0
-        
-        username = session.get('username', 'user')
-        if scores['technical'] is None:
-            db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES (?, ?, ?, ?)",
-                       (chat_id, username, 'technical', new_tech))
-            scores['technical'] = new_tech
-        if scores['emotional'] is None:
-            db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES (?, ?, ?, ?)",
-                       (chat_id, username, 'emotional', new_emo))
-            scores['emotional'] = new_emo
-        db.commit()
+        elif analysis_text is None:
+            if analysis_status not in ACTIVE_STATUSES:
+                analysis_status = _queue_analysis(db, chat_id)['status']
+            analysis_text = ""
     else:
         analysis_text = "No analysis generated yet."
 
@@ -326,5 +345,7 @@ def get_session_details(chat_id):
         "role_name": role_name,
         "transcript": transcript,
         "evaluation_scores": scores,
-        "analysis": analysis_text
+        "analysis": analysis_text,
+        "analysis_status": analysis_status,
+        "scores_stale": scores_stale
     })
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from app.db import get_db
+from app.services.session_store import regenerate_session
 
 bp = Blueprint('auth', __name__)
 
@@ -22,13 +23,13 @@ def login():
         ).fetchone()
 
         if user:
+            regenerate_session()
             session['user_id'] = user['id']
             session['username'] = user['username']
             return redirect(url_for('dashboard.index'))
         else:
-            # User not found: Store attempted credentials in session and redirect to signup
+            # User not found: remember the username (never the password) and redirect to signup
             session['signup_username'] = username
-            session['signup_password'] = password
             flash("User not found. Redirecting to signup...")
             return redirect(url_for('auth.signup'))
             
@@ -38,7 +39,6 @@ def login():
 def signup():
     # Pre-fill from session if coming from failed login
     prefill_username = session.pop('signup_username', '')  # Pop to clear after use
-    prefill_password = session.pop('signup_password', '')
     
     if request.method == 'POST':
         username = request.form.get("username")
@@ -55,6 +55,7 @@ def signup():
             
             # Auto-login: Set session and redirect to dashboard
             user_id = db.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()['id']
+            regenerate_session()
             session['user_id'] = user_id
             session['username'] = username
             flash("Account created and logged in!")
@@ -64,7 +65,7 @@ def signup():
             return render_template('auth/signup.html', username=username, password=password)
     
     # GET request: Render with pre-filled values
-    return render_template('auth/signup.html', username=prefill_username, password=prefill_password)
+    return render_template('auth/signup.html', username=prefill_username, password='')
 
 @bp.route('/logout')
 def logout():
@@ -1,10 +1,10 @@
 import os
-import json
 import hashlib
 from flask import Blueprint, render_template, request, redirect, url_for, session, current_app, send_from_directory, flash
 from werkzeug.utils import secure_filename
 from app.db import get_db
 from app.services.jd_analyzer import JDAnalyzer
+from app.services.session_store import load_analysis_context, save_analysis_context
 
 bp = Blueprint('dashboard', __name__)
 
@@ -13,12 +13,7 @@ def allowed_file(filename):
 
 def clear_analysis_session():
     """Helper to clear stale analysis data from the session."""
-    keys_to_clear = [
-        'resume_skills', 'common_skills', 'missing_skills', 
-        'questions', 'current_analyzed_jd_id'
-    ]
-    for key in keys_to_clear:
-        session.pop(key, None)
+    save_analysis_context({})
 
 def calculate_file_hash(file_stream):
     """Calculates MD5 hash of a file stream."""
@@ -79,7 +74,7 @@ def upload_jd():
 
             # 3. Analyze & Insert
             analyzer = JDAnalyzer()
-            jd_text = analyzer.extract_text_from_pdf(save_path)
+            jd_text = analyzer.extract_text_from_pdf(save_path, content_hash=file_hash)
             jd_skills = analyzer.extract_skills(jd_text, is_jd=True)
 
             db.execute(
@@ -102,51 +97,61 @@ def analyze(jd_id):
         return "JD not found", 404
 
     # Check for Stale Data
+    analysis = load_analysis_context()
     if request.method == 'GET':
-        if session.get('current_analyzed_jd_id') != jd_id:
+        if analysis.get('current_analyzed_jd_id') != jd_id:
             clear_analysis_session()
+            analysis = {}
 
     if request.method == 'POST':
         file = request.files.get('resume_file')
         if file and allowed_file(file.filename):
+            file_hash = calculate_file_hash(file)
             filename = secure_filename(file.filename)
             save_path = os.path.join(current_app.config['RESUME_UPLOAD_FOLDER'], filename)
             file.save(save_path)
 
-            # Analyze Resume
+            # Analyze Resume (text extraction is cached by content hash)
             analyzer = JDAnalyzer()
-            resume_text = analyzer.extract_text_from_pdf(save_path)
-            resume_skills = analyzer.extract_skills(resume_text, is_jd=False)
+            resume_text = analyzer.extract_text_from_pdf(save_path, content_hash=file_hash)
+
+            # Skills, comparison and questions (independent LLM calls run concurrently)
+            result = analyzer.analyze_resume(
+                resume_text, jd['jd_skills'], jd['jd_text'],
+                timeout=current_app.config.get('LLM_CALL_TIMEOUT')
+            )
+            resume_skills = result['resume_skills']
+            common, missing, questions_json = result['common'], result['missing'], result['questions']
+            common_list = common.get('common_skills', []) if common else []
 
-            # Save Resume to DB
+            # Save Resume to DB (and backfill JD skills if they were missing)
             db.execute(
                 "INSERT INTO resumes (user_id, jd_id, filename, filepath, resume_text, resume_skills) VALUES (?, ?, ?, ?, ?, ?)",
                 (session['user_id'], jd_id, filename, save_path, resume_text, resume_skills)
             )
+            if result['jd_skills'] and not jd['jd_skills']:
+                db.execute("UPDATE job_descriptions SET jd_skills = ? WHERE id = ?", (result['jd_skills'], jd_id))
             db.commit()
 
-            # Compare and Generate Questions
-            common, missing = analyzer.get_comparison(resume_skills, jd['jd_skills'])
-            common_list = common.get('common_skills', []) if common else []
-            questions_json = analyzer.generate_interview_questions(json.dumps(common))
-            
-            # Update Session
-            session['resume_skills'] = resume_skills
-            session['jd_skills'] = jd['jd_skills']
-            session['common_skills'] = common_list
-            session['missing_skills'] = missing.get('skills_to_learn', []) if missing else []
-            session['questions'] = questions_json.get('questions', []) if questions_json else []
-            
-            # Mark this JD as current
-            session['current_analyzed_jd_id'] = jd_id
+            # Update Session (analysis context is stored server-side, not in the cookie)
+            analysis = {
+                'resume_skills': resume_skills,
+                'jd_skills': result['jd_skills'],
+                'common_skills': common_list,
+                'missing_skills': missing.get('skills_to_learn', []) if missing else [],
+                'questions': questions_json.get('questions', []) if questions_json else [],
+                # Mark this JD as current
+                'current_analyzed_jd_id': jd_id,
+            }
+            save_analysis_context(analysis)
 
     context = {
         'jd': jd,
-        'resume_skills': session.get("resume_skills"),
-        'jd_skills': session.get("jd_skills", jd['jd_skills']),
-        'common_skills': session.get("common_skills"),
-        'missing_skills': session.get("missing_skills"),
-        'questions': session.get("questions")
+        'resume_skills': analysis.get("resume_skills"),
+        'jd_skills': analysis.get("jd_skills", jd['jd_skills']),
+        'common_skills': analysis.get("common_skills"),
+        'missing_skills': analysis.get("missing_skills"),
+        'questions': analysis.get("questions")
     }
 
     return render_template('dashboard/analyze.html', **context)
@@ -1,11 +1,17 @@
+import json
+import time
 import uuid
-import os
-import requests
-from flask import Blueprint, request, jsonify, session, current_app, render_template, redirect, url_for
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from faster_whisper import WhisperModel
+from flask import Blueprint, request, jsonify, session, current_app, render_template, redirect, url_for, Response, stream_with_context
 from app.db import get_db
 from app.services.llm_factory import LLMFactory
+from app.services.transcription_service import get_transcriber, decode_upload, SAMPLE_RATE
+from app.services.analysis_jobs import get_analysis_queue
+from app.services.sentence_stream import iter_sentences, chunk_text
+from app.services.heygen_client import get_heygen_client
+from app.services.avatar_prewarm import get_avatar_prewarmer
+from app.services.context_builder import get_context_builder
+from app.services.session_store import load_analysis_context
+from app.services.audio_stream import get_audio_streams
 
 bp = Blueprint('interview', __name__)
 
@@ -13,7 +19,11 @@ bp = Blueprint('interview', __name__)
 def index():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
-    return render_template('interview/index.html')
+    _prewarm_avatar()
+    return render_template(
+        'interview/index.html',
+        emotion_capture_interval_ms=current_app.config.get('EMOTION_CAPTURE_INTERVAL_MS', 200)
+    )
 
 @bp.route('/start_chat_session', methods=['POST'])
 def start_chat_session():
@@ -35,34 +45,41 @@ def start_chat_session():
     )
     db.commit()
 
+    # The user is on the way to the interview room: get the avatar ready meanwhile
+    _prewarm_avatar()
     return jsonify({"chat_id": chat_id})
 
+def _prewarm_avatar():
+    prewarmer = get_avatar_prewarmer(current_app._get_current_object())
+    if prewarmer and session.get('user_id') is not None:
+        prewarmer.prewarm(session['user_id'])
+
 @bp.route('/start_session', methods=['POST'])
 def start_heygen_session():
     """Starts the HeyGen Interactive Avatar session."""
-    api_key = current_app.config['HEYGEN_API_KEY']
     avatar_id = current_app.config['HEYGEN_AVATAR_ID']
+    client = get_heygen_client(current_app.config)
+    prewarmer = get_avatar_prewarmer(current_app._get_current_object())
     
     try:
-        # 1. Get Token
-        headers = {'X-API-KEY': api_key}
-        resp = requests.post("https://api.heygen.com/v1/streaming.create_token", headers=headers)
-        resp.raise_for_status()
-        token = resp.json()['data']['token']
-        session["session_token"] = token
-
-        # 2. Start Session
-        auth_headers = {'Authorization': f'Bearer {token}'}
-        body = {"version": "v2", "avatar_id": avatar_id, "quality": "medium", "video_encoding": "VP8"}
-        resp = requests.post("https://api.heygen.com/v1/streaming.new", json=body, headers=auth_headers)
-        resp.raise_for_status()
-        data = resp.json()['data']
+        # 1 + 2. Token and Session: reuse the pre-warmed ones when available
+        warm = prewarmer.claim(session.get('user_id')) if prewarmer else None
+        if warm:
+            token, data = warm
+            try:
+                client.start_session(token, data['session_id'])
+            except Exception as e:
+                print(f"Pre-warmed avatar session unusable, starting a new one: {e}")
+                client.stop_session_async(token, data['session_id'])
+                warm = None
+        if not warm:
+            token = client.create_token()
+            data = client.new_session(token, avatar_id)
+            # 3. Start Avatar
+            client.start_session(token, data['session_id'])
 
+        session["session_token"] = token
         session["session_id"] = data['session_id']
-        
-        # 3. Start Avatar
-        requests.post("https://api.heygen.com/v1/streaming.start", 
-                      json={"session_id": data['session_id']}, headers=auth_headers).raise_for_status()
 
         return jsonify({"session_id": data['session_id'], "livekit_url": data['url'], "livekit_token": data['access_token']})
     except Exception as e:
@@ -73,15 +90,40 @@ def stop_session():
     sid = session.get("session_id")
     token = session.get("session_token")
     if sid and token:
-        try:
-            requests.post("https://api.heygen.com/v1/streaming.stop", 
-                          json={"session_id": sid}, 
-                          headers={'Authorization': f'Bearer {token}'})
-        except:
-            pass
+        # Sent in the background, after any sentences still queued for this avatar
+        get_heygen_client(current_app.config).stop_session_async(token, sid)
+    # Also release a warm session that was never claimed
+    prewarmer = get_avatar_prewarmer(current_app._get_current_object())
+    if prewarmer and session.get('user_id') is not None:
+        prewarmer.discard(session['user_id'])
     session["session_id"] = None
+
+    # Interview is over: start the transcript analysis now so it is ready for the dashboard
+    chat_id = session.get("chat_id")
+    if chat_id:
+        db = get_db()
+        if db.execute("SELECT 1 FROM messages WHERE chat_id = ? LIMIT 1", (chat_id,)).fetchone():
+            get_analysis_queue(current_app._get_current_object()).enqueue(db, chat_id, session.get("username", "user"))
     return jsonify({"message": "Stopped"})
 
+@bp.route('/transcription_stats', methods=['GET'])
+def transcription_stats():
+    """Exposes Whisper pool metrics (queue wait vs. decode time)."""
+    return jsonify(get_transcriber(current_app.config).stats())
+
+@bp.route('/context_stats', methods=['GET'])
+def context_stats():
+    """Exposes prompt size, rolling summary and prefix cache metrics for /interact."""
+    return jsonify(get_context_builder(current_app._get_current_object()).stats())
+
+@bp.route('/heygen_stats', methods=['GET'])
+def heygen_stats():
+    """Exposes avatar dispatcher metrics (queued / sent / failed calls) and pre-warm hit rate."""
+    stats = get_heygen_client(current_app.config).stats()
+    prewarmer = get_avatar_prewarmer(current_app._get_current_object())
+    stats["prewarm"] = prewarmer.stats() if prewarmer else None
+    return jsonify(stats)
+
 @bp.route('/interact', methods=['POST'])
 def interact():
     print("Audio request received")  # Debug: Confirm backend hit
@@ -89,64 +131,98 @@ def interact():
         print("No audio file in request")
         return jsonify({"error": "No audio"}), 400
 
-    # 1. Save and Transcribe
+    # 1. Decode (in memory) and Transcribe
     audio = request.files['audio']
-    unique_filename = f"audio_{uuid.uuid4().hex}.wav"
-    audio.save(unique_filename)
-    print(f"Audio saved as {unique_filename}")  # Debug
-    
     try:
-        model = WhisperModel("tiny.en", device="cpu", compute_type="int8")
-        segments, _ = model.transcribe(unique_filename)
-        user_text = " ".join(s.text for s in segments)
-        print(f"Transcribed text: '{user_text}'")  # Debug
-    finally:
-        if os.path.exists(unique_filename):
-            os.remove(unique_filename)
+        samples = decode_upload(audio.stream, current_app.config.get('AUDIO_MAX_IN_MEMORY_BYTES', 10 * 1024 * 1024))
+    except Exception as e:
+        print(f"Audio decode error: {e}")
+        return jsonify({"error": "Could not decode audio"}), 400
+    print(f"Audio decoded: {len(samples) / SAMPLE_RATE:.2f}s")  # Debug
+
+    transcriber = get_transcriber(current_app.config)
+    user_text, timings = transcriber.transcribe(samples)
+    print(f"Transcribed text: '{user_text}' (wait {timings['queue_wait']}s, decode {timings['decode']}s)")  # Debug
 
     if not user_text.strip():
         print("No speech detected")
         return jsonify({"user_text": "", "gemini_text": "I didn't hear anything."})
 
+    return _reply(user_text)
+
+# --- Streaming audio upload ---
+# POST /audio_stream opens a stream, POST /audio_stream/<id> appends raw 16 kHz
+# 16-bit mono PCM (transcribed segment by segment as pauses are detected), and
+# POST /audio_stream/<id>/finish takes the same form fields as /interact.
+
+def _audio_streams():
+    return get_audio_streams(current_app._get_current_object(), get_transcriber(current_app.config))
+
+@bp.route('/audio_stream', methods=['POST'])
+def open_audio_stream():
+    if 'user_id' not in session:
+        return jsonify({"error": "Login required"}), 401
+    stream = _audio_streams().create(owner=session['user_id'])
+    return jsonify({"stream_id": stream.id, "sample_rate": SAMPLE_RATE})
+
+@bp.route('/audio_stream/<stream_id>', methods=['POST'])
+def append_audio(stream_id):
+    stream = _audio_streams().get(stream_id, owner=session.get('user_id'))
+    if stream is None:
+        return jsonify({"error": "Unknown audio stream"}), 404
+    if (request.content_length or 0) > current_app.config.get('AUDIO_MAX_IN_MEMORY_BYTES', 10 * 1024 * 1024):
+        return jsonify({"error": "Chunk too large"}), 413
+    try:
+        return jsonify(stream.feed_pcm16(request.get_data()))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+@bp.route('/audio_stream/<stream_id>/finish', methods=['POST'])
+def finish_audio_stream(stream_id):
+    stream = _audio_streams().pop(stream_id, owner=session.get('user_id'))
+    if stream is None:
+        return jsonify({"error": "Unknown audio stream"}), 404
+    try:
+        user_text, timings = stream.finish()
+    except Exception as e:
+        print(f"Streaming transcription error: {e}")
+        return jsonify({"error": "Transcription failed"}), 500
+    print(f"Transcribed text: '{user_text}' ({timings['segments']} segments, tail wait {timings['tail_wait']}s)")  # Debug
+
+    if not user_text.strip():
+        print("No speech detected")
+        return jsonify({"user_text": "", "gemini_text": "I didn't hear anything."})
+
+    return _reply(user_text)
+
+def _reply(user_text):
+    """Steps 2-5 of /interact for a transcribed utterance (form: emotion_context, stream)."""
     # 2. Prepare LLM Context
     emotion_context = request.form.get('emotion_context', "{}")
-    
-    # Retrieve context from session (populated during Analyze phase)
-    resume_skills = session.get('resume_skills', 'N/A')
-    jd_skills = session.get('jd_skills', 'N/A')
-    questions = session.get('questions', [])
-    
-    system_prompt = f"""
-    You are an AI Interviewer. 
-    Context:
-    Resume Skills: {resume_skills}
-    JD Skills: {jd_skills}
-    Questions: {questions}
-    User Emotion: {emotion_context}
-    
-    Rules: 
-    1. Ask one question at a time based on the Context.
-    2. Be professional but conversational.
-    3. Keep responses concise (under 3 sentences) suitable for a spoken avatar.
-    """
-    
-    messages = [SystemMessage(content=system_prompt)]
-    
-    # Fetch History (Context Window)
-    db = get_db()
     chat_id = session.get("chat_id")
-    if chat_id:
-        rows = db.execute("SELECT role, message FROM messages WHERE chat_id = ? ORDER BY id DESC LIMIT 6", (chat_id,)).fetchall()
-        # Reconstruct history in chronological order
-        for row in reversed(rows):
-            if row['role'] == 'user': messages.append(HumanMessage(content=row['message']))
-            else: messages.append(AIMessage(content=row['message']))
-    
-    messages.append(HumanMessage(content=user_text))
+
+    # Cached prompt prefix (skills + questions from the Analyze phase), rolling summary
+    # of older turns and the recent history, within the configured token budget
+    analysis = load_analysis_context()
+    messages = get_context_builder(current_app._get_current_object()).build(
+        get_db(), chat_id, user_text, emotion_context,
+        analysis.get('resume_skills', 'N/A'), analysis.get('jd_skills', 'N/A'), analysis.get('questions', [])
+    )
 
     # 3. Get LLM Response
-    print("Generating LLM response")  # Debug before LLM call
+    token = session.get("session_token")
+    sid = session.get("session_id")
     llm = LLMFactory.get_ollama_chat()
+
+    if request.form.get('stream') == '1':
+        # Streaming mode: speak and return the reply sentence by sentence (NDJSON)
+        return Response(
+            stream_with_context(_stream_reply(llm, messages, user_text, emotion_context, chat_id, token, sid)),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    print("Generating LLM response")  # Debug before LLM call
     response_text = llm.invoke(messages)
     print(f"LLM response: '{response_text}'")  # Debug
     
@@ -154,26 +230,58 @@ def interact():
     if hasattr(response_text, 'content'):
         response_text = response_text.content
 
-    # 4. Speak (HeyGen)
-    token = session.get("session_token")
-    sid = session.get("session_id")
+    # 4. Speak (HeyGen, dispatched in the background)
     if token and sid:
-        try:
-            requests.post("https://api.heygen.com/v1/streaming.task", 
-                          json={"session_id": sid, "text": response_text, "task_type": "repeat"},
-                          headers={'Authorization': f'Bearer {token}'})
-        except Exception as e:
-            print(f"HeyGen Error: {e}")
+        _speak(token, sid, response_text)
 
     # 5. Save to DB
-    if chat_id:
-        db.execute("INSERT INTO messages (chat_id, role, message, emotion_context) VALUES (?, ?, ?, ?)", 
-                   (chat_id, 'user', user_text, emotion_context))
-        db.execute("INSERT INTO messages (chat_id, role, message) VALUES (?, ?, ?)", 
-                   (chat_id, 'ai', response_text))
-        
-        # Update last_activity for dashboard sorting
-        db.execute("UPDATE chats SET last_activity = CURRENT_TIMESTAMP WHERE id = ?", (chat_id,))
-        db.commit()
-
-    return jsonify({"user_text": user_text, "gemini_text": response_text})
\ No newline at end of file
+    _save_turn(chat_id, user_text, emotion_context, response_text)
+
+    return jsonify({"user_text": user_text, "gemini_text": response_text})
+
+def _speak(token, sid, text):
+    """Queues a streaming.task; calls for one avatar session are sent in order."""
+    get_heygen_client(current_app.config).send_task_async(token, sid, text)
+
+def _save_turn(chat_id, user_text, emotion_context, response_text):
+    if not chat_id:
+        return
+    db = get_db()
+    db.execute("INSERT INTO messages (chat_id, role, message, emotion_context) VALUES (?, ?, ?, ?)", 
+               (chat_id, 'user', user_text, emotion_context))
+    db.execute("INSERT INTO messages (chat_id, role, message) VALUES (?, ?, ?)", 
+               (chat_id, 'ai', response_text))
+    
+    # Update last_activity for dashboard sorting
+    db.execute("UPDATE chats SET last_activity = CURRENT_TIMESTAMP WHERE id = ?", (chat_id,))
+    db.commit()
+
+def _stream_reply(llm, messages, user_text, emotion_context, chat_id, token, sid):
+    """
+    Consumes the LLM token stream and emits one NDJSON event per line:
+    user_text, then a 'sentence' per completed sentence, then 'done' (or 'error').
+    Each sentence is sent to the avatar as soon as it completes; the HeyGen
+    dispatcher keeps tasks in order without blocking the token stream.
+    """
+    yield json.dumps({"type": "user_text", "text": user_text}) + "\n"
+
+    speak = bool(token and sid)
+    sentences = []
+    started = time.perf_counter()
+    try:
+        for sentence in iter_sentences(chunk_text(c) for c in llm.stream(messages)):
+            if not sentences:
+                print(f"First sentence after {time.perf_counter() - started:.2f}s")  # Debug
+            sentences.append(sentence)
+            if speak:
+                _speak(token, sid, sentence)
+            yield json.dumps({"type": "sentence", "text": sentence}) + "\n"
+    except Exception as e:
+        print(f"LLM stream error: {e}")
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+        return
+
+    response_text = " ".join(sentences)
+    print(f"LLM response: '{response_text}' ({time.perf_counter() - started:.2f}s)")  # Debug
+    _save_turn(chat_id, user_text, emotion_context, response_text)
+    yield json.dumps({"type": "done", "user_text": user_text, "gemini_text": response_text}) + "\n"
\ No newline at end of file
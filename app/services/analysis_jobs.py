@@ -0,0 +1,114 @@
+import threading
+from app.db import get_db
+from app.services.session_analysis import analyze_chat
+
+# --- Background Transcript Analysis ---
+# Analysis is one long LLM call, so it no longer runs inside the HTTP request.
+# Jobs live in the analysis_jobs table: a partial unique index allows only one
+# queued/running job per chat (concurrent requests share it), and workers claim
+# jobs with a conditional UPDATE so each job runs exactly once.
+_QUEUE_LOCK = threading.Lock()
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class AnalysisJobQueue:
+    def __init__(self, app, workers=2, poll_interval=5.0, stale_after=600):
+        self.app = app
+        self.workers = max(1, int(workers))
+        self.poll_interval = poll_interval
+        # A 'running' job older than this is assumed orphaned (process died) and re-claimed
+        self.stale_after = int(stale_after)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def start(self):
+        """Starts the worker threads on first use."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            print(f"Analysis job queue started with {self.workers} worker(s)")
+
+    def enqueue(self, db, chat_id, username):
+        """Queues analysis for a chat, or returns the job already queued/running for it."""
+        db.execute("INSERT OR IGNORE INTO analysis_jobs (chat_id, username) VALUES (?, ?)", (chat_id, username))
+        db.commit()
+        self.start()
+        self._wake.set()
+        return self.latest_job(db, chat_id)
+
+    @staticmethod
+    def latest_job(db, chat_id):
+        row = db.execute(
+            "SELECT id, chat_id, status, error, created_at, finished_at FROM analysis_jobs WHERE chat_id = ? ORDER BY id DESC LIMIT 1",
+            (chat_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _claim(self, db):
+        """Atomically moves the oldest runnable job to 'running'. Returns the job row or None."""
+        stale = f"-{self.stale_after} seconds"
+        while True:
+            row = db.execute("""
+                SELECT id, chat_id, username FROM analysis_jobs
+                WHERE status = 'queued' OR (status = 'running' AND started_at < datetime('now', ?))
+                ORDER BY id ASC LIMIT 1
+            """, (stale,)).fetchone()
+            if row is None:
+                return None
+            cur = db.execute("""
+                UPDATE analysis_jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND (status = 'queued' OR (status = 'running' AND started_at < datetime('now', ?)))
+            """, (row['id'], stale))
+            db.commit()
+            if cur.rowcount == 1:
+                return row
+            # Another worker won the race; look for the next job
+
+    def _finish(self, db, job_id, status, error=None):
+        db.execute(
+            "UPDATE analysis_jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, error, job_id)
+        )
+        db.commit()
+
+    def _run(self, db, job):
+        try:
+            analyze_chat(db, job['chat_id'], job['username'] or 'user')
+            self._finish(db, job['id'], 'done')
+        except Exception as e:
+            print(f"Analysis job {job['id']} for chat {job['chat_id']} failed: {e}")
+            db.rollback()
+            self._finish(db, job['id'], 'failed', str(e))
+
+    def _worker_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    db = get_db()
+                    job = self._claim(db)
+                    if job is not None:
+                        self._run(db, job)
+                        continue
+            except Exception as e:
+                print(f"Analysis worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+def get_analysis_queue(app):
+    """Returns the app's AnalysisJobQueue, creating it on first use."""
+    if "analysis_jobs" not in app.extensions:
+        with _QUEUE_LOCK:
+            if "analysis_jobs" not in app.extensions:
+                app.extensions["analysis_jobs"] = AnalysisJobQueue(
+                    app,
+                    workers=app.config.get('ANALYSIS_WORKERS', 2),
+                    stale_after=app.config.get('ANALYSIS_JOB_STALE_AFTER', 600),
+                )
+    return app.extensions["analysis_jobs"]
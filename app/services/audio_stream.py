@@ -0,0 +1,242 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.services.transcription_service import SAMPLE_RATE
+
+# --- Streaming Candidate Audio ---
+# The interview page uploads 16 kHz PCM in small chunks while the candidate is
+# still talking. An energy VAD splits the audio at pauses and each finished
+# segment is transcribed right away on the shared Whisper pool, so when the
+# candidate stops only the last few hundred milliseconds remain to decode.
+# Silence is never sent to Whisper.
+_STREAMS_LOCK = threading.Lock()
+
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+class EnergyVAD:
+    """
+    Frame-level speech detector on RMS energy with an adaptive noise floor.
+    The floor is seeded from the quietest frame of the first calibration_ms (capped at
+    max_seed_db, so a candidate who talks right away is not taken for background), then
+    follows non-speech frames quickly and speech frames slowly, so a background that
+    gets louder than the threshold cannot keep every frame "speech" for good.
+    """
+
+    def __init__(self, margin_db=12.0, min_speech_db=-50.0, floor_db=-60.0, adapt=0.05,
+                 speech_adapt=0.005, calibration_ms=300, max_seed_db=-40.0):
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        self.noise_db = floor_db
+        self.adapt = adapt
+        self.speech_adapt = speech_adapt
+        self.calibration_frames = max(1, calibration_ms // FRAME_MS)
+        self.max_seed_db = max_seed_db
+        self._seen = 0
+        self._quietest = None
+
+    def is_speech(self, frame):
+        rms = float(np.sqrt(np.mean(frame * frame))) + 1e-10
+        level = 20 * np.log10(rms)
+        if self._seen < self.calibration_frames:
+            self._seen += 1
+            self._quietest = level if self._quietest is None else min(self._quietest, level)
+            self.noise_db = min(self._quietest, self.max_seed_db)
+        speech = level > max(self.noise_db + self.margin_db, self.min_speech_db)
+        # Track background noise (fan, hum) so the threshold follows the room
+        self.noise_db += (self.speech_adapt if speech else self.adapt) * (level - self.noise_db)
+        return speech
+
+
+class AudioStream:
+    def __init__(self, transcriber, executor, owner=None, pause_ms=300, end_ms=1000, pad_ms=150,
+                 min_speech_ms=90, max_segment_s=15, max_seconds=120):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.transcriber = transcriber
+        self.executor = executor
+        self.vad = EnergyVAD()
+        self.pause_frames = max(1, pause_ms // FRAME_MS)
+        self.end_frames = max(1, end_ms // FRAME_MS)
+        self.pad_frames = pad_ms // FRAME_MS
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+        self.max_segment_frames = int(max_segment_s * 1000 // FRAME_MS)
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._preroll = []        # last pad_frames of silence before speech starts
+        self._segment = []        # frames of the segment being collected
+        self._speech_frames = 0   # speech frames in the current segment
+        self._silence_run = 0     # consecutive non-speech frames
+        self._heard_speech = False
+        self._futures = []        # per-segment transcriptions, in order
+        self._lock = threading.Lock()
+        self.samples_received = 0
+        self.end_of_utterance = False
+        self.finished = False
+        self.last_active = time.monotonic()
+
+    def feed_pcm16(self, data):
+        """Appends little-endian 16-bit mono PCM at 16 kHz."""
+        if len(data) % 2:
+            data = data[:-1]
+        return self.feed(np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0)
+
+    def feed(self, samples):
+        with self._lock:
+            if self.finished:
+                raise ValueError("Stream already finished.")
+            self.last_active = time.monotonic()
+            room = self.max_samples - self.samples_received
+            samples = samples[:max(0, room)]
+            self.samples_received += len(samples)
+
+            audio = np.concatenate([self._remainder, samples])
+            usable = len(audio) - len(audio) % FRAME_SAMPLES
+            self._remainder = audio[usable:]
+            for start in range(0, usable, FRAME_SAMPLES):
+                self._process_frame(audio[start:start + FRAME_SAMPLES])
+            return self.status(limit_reached=room <= len(samples))
+
+    def _process_frame(self, frame):
+        if self.vad.is_speech(frame):
+            if not self._segment:
+                self._segment = list(self._preroll)
+            self._segment.append(frame)
+            self._speech_frames += 1
+            self._silence_run = 0
+            if self._speech_frames >= self.min_speech_frames:
+                self._heard_speech = True
+                self.end_of_utterance = False
+            if len(self._segment) >= self.max_segment_frames:
+                self._cut()
+            return
+
+        self._silence_run += 1
+        self._preroll = (self._preroll + [frame])[-self.pad_frames:] if self.pad_frames else []
+        if self._segment:
+            self._segment.append(frame)
+            if self._silence_run >= self.pause_frames:
+                self._cut()
+        if self._heard_speech and self._silence_run >= self.end_frames:
+            self.end_of_utterance = True
+
+    def _cut(self):
+        """Sends the collected segment to Whisper (minus trailing silence beyond the pad)."""
+        segment, speech = self._segment, self._speech_frames
+        self._segment, self._speech_frames = [], 0
+        if speech < self.min_speech_frames:
+            return  # a click or a cough
+        trailing = min(self._silence_run, len(segment))
+        keep = len(segment) - max(0, trailing - self.pad_frames)
+        audio = np.concatenate(segment[:keep])
+        self._futures.append(self.executor.submit(self.transcriber.transcribe, audio))
+
+    def status(self, limit_reached=False):
+        return {
+            "stream_id": self.id,
+            "seconds": round(self.samples_received / SAMPLE_RATE, 2),
+            "segments": len(self._futures),
+            "speaking": bool(self._segment),
+            "end_of_utterance": self.end_of_utterance or limit_reached,
+        }
+
+    def finish(self):
+        """Transcribes whatever is left and returns (text, timings) for the whole utterance."""
+        with self._lock:
+            if not self.finished:
+                self.finished = True
+                if self._remainder.size:
+                    self._process_frame(np.pad(self._remainder, (0, FRAME_SAMPLES - self._remainder.size)))
+                if self._segment:
+                    self._cut()
+            futures = list(self._futures)
+
+        waited_at = time.perf_counter()
+        texts, decode = [], 0.0
+        for future in futures:
+            text, timings = future.result()
+            decode += timings["decode"]
+            if text.strip():
+                texts.append(text.strip())
+        return " ".join(texts), {
+            "segments": len(futures),
+            "decode": round(decode, 4),
+            # What the candidate actually waited for after they stopped talking
+            "tail_wait": round(time.perf_counter() - waited_at, 4),
+        }
+
+
+class AudioStreamRegistry:
+    """
+    Open streams by id, each owned by a logged-in user. Streams idle longer than ttl
+    seconds are dropped, and an owner keeps at most max_per_owner open streams (opening
+    another drops their least recently active one).
+    """
+
+    def __init__(self, transcriber, ttl=120, workers=2, max_per_owner=2, **stream_options):
+        self.transcriber = transcriber
+        self.ttl = ttl
+        self.max_per_owner = max(1, int(max_per_owner))
+        self.stream_options = stream_options
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stream-transcribe")
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def _evict_idle(self):
+        """Drops streams idle longer than the TTL (caller holds the lock)."""
+        now = time.monotonic()
+        for sid, s in list(self._streams.items()):
+            if now - s.last_active > self.ttl:
+                del self._streams[sid]
+
+    def create(self, owner):
+        if owner is None:
+            raise ValueError("Audio streams need a logged-in owner.")
+        stream = AudioStream(self.transcriber, self._executor, owner=owner, **self.stream_options)
+        with self._lock:
+            self._evict_idle()
+            owned = sorted((s for s in self._streams.values() if s.owner == owner), key=lambda s: s.last_active)
+            for s in owned[:max(0, len(owned) - self.max_per_owner + 1)]:
+                del self._streams[s.id]
+            self._streams[stream.id] = stream
+        return stream
+
+    def get(self, stream_id, owner=None):
+        with self._lock:
+            self._evict_idle()
+            stream = self._streams.get(stream_id)
+        return stream if stream is not None and stream.owner == owner else None
+
+    def pop(self, stream_id, owner=None):
+        with self._lock:
+            self._evict_idle()
+            stream = self._streams.get(stream_id)
+            if stream is None or stream.owner != owner:
+                return None
+            return self._streams.pop(stream_id)
+
+    def stats(self):
+        with self._lock:
+            return {"open_streams": len(self._streams)}
+
+
+def get_audio_streams(app, transcriber):
+    """Returns the app's AudioStreamRegistry, creating it on first use."""
+    if "audio_streams" not in app.extensions:
+        with _STREAMS_LOCK:
+            if "audio_streams" not in app.extensions:
+                config = app.config
+                app.extensions["audio_streams"] = AudioStreamRegistry(
+                    transcriber,
+                    ttl=config.get('AUDIO_STREAM_TTL', 120),
+                    workers=config.get('AUDIO_STREAM_WORKERS', 2),
+                    max_per_owner=config.get('AUDIO_STREAM_MAX_PER_USER', 2),
+                    pause_ms=config.get('VAD_PAUSE_MS', 300),
+                    end_ms=config.get('VAD_END_OF_UTTERANCE_MS', 1000),
+                    max_seconds=config.get('AUDIO_STREAM_MAX_SECONDS', 120),
+                )
+    return app.extensions["audio_streams"]
@@ -0,0 +1,128 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.services.heygen_client import get_heygen_client
+
+# --- Avatar Session Pre-warming ---
+# create_token + streaming.new are started in the background as soon as a user
+# heads for the interview room (Enter Interview / landing on /interview), so
+# "Start" only has to call streaming.start. One warm session per user; a
+# session that is not claimed within the TTL is stopped rather than handed out,
+# by a timer per session, so an idle server does not keep billable sessions open.
+_PREWARM_LOCK = threading.Lock()
+
+
+class AvatarPrewarmer:
+    def __init__(self, client, avatar_id, ttl=60, max_workers=2):
+        self.client = client
+        self.avatar_id = avatar_id
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="avatar-prewarm")
+        self._pending = {}  # user key -> (created_at, Future[(token, session data)], expiry Timer)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _create(self):
+        token = self.client.create_token()
+        return token, self.client.new_session(token, self.avatar_id)
+
+    def _release(self, future):
+        """Stops the remote session once its creation finishes (no-op if creation failed)."""
+        def stop(f):
+            if f.cancelled() or f.exception() is not None:
+                return
+            token, data = f.result()
+            self.client.stop_session_async(token, data['session_id'])
+        future.add_done_callback(stop)
+
+    def _pop(self, key):
+        """Removes the entry for `key` and cancels its expiry timer. Caller holds the lock."""
+        entry = self._pending.pop(key, None)
+        if entry is not None:
+            entry[2].cancel()
+        return entry
+
+    def _expire(self, key, future):
+        """Timer callback: stops the warm session for `key` if it is still unclaimed."""
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None or entry[1] is not future:
+                return  # claimed or discarded meanwhile
+            self._pop(key)
+            self.expired += 1
+        self._release(future)
+
+    def _reap(self):
+        """Drops and stops warm sessions older than the TTL whose timer has not fired yet. Caller holds the lock."""
+        now = time.monotonic()
+        for key, (created, future, _) in list(self._pending.items()):
+            if now - created > self.ttl:
+                self._pop(key)
+                self.expired += 1
+                self._release(future)
+
+    def prewarm(self, key):
+        """Starts creating a session for `key` unless a fresh one is already pending."""
+        with self._lock:
+            self._reap()
+            if key in self._pending:
+                return False
+            future = self._executor.submit(self._create)
+            timer = threading.Timer(self.ttl, self._expire, args=(key, future))
+            timer.daemon = True
+            self._pending[key] = (time.monotonic(), future, timer)
+            timer.start()
+        print(f"Pre-warming avatar session for user {key}")
+        return True
+
+    def claim(self, key):
+        """
+        Returns (token, session data) for a warm session, or None if there is none
+        (or it failed). Waits if creation is still in flight - that is still
+        sooner than starting over.
+        """
+        with self._lock:
+            self._reap()
+            entry = self._pop(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            result = entry[1].result()
+        except Exception as e:
+            print(f"Avatar pre-warm failed: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def discard(self, key):
+        """Stops an unclaimed warm session (e.g. the user left before pressing Start)."""
+        with self._lock:
+            entry = self._pop(key)
+        if entry is not None:
+            self._release(entry[1])
+
+    def stats(self):
+        with self._lock:
+            self._reap()
+            pending = len(self._pending)
+        return {"pending": pending, "hits": self.hits, "misses": self.misses, "expired": self.expired}
+
+
+def get_avatar_prewarmer(app):
+    """Returns the app's AvatarPrewarmer, or None when pre-warming is disabled or HeyGen is not configured."""
+    config = app.config
+    if not (config.get('HEYGEN_PREWARM_ENABLED') and config.get('HEYGEN_API_KEY') and config.get('HEYGEN_AVATAR_ID')):
+        return None
+    if "avatar_prewarm" not in app.extensions:
+        with _PREWARM_LOCK:
+            if "avatar_prewarm" not in app.extensions:
+                app.extensions["avatar_prewarm"] = AvatarPrewarmer(
+                    get_heygen_client(config),
+                    config['HEYGEN_AVATAR_ID'],
+                    ttl=config.get('HEYGEN_PREWARM_TTL', 60),
+                )
+    return app.extensions["avatar_prewarm"]
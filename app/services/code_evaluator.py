@@ -1,37 +1,185 @@
 import json
 import re
-import logging
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.services.llm_factory import LLMFactory
+from app.services.response_cache import ResponseCache, evaluation_key, hint_key, tests_key, code_fingerprint
+from app.services.static_checks import static_check
 from app.db import get_db
 
 class CodeEvaluator:
-    def __init__(self):
-        self.model_name = "gemini"
+    def __init__(self, cache_max_entries=512, cache_ttl=86400, sandbox=None):
+        # Gemini/Ollama selection, fallback and circuit breaking live in the shared router
+        self.router = LLMFactory.get_router()
+        self.cache = ResponseCache(cache_max_entries, cache_ttl)
+        # Optional CodeSandbox: Python submissions are scored by actually running tests
+        self.sandbox = sandbox
+
+    def _invoke(self, messages, call_type="code_eval"):
+        """Invoke the fastest healthy backend; a failing backend is retried once its circuit half-opens."""
+        return self.router.invoke(call_type, messages)
+
+    def _cached(self, key):
+        """Looks the key up in memory, then in code_checks (results persisted before a restart)."""
+        result = self.cache.get(key)
+        if result is not None:
+            return result
         try:
-            self.model = LLMFactory.get_google_chat()
-            logging.info("Using Gemini for code evaluation.")
+            row = get_db().execute("""
+                SELECT result_json FROM code_checks
+                WHERE cache_key = ? AND created_at >= datetime('now', ?)
+                ORDER BY id DESC LIMIT 1
+            """, (key, f"-{int(self.cache.ttl)} seconds")).fetchone()
         except Exception as e:
-            logging.warning(f"Gemini failed at init ({e}), falling back to Ollama for code evaluation.")
-            self.model = LLMFactory.get_ollama_chat()
-            self.model_name = "ollama"
-
-    def _invoke(self, messages):
-        """Invoke the current model, fallback to Ollama if Gemini fails at runtime."""
-        if self.model_name == "gemini":
-            try:
-                response = self.model.invoke(messages)
-                return response
-            except Exception as e:
-                logging.warning(f"Gemini failed at invoke: {e}. Falling back to Ollama for this and future calls.")
-                self.model = LLMFactory.get_ollama_chat()
-                self.model_name = "ollama"
-                return self.model.invoke(messages)
-        else:
-            return self.model.invoke(messages)
+            print(f"Cache lookup error: {e}")
+            row = None
+        if row is None:
+            self.cache.record_miss()
+            return None
+        result = json.loads(row['result_json'])
+        self.cache.put(key, result)
+        self.cache.record_db_hit()
+        return result
+
+    def _previous_result(self, user_id, language, question, code):
+        """The user's last result for this question if they resubmitted equivalent code."""
+        if user_id is None:
+            return None
+        try:
+            row = get_db().execute("""
+                SELECT language, code, result_json FROM code_checks
+                WHERE user_id = ? AND question_context = ? AND code IS NOT NULL
+                ORDER BY id DESC LIMIT 1
+            """, (user_id, question)).fetchone()
+        except Exception as e:
+            print(f"Previous submission lookup error: {e}")
+            return None
+        if row is None or (row['language'] or "").lower() != (language or "").lower():
+            return None
+        if code_fingerprint(row['code'], language) != code_fingerprint(code, language):
+            return None
+        result = json.loads(row['result_json'])
+        # A failed model call is worth retrying
+        return result if result.get('score') != "0/0" else None
 
     def evaluate(self, code, language, question, user_id=None, filename=None):
-        """Analyzes code and saves result to DB."""
+        """Analyzes code and saves result to DB. Identical submissions are served from the cache."""
+        # 1. Static stage: broken, empty or stub code is answered without a model call
+        problem = static_check(code, language)
+        if problem:
+            kind, message = problem
+            result = {"passed": False, "score": "0/0", "feedback": message, "test_results": [], "static_check": kind}
+            self._save_to_db(user_id, filename, language, question, code, result)
+            return result
+
+        # 2. Resubmission of the same code (ignoring comments/formatting) gets the same answer
+        previous = self._previous_result(user_id, language, question, code)
+        if previous is not None:
+            previous["duplicate"] = True
+            self._save_to_db(user_id, filename, language, question, code, previous)
+            return previous
+
+        key = evaluation_key(question, language, code)
+        cached = self._cached(key)
+        if cached is not None:
+            result = dict(cached)
+            # Keep the candidate's history; without a cache_key so hits don't extend the TTL
+            self._save_to_db(user_id, filename, language, question, code, result)
+            return result
+
+        try:
+            result = None
+            if self.sandbox is not None and (language or "").lower() == "python":
+                result = self._evaluate_locally(code, question)
+            if result is None:
+                result = self._evaluate_with_llm(code, language, question)
+            # Unparseable replies ("0/0") are stored for history but never reused
+            cacheable = result.get('score') != "0/0"
+            self._save_to_db(user_id, filename, language, question, code, result, key if cacheable else None)
+            if cacheable:
+                self.cache.put(key, dict(result))
+            return result
+        except Exception as e:
+            return {"passed": False, "score": "0/0", "feedback": str(e)}
+
+    def _get_test_cases(self, question):
+        """LLM-generated test cases for a question, generated once and cached like hints."""
+        key = tests_key(question)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        prompt = f"""
+        Write 5 test cases for this coding question, including edge cases.
+        Question: {question}
+        Return ONLY this JSON format (arguments and expected values must be plain JSON values):
+        {{
+            "function_name": "name_a_solution_would_use",
+            "tests": [
+                {{ "args": [ ...positional arguments... ], "expected": ... }}
+            ]
+        }}
+        """
+        response = self._invoke([HumanMessage(content=prompt)], call_type="test_cases")
+        spec = self._parse_response(response.content if hasattr(response, 'content') else response)
+        tests = spec.get('tests')
+        if not isinstance(tests, list) or not tests or not all(isinstance(t, dict) and 'expected' in t for t in tests):
+            return None
+        spec = {"function_name": spec.get('function_name'), "tests": tests}
+        self.cache.put(key, spec)
+        self._save_to_db(None, "tests", "python", question, None, spec, key, status="tests")
+        return spec
+
+    def _evaluate_locally(self, code, question):
+        """
+        Runs the code against generated tests in the sandbox; the score is the real pass
+        count and the LLM only writes qualitative feedback. Returns None to fall back to
+        LLM-only evaluation when no usable test cases could be generated.
+        """
+        try:
+            spec = self._get_test_cases(question)
+        except Exception as e:
+            print(f"Test case generation failed: {e}")
+            spec = None
+        if not spec:
+            return None
+
+        run = self.sandbox.run_python(code, spec['tests'], spec.get('function_name'))
+        results = run.get('results', [])
+        passed = sum(1 for r in results if r.get('passed'))
+        total = len(spec['tests'])
+        summary = run['error'] if run.get('error') else f"{passed}/{total} tests passed."
+        return {
+            "passed": not run.get('error') and passed == total,
+            "score": f"{passed}/{total}",
+            "feedback": self._get_feedback(code, question, results, summary),
+            "test_results": results,
+            "execution": "local",
+        }
+
+    def _get_feedback(self, code, question, results, summary):
+        failures = [r for r in results if not r.get('passed')][:3]
+        prompt = f"""
+        You are an Expert Code Reviewer. The code below was already executed against test cases.
+        Question: {question}
+        Code:
+        ```python
+        {code}
+        ```
+        Result: {summary}
+        Failing cases: {json.dumps(failures, default=str)}
+
+        Give brief qualitative feedback on correctness issues, complexity and style.
+        Do not re-run or predict test outputs. Plain text only.
+        """
+        try:
+            response = self._invoke([HumanMessage(content=prompt)], call_type="code_feedback")
+            return response.content if hasattr(response, 'content') else response
+        except Exception as e:
+            print(f"Feedback generation failed: {e}")
+            return summary
+
+    def _evaluate_with_llm(self, code, language, question):
+        """LLM-only evaluation (languages without a local runner): the model predicts test outputs."""
         prompt = f"""
         You are an Expert Code Evaluator.
         Question: {question}
@@ -52,29 +200,26 @@ class CodeEvaluator:
             ]
         }}
         """
-        try:
-            response = self._invoke([HumanMessage(content=prompt)])
-            result = self._parse_response(response.content if hasattr(response, 'content') else response)
-            self._save_to_db(user_id, filename, language, question, code, result)
-            return result
-        except Exception as e:
-            return {"passed": False, "score": "0/0", "feedback": str(e)}
+        response = self._invoke([HumanMessage(content=prompt)])
+        return self._parse_response(response.content if hasattr(response, 'content') else response)
 
     def get_hint(self, prompt):
         from langchain_core.messages import SystemMessage, HumanMessage
         
         system_prompt = "You are a helpful coding assistant. Provide concise, accurate hints for the given question without giving away the full solution. Only give 1 language agnostic hint. Do not include any other text before or after."
         
-        try:
-            response = self._invoke([SystemMessage(content=system_prompt), HumanMessage(content=prompt)])
-        except Exception as e:
-            import logging
-            logging.warning(f"Gemini failed at invoke: {e}. Falling back to Ollama.")
-            fallback_model = LLMFactory.get_ollama_chat()
-            response = fallback_model.invoke([SystemMessage(content=system_prompt), HumanMessage(content=prompt)])
+        key = hint_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached['hint']
+
+        response = self._invoke([SystemMessage(content=system_prompt), HumanMessage(content=prompt)], call_type="hint")
         
         if hasattr(response, 'content'):
-            return response.content
+            response = response.content
+        if response:
+            self.cache.put(key, {"hint": response})
+            self._save_to_db(None, "hint", None, prompt, None, {"hint": response}, key, status="hint")
         return response
 
     def _parse_response(self, text):
@@ -89,15 +234,15 @@ class CodeEvaluator:
         except:
             return {"passed": False, "feedback": text, "score": "0/0"}
 
-    def _save_to_db(self, user_id, filename, language, question, code, result):
+    def _save_to_db(self, user_id, filename, language, question, code, result, cache_key=None, status=None):
         try:
             db = get_db()
-            status = str(result.get('passed', False))
+            status = status or str(result.get('passed', False))
             result_json = json.dumps(result)
             db.execute("""
-                INSERT INTO code_checks (user_id, filename, language, question_context, code, result_json, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, filename, language, question, code, result_json, status))
+                INSERT INTO code_checks (user_id, filename, language, question_context, code, result_json, status, cache_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, filename, language, question, code, result_json, status, cache_key))
             db.commit()
         except Exception as e:
             print(f"DB Save Error: {e}")
\ No newline at end of file
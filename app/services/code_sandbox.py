@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import math
+import shlex
+import shutil
+import signal
+import secrets
+import tempfile
+import threading
+import subprocess
+
+try:
+    import pwd  # POSIX only
+except ImportError:
+    pwd = None
+
+# --- Local Test Execution ---
+# Submitted Python runs in a separate interpreter (python -I, empty env, throwaway
+# cwd) under CPU / memory / process / file-size limits, so scores come from real
+# test runs instead of LLM-predicted outputs. The semaphore bounds how many
+# sandbox processes run at once.
+#
+# Isolation is required, never assumed. Either `wrapper` is a jail command prefix
+# (nsjail, bwrap, ...: no network, read-only root, unprivileged user), or the app
+# runs as root and each run gets a fresh network/IPC namespace (unshare) and
+# switches to the unprivileged `user` before any candidate code runs. Without
+# either, the sandbox refuses to run code. A wrapper must keep inherited file
+# descriptors open (e.g. nsjail --pass_fd): results come back over a private pipe.
+#
+# The submitted code shares a process with the runner, so nothing the runner
+# reports is trusted blindly: expected values never leave this process, the
+# runner only returns raw outputs (tagged with a per-run nonce, one per test),
+# and pass/fail is decided here.
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_runner.py")
+
+
+def _unprivileged_ids(user):
+    """(uid, gid) of `user` if this process may switch to it in a new namespace, else None."""
+    if pwd is None or not user or os.geteuid() != 0 or not shutil.which("unshare"):
+        return None
+    try:
+        entry = pwd.getpwnam(user) if not str(user).isdigit() else pwd.getpwuid(int(user))
+    except KeyError:
+        return None
+    if entry.pw_uid == 0:
+        return None
+    return entry.pw_uid, entry.pw_gid
+
+
+def _equal(actual, expected):
+    if isinstance(actual, bool) or isinstance(expected, bool):
+        return actual is expected
+    if isinstance(actual, (int, float)) and isinstance(expected, (int, float)):
+        return math.isclose(actual, expected, rel_tol=1e-6, abs_tol=1e-9)
+    if isinstance(actual, list) and isinstance(expected, list):
+        return len(actual) == len(expected) and all(_equal(a, e) for a, e in zip(actual, expected))
+    if isinstance(actual, dict) and isinstance(expected, dict):
+        return actual.keys() == expected.keys() and all(_equal(actual[k], expected[k]) for k in actual)
+    return actual == expected
+
+
+def _read_pipe(fd, chunks):
+    with os.fdopen(fd, "rb") as pipe:
+        chunks.append(pipe.read())
+
+
+class CodeSandbox:
+    def __init__(self, timeout=2.0, memory_mb=256, max_workers=2, user="nobody", wrapper=None):
+        self.timeout = timeout  # per test case (and for loading the code)
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.wrapper = shlex.split(wrapper) if isinstance(wrapper, str) else list(wrapper or [])
+        self._ids = None if self.wrapper else _unprivileged_ids(user)
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    @property
+    def isolated(self):
+        return bool(self.wrapper) or self._ids is not None
+
+    def _command(self):
+        runner = [sys.executable, "-I", RUNNER_PATH]
+        if self.wrapper:
+            return self.wrapper + runner
+        # No network interfaces besides a down loopback, no shared IPC with the host
+        return ["unshare", "--net", "--ipc", "--"] + runner
+
+    def run_python(self, code, tests, function_name=None):
+        """
+        Runs `code` against tests ([{"args": [...], "expected": ...}]).
+        Returns {"results": [...], "error": str or None}. Whatever the code prints is
+        discarded and never returned.
+        """
+        if not self.isolated:
+            return {"results": [], "error": "Code execution is unavailable: no sandbox isolation on this host."}
+        # Wall-clock budget: every test may use its full timeout, plus interpreter startup
+        wall = self.timeout * (len(tests) + 1) + 5
+        nonce = secrets.token_hex(16)
+        read_fd, write_fd = os.pipe()
+        payload = json.dumps({
+            "code": code, "function_name": function_name, "timeout": self.timeout,
+            "tests": [{"args": test.get("args", [])} for test in tests],
+            # Applied by the runner itself (preexec_fn is unsafe in a threaded server)
+            "limits": {"cpu_seconds": int(wall) + 1, "memory_bytes": self.memory_bytes},
+            "drop_to": self._ids, "result_fd": write_fd, "nonce": nonce,
+        })
+        # Drained concurrently so a large result cannot fill the pipe and stall the runner
+        chunks = []
+        reader = threading.Thread(target=_read_pipe, args=(read_fd, chunks), daemon=True)
+        reader.start()
+        try:
+            with self._slots, tempfile.TemporaryDirectory(prefix="sandbox-") as workdir:
+                proc = subprocess.run(
+                    self._command(),
+                    input=payload, capture_output=True, text=True, timeout=wall, cwd=workdir,
+                    env={"PATH": os.defpath, "PYTHONHASHSEED": "0"}, pass_fds=(write_fd,),
+                )
+        except subprocess.TimeoutExpired:
+            return {"results": [], "error": f"Execution exceeded {wall:.0f}s."}
+        finally:
+            os.close(write_fd)
+            reader.join()
+
+        try:
+            out = json.loads(chunks[0])
+            return self._score(out, tests, nonce)
+        except (ValueError, AttributeError, TypeError, IndexError) as e:
+            # Killed by a limit (e.g. MemoryError during startup, SIGXCPU), crashed, or
+            # exited without a well-formed result. The sandbox's stderr is logged, not
+            # returned to the client.
+            print(f"Sandbox run failed (exit code {proc.returncode}, {e}): {(proc.stderr or '')[-500:]}")
+            if proc.returncode < 0:
+                try:
+                    return {"results": [], "error": f"Execution failed: killed by {signal.Signals(-proc.returncode).name}."}
+                except ValueError:
+                    pass
+            return {"results": [], "error": f"Execution failed: exit code {proc.returncode}."}
+
+    @staticmethod
+    def _score(out, tests, nonce):
+        """Checks the runner's raw outputs and compares them with the expected values."""
+        if out.get("nonce") != nonce:
+            raise ValueError("result is not from this run")
+        error, raw = out.get("error"), out.get("results")
+        if not isinstance(raw, list) or len(raw) != (0 if error else len(tests)):
+            raise ValueError(f"expected {len(tests)} results, got {raw!r:.80}")
+        results = []
+        for i, (test, r) in enumerate(zip(tests, raw), 1):
+            args = test.get("args", [])
+            result = {
+                "test_case": i, "input": args if isinstance(args, list) else [args],
+                "expected": test.get("expected"), "actual_output": r.get("actual_output"),
+                "passed": False, "time_ms": r.get("time_ms"),
+            }
+            if r.get("error"):
+                result["error"] = str(r["error"])
+            else:
+                result["passed"] = _equal(result["actual_output"], result["expected"])
+            results.append(result)
+        return {"results": results, "error": error}
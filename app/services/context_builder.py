@@ -0,0 +1,238 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from app.db import get_db
+from app.services.llm_factory import LLMFactory
+from app.services.response_cache import ResponseCache
+
+# --- Interview Context Builder ---
+# Keeps the per-turn prompt for /interact bounded however long the interview runs:
+#  * the static part of the system prompt (skills, questions, rules) is built once
+#    per chat and reused byte-for-byte, so providers with prefix/prompt caching
+#    (Ollama's KV cache, Gemini implicit caching) can reuse it; per-turn data (the
+#    emotion reading) goes at the end instead of in the middle;
+#  * turns that fall out of the recent window are folded into a rolling summary
+#    (chat_summaries) by a background worker, a batch at a time; until then they
+#    stay in the prompt verbatim, so no turn is ever in neither;
+#  * unsummarized turns are added newest-first until the token budget is spent.
+CHARS_PER_TOKEN = 4
+_BUILDER_LOCK = threading.Lock()
+
+RULES = """
+    Rules:
+    1. Ask one question at a time based on the Context.
+    2. Be professional but conversational.
+    3. Keep responses concise (under 3 sentences) suitable for a spoken avatar.
+    4. The candidate's current emotion reading, when available, follows their latest answer.
+    """
+
+SUMMARY_PROMPT = """Update the running summary of a job interview with the new turns below.
+Keep what matters for the rest of the interview: topics and questions already covered,
+the candidate's claims, strengths and weak spots. Plain prose, at most {words} words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token); avoids a tokenizer dependency per provider."""
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " ..."
+
+
+class ContextBuilder:
+    def __init__(self, app, token_budget=3000, recent_messages=6, summary_batch=4, summary_max_tokens=250,
+                 prefix_cache_entries=256, prefix_ttl=6 * 3600):
+        self.app = app
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        # Summarize only once this many messages have left the recent window
+        self.summary_batch = summary_batch
+        self.summary_max_tokens = summary_max_tokens
+        self._prefixes = ResponseCache(max_entries=prefix_cache_entries, ttl=prefix_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self.summaries = 0
+        self.summary_failures = 0
+        self.prompt_tokens = 0
+        self.turns = 0
+
+    # --- Static prefix ---
+
+    def system_prefix(self, chat_id, resume_skills, jd_skills, questions):
+        """The cacheable head of the system prompt, identical on every turn of a chat."""
+        fingerprint = hashlib.sha256(
+            json.dumps([resume_skills, jd_skills, questions], sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        key = f"{chat_id}:{fingerprint}"
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            self._prefixes.record_miss()
+            prefix = self._render_prefix(resume_skills, jd_skills, questions)
+            self._prefixes.put(key, prefix)
+        return prefix
+
+    def _render_prefix(self, resume_skills, jd_skills, questions):
+        def render(qs):
+            return f"""
+    You are an AI Interviewer.
+    Context:
+    Resume Skills: {resume_skills}
+    JD Skills: {jd_skills}
+    Questions: {qs}
+    {RULES}"""
+        # The prefix may use at most half the budget; drop trailing questions beyond that
+        questions = list(questions or [])
+        prefix = render(questions)
+        while questions and estimate_tokens(prefix) > self.token_budget // 2:
+            questions.pop()
+            prefix = render(questions)
+        return prefix
+
+    # --- Per-turn context ---
+
+    def build(self, db, chat_id, user_text, emotion_context, resume_skills, jd_skills, questions):
+        """Returns the LangChain message list for one /interact turn."""
+        system = self.system_prefix(chat_id, resume_skills, jd_skills, questions)
+        summary, through_id = self._load_summary(db, chat_id) if chat_id else ("", 0)
+        if summary:
+            system += f"\n    Earlier in this interview (summary):\n    {_truncate(summary, self.summary_max_tokens)}\n"
+
+        latest = user_text
+        if emotion_context and emotion_context != "{}":
+            latest += f"\n\n[Candidate emotion: {emotion_context}]"
+
+        remaining = self.token_budget - estimate_tokens(system) - estimate_tokens(latest)
+        history = []
+        if chat_id:
+            # Every turn after the summary, not just the recent window: turns that left the
+            # window but are not summarized yet would otherwise be missing from the prompt
+            rows = db.execute(
+                "SELECT id, role, message FROM messages WHERE chat_id = ? AND id > ? ORDER BY id DESC",
+                (chat_id, through_id)
+            )
+            over_budget = False
+            for row in rows:  # rows are read lazily, so a long backlog costs nothing past the budget
+                cost = estimate_tokens(row['message'])
+                if cost > remaining:
+                    over_budget = True
+                    break
+                remaining -= cost
+                history.append(row)
+            # Everything older than the recent window should end up in the summary; turns the
+            # budget already dropped are summarized right away rather than a batch at a time
+            window = history[:self.recent_messages]
+            oldest_kept = window[-1]['id'] if window else None
+            self._maybe_summarize(db, chat_id, through_id, oldest_kept, 1 if over_budget else self.summary_batch)
+
+        messages = [SystemMessage(content=system)]
+        # Reconstruct history in chronological order
+        for row in reversed(history):
+            if row['role'] == 'user':
+                messages.append(HumanMessage(content=row['message']))
+            else:
+                messages.append(AIMessage(content=row['message']))
+        messages.append(HumanMessage(content=latest))
+
+        with self._lock:
+            self.turns += 1
+            self.prompt_tokens += self.token_budget - remaining
+        return messages
+
+    # --- Rolling summary ---
+
+    def _load_summary(self, db, chat_id):
+        row = db.execute(
+            "SELECT summary, through_message_id FROM chat_summaries WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        return (row['summary'], row['through_message_id']) if row else ("", 0)
+
+    def _maybe_summarize(self, db, chat_id, through_id, oldest_kept, min_messages):
+        bound = oldest_kept if oldest_kept is not None else 2 ** 62
+        row = db.execute(
+            "SELECT COUNT(*) AS n, MAX(id) AS last_id FROM messages WHERE chat_id = ? AND id > ? AND id < ?",
+            (chat_id, through_id, bound)
+        ).fetchone()
+        if row['n'] < min_messages:
+            return
+        with self._lock:
+            if chat_id in self._in_flight:
+                return
+            self._in_flight.add(chat_id)
+        self._executor.submit(self._summarize, chat_id, row['last_id'])
+
+    def _summarize(self, chat_id, upto_id):
+        try:
+            with self.app.app_context():
+                db = get_db()
+                summary, through_id = self._load_summary(db, chat_id)
+                rows = db.execute(
+                    "SELECT role, message FROM messages WHERE chat_id = ? AND id > ? AND id <= ? ORDER BY id",
+                    (chat_id, through_id, upto_id)
+                ).fetchall()
+                if not rows:
+                    return
+                turns = "\n".join(f"{r['role'].upper()}: {r['message']}" for r in rows)
+                prompt = SUMMARY_PROMPT.format(words=int(self.summary_max_tokens * 0.75),
+                                               summary=summary or "(none yet)", turns=turns)
+                response = LLMFactory.get_router().invoke("context_summary", [HumanMessage(content=prompt)])
+                text = (response.content if hasattr(response, 'content') else str(response)).strip()
+                # Never move the summary backwards if an older run finishes late
+                db.execute("""
+                    INSERT INTO chat_summaries (chat_id, summary, through_message_id, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(chat_id) DO UPDATE SET
+                        summary = excluded.summary,
+                        through_message_id = excluded.through_message_id,
+                        updated_at = excluded.updated_at
+                    WHERE excluded.through_message_id > chat_summaries.through_message_id
+                """, (chat_id, _truncate(text, self.summary_max_tokens), upto_id))
+                db.commit()
+                with self._lock:
+                    self.summaries += 1
+        except Exception as e:
+            print(f"Context summary for chat {chat_id} failed: {e}")
+            with self._lock:
+                self.summary_failures += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(chat_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "turns": self.turns,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.turns, 1) if self.turns else None,
+                "summaries": self.summaries,
+                "summary_failures": self.summary_failures,
+                "summaries_in_flight": len(self._in_flight),
+                "prefix_cache": self._prefixes.stats(),
+            }
+
+
+def get_context_builder(app):
+    """Returns the app's ContextBuilder, creating it on first use."""
+    if "context_builder" not in app.extensions:
+        with _BUILDER_LOCK:
+            if "context_builder" not in app.extensions:
+                app.extensions["context_builder"] = ContextBuilder(
+                    app,
+                    token_budget=app.config.get('CONTEXT_TOKEN_BUDGET', 3000),
+                    recent_messages=app.config.get('CONTEXT_RECENT_MESSAGES', 6),
+                    summary_batch=app.config.get('CONTEXT_SUMMARY_BATCH', 4),
+                    summary_max_tokens=app.config.get('CONTEXT_SUMMARY_MAX_TOKENS', 250),
+                )
+    return app.extensions["context_builder"]
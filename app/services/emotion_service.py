@@ -1,7 +1,8 @@
 import cv2
 import base64
 import numpy as np
-from datetime import datetime
+import time
+import threading
 import importlib
 import inspect
 
@@ -26,55 +27,264 @@ except Exception:
                 "or inspect the package for the correct class path."
             )
 
-class EmotionService:
+EMOTION_LIST = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale, which is far cheaper than a full decode
+_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+class _SessionEmotions:
+    """Running sums for one interview session, so averaging never rescans old frames."""
+    __slots__ = ("sums", "count", "current", "last_seen", "last_faces", "last_thumb", "skip_streak")
+
     def __init__(self):
+        self.sums = {emo: 0.0 for emo in EMOTION_LIST}
+        self.count = 0
+        self.current = {emo: 0.0 for emo in EMOTION_LIST}
+        self.last_seen = time.monotonic()
+
+        # Scene-change sampling: what the detector saw on the last processed frame
+        self.last_faces = []
+        self.last_thumb = None
+        self.skip_streak = 0
+
+    def add(self, emotions):
+        for emo in EMOTION_LIST:
+            self.sums[emo] += emotions.get(emo, 0)
+        self.count += 1
+        self.current = emotions.copy()
+        self.last_seen = time.monotonic()
+
+    def reset(self):
+        self.sums = {emo: 0.0 for emo in EMOTION_LIST}
+        self.count = 0
+
+class EmotionService:
+    def __init__(self, detector=None, session_ttl=1800, batch_size=8, max_frame_age=2.0,
+                 max_frame_width=480, decode_reduction=1, scene_threshold=4.0, max_skip=10):
         # example usage; keep mtcnn arg as before
-        self.detector = FER(mtcnn=False)
-        self.log_data = []
-        self.emotion_list = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
-        self.current_emotions = {emo: 0.0 for emo in self.emotion_list}
+        self.detector = detector or FER(mtcnn=False)
+        self.emotion_list = EMOTION_LIST
+        self.session_ttl = session_ttl
 
-    def process_frame(self, frame_base64):
-        """Decodes base64 frame and detects emotions."""
-        try:
-            if ',' in frame_base64:
-                frame_base64 = frame_base64.split(',')[1]
+        # Frames are shrunk to the detector's working size before face detection
+        self.max_frame_width = max_frame_width
+        self.decode_flag = _REDUCED_DECODE_FLAGS.get(decode_reduction, cv2.IMREAD_COLOR)
 
-            img_bytes = base64.b64decode(frame_base64)
-            nparr = np.frombuffer(img_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Frames whose thumbnail differs from the last processed one by less than
+        # scene_threshold (mean gray level, 0-255) reuse its emotions, at most max_skip
+        # times in a row. A threshold of 0 disables sampling.
+        self.scene_threshold = scene_threshold
+        self.max_skip = max_skip
+        self._sampling_stats = {"frames_skipped": 0, "frames_detected": 0}
 
+        # Emotion state is kept per chat_id so concurrent candidates never mix
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+
+        # Background inference queue: at most one pending frame per session (latest
+        # frame wins). The worker drains up to batch_size sessions per pass; FER still
+        # analyses them one frame at a time (its TFLite classifier takes one face per call).
+        self.batch_size = batch_size
+        self.max_frame_age = max_frame_age
+        self._pending = {}
+        self._pending_cond = threading.Condition()
+        self._worker = None
+        self._worker_stats = {"submitted": 0, "processed": 0, "dropped": 0, "passes": 0}
+
+    def decode_frame(self, frame_base64):
+        """Decodes a base64 (optionally data-URL) JPEG into a BGR image, or None."""
+        if ',' in frame_base64:
+            frame_base64 = frame_base64.split(',')[1]
+
+        return self.decode_frame_bytes(base64.b64decode(frame_base64))
+
+    def decode_frame_bytes(self, img_bytes):
+        """Decodes raw JPEG bytes at reduced scale and downsizes to max_frame_width."""
+        nparr = np.frombuffer(img_bytes, np.uint8)
+        frame = cv2.imdecode(nparr, self.decode_flag)
+        if frame is None:
+            return None
+
+        height, width = frame.shape[:2]
+        if self.max_frame_width and width > self.max_frame_width:
+            scale = self.max_frame_width / width
+            frame = cv2.resize(frame, (self.max_frame_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        return frame
+
+    def process_frame(self, frame_base64, session_key):
+        """Decodes base64 frame and detects emotions for the given session (synchronously)."""
+        try:
+            frame = self.decode_frame(frame_base64)
             if frame is None:
                 return False
+            thumb = self._scene_thumbnail(frame)
+            if self._reuse_if_unchanged(thumb, session_key):
+                return True
 
             results = self.detector.detect_emotions(frame)
-            if results:
-                self._log_results(results)
+            self._log_results(results or [], session_key, thumb)
             return True
         except Exception as e:
             print(f"Emotion processing error: {e}")
             return False
 
-    def _log_results(self, results):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for res in results:
-            emotions = res["emotions"]
-            self.current_emotions = emotions.copy()
-            self.log_data.append({"time": timestamp, **emotions})
-
-    def get_and_reset_average(self):
-        """Calculates average emotion since last reset and clears log."""
-        if not self.log_data:
-            return {emo: 0.0 for emo in self.emotion_list}
-
-        averages = {}
-        count = len(self.log_data)
-        for emo in self.emotion_list:
-            total = sum(row.get(emo, 0) for row in self.log_data)
-            averages[emo] = round(total / count, 4)
-
-        self.log_data = []  # Reset
-        return averages
-    
-    def clear_logs(self):
-        self.log_data = []
\ No newline at end of file
+    # --- Scene-change sampling ---
+
+    @staticmethod
+    def _thumbnail(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _scene_thumbnail(self, frame):
+        """Thumbnail used for scene-change comparison, or None when sampling is off."""
+        return self._thumbnail(frame) if self.scene_threshold else None
+
+    def _get_state(self, session_key):
+        """Returns the session's state, creating it if needed. Caller holds the lock."""
+        state = self._sessions.get(session_key)
+        if state is None:
+            state = self._sessions[session_key] = _SessionEmotions()
+        return state
+
+    def _reuse_if_unchanged(self, thumb, session_key):
+        """
+        Skips detection when the frame barely differs from the session's last analysed
+        one, re-logging that frame's emotions instead. Returns True if skipped.
+        The reference frame itself only moves in _log_results, i.e. once a frame has
+        really been analysed (a queued frame may still be dropped).
+        """
+        if thumb is None:
+            return False
+
+        with self._lock:
+            state = self._get_state(session_key)
+            state.last_seen = time.monotonic()
+            if (state.last_thumb is not None and state.skip_streak < self.max_skip
+                    and np.abs(thumb - state.last_thumb).mean() < self.scene_threshold):
+                state.skip_streak += 1
+                for emotions in state.last_faces:
+                    state.add(emotions)
+                self._sampling_stats["frames_skipped"] += 1
+                return True
+            return False
+
+    # --- Background inference queue ---
+
+    def submit_frame(self, frame, session_key):
+        """Queues a decoded frame for the inference worker and returns immediately."""
+        thumb = self._scene_thumbnail(frame)
+        if self._reuse_if_unchanged(thumb, session_key):
+            return
+        with self._pending_cond:
+            if session_key in self._pending:
+                # The session is behind; the older frame is stale, keep only the newest
+                self._worker_stats["dropped"] += 1
+            self._pending[session_key] = (frame, thumb, time.monotonic())
+            self._worker_stats["submitted"] += 1
+            self._ensure_worker()
+            self._pending_cond.notify()
+
+    def _ensure_worker(self):
+        """Starts the worker thread on first use. Caller holds the pending lock."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._worker_loop, name="emotion-worker", daemon=True)
+            self._worker.start()
+
+    def _take_batch(self):
+        """Blocks until frames are pending, then removes up to batch_size of them."""
+        with self._pending_cond:
+            while not self._pending:
+                self._pending_cond.wait()
+            keys = list(self._pending)[:self.batch_size]
+            batch = [(k, *self._pending.pop(k)) for k in keys]
+
+        now = time.monotonic()
+        fresh = [(k, frame, thumb) for k, frame, thumb, queued_at in batch if now - queued_at <= self.max_frame_age]
+        if len(fresh) < len(batch):
+            with self._pending_cond:
+                self._worker_stats["dropped"] += len(batch) - len(fresh)
+        return fresh
+
+    def _detect_frames(self, frames):
+        """Runs the detector on each frame in turn (off the request thread)."""
+        return [self.detector.detect_emotions(f) for f in frames]
+
+    def _worker_loop(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                all_results = self._detect_frames([frame for _, frame, _ in batch])
+            except Exception as e:
+                print(f"Emotion worker error: {e}")
+                continue
+
+            for (session_key, _, thumb), results in zip(batch, all_results):
+                self._log_results(results or [], session_key, thumb)
+            with self._pending_cond:
+                self._worker_stats["processed"] += len(batch)
+                self._worker_stats["passes"] += 1
+
+    def stats(self):
+        with self._pending_cond:
+            stats = dict(self._worker_stats)
+            stats["pending"] = len(self._pending)
+        with self._lock:
+            stats.update(self._sampling_stats)
+            stats["sessions"] = len(self._sessions)
+        return stats
+
+    def _log_results(self, results, session_key, thumb=None):
+        with self._lock:
+            state = self._get_state(session_key)
+            if thumb is not None:
+                # This frame was analysed: it becomes the scene-change reference
+                state.last_thumb = thumb
+                state.skip_streak = 0
+                self._sampling_stats["frames_detected"] += 1
+            state.last_faces = [res["emotions"] for res in results]
+            for emotions in state.last_faces:
+                state.add(emotions)
+            self._evict_idle()
+
+    def _evict_idle(self):
+        """Drops sessions that have not sent a frame within the TTL. Caller holds the lock."""
+        now = time.monotonic()
+        # Scanning every frame would be wasteful; once a minute is plenty
+        if now - self._last_eviction < 60:
+            return
+        self._last_eviction = now
+        expired = [k for k, st in self._sessions.items() if now - st.last_seen > self.session_ttl]
+        for k in expired:
+            del self._sessions[k]
+
+    def get_current_emotions(self, session_key):
+        with self._lock:
+            state = self._sessions.get(session_key)
+            return dict(state.current) if state else {emo: 0.0 for emo in self.emotion_list}
+
+    def get_and_reset_average(self, session_key):
+        """Returns the average emotion since the last reset for this session and resets it."""
+        with self._lock:
+            state = self._sessions.get(session_key)
+            if state is None or state.count == 0:
+                return {emo: 0.0 for emo in self.emotion_list}
+
+            averages = {emo: round(state.sums[emo] / state.count, 4) for emo in self.emotion_list}
+            state.reset()
+            return averages
+
+    def clear_logs(self, session_key=None):
+        """Forgets one session's emotions, or every session's when no key is given."""
+        with self._lock:
+            if session_key is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_key, None)
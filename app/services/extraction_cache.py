@@ -0,0 +1,65 @@
+import hashlib
+from flask import current_app
+from app.db import get_db
+
+# --- Persistent PDF Text / OCR Cache ---
+# Keyed by content hash so re-uploading the same resume or JD (even under a different
+# filename, or against a different JD) skips PyMuPDF and EasyOCR entirely.
+# Both tables are bounded; the least recently used rows are evicted first.
+
+
+def file_hash(path):
+    """MD5 of a file on disk, read in chunks (matches dashboard.calculate_file_hash)."""
+    hasher = hashlib.md5()
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(65536), b''):
+            hasher.update(buf)
+    return hasher.hexdigest()
+
+
+def get_document_text(content_hash):
+    db = get_db()
+    row = db.execute("SELECT text FROM extraction_cache WHERE content_hash = ?", (content_hash,)).fetchone()
+    if row is None:
+        return None
+    db.execute("UPDATE extraction_cache SET last_used = CURRENT_TIMESTAMP WHERE content_hash = ?", (content_hash,))
+    db.commit()
+    return row['text']
+
+
+def put_document_text(content_hash, text):
+    db = get_db()
+    db.execute(
+        "INSERT OR REPLACE INTO extraction_cache (content_hash, text, last_used) VALUES (?, ?, CURRENT_TIMESTAMP)",
+        (content_hash, text)
+    )
+    db.execute("""
+        DELETE FROM extraction_cache WHERE content_hash NOT IN (
+            SELECT content_hash FROM extraction_cache ORDER BY last_used DESC LIMIT ?
+        )
+    """, (current_app.config.get('EXTRACTION_CACHE_MAX_DOCUMENTS', 500),))
+    db.commit()
+
+
+def get_page_text(page_hash):
+    db = get_db()
+    row = db.execute("SELECT text FROM ocr_page_cache WHERE page_hash = ?", (page_hash,)).fetchone()
+    if row is None:
+        return None
+    db.execute("UPDATE ocr_page_cache SET last_used = CURRENT_TIMESTAMP WHERE page_hash = ?", (page_hash,))
+    db.commit()
+    return row['text']
+
+
+def put_page_text(page_hash, text):
+    db = get_db()
+    db.execute(
+        "INSERT OR REPLACE INTO ocr_page_cache (page_hash, text, last_used) VALUES (?, ?, CURRENT_TIMESTAMP)",
+        (page_hash, text)
+    )
+    db.execute("""
+        DELETE FROM ocr_page_cache WHERE page_hash NOT IN (
+            SELECT page_hash FROM ocr_page_cache ORDER BY last_used DESC LIMIT ?
+        )
+    """, (current_app.config.get('OCR_PAGE_CACHE_MAX_PAGES', 2000),))
+    db.commit()
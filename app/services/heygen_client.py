@@ -0,0 +1,136 @@
+import queue
+import threading
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- HeyGen Streaming Avatar Client ---
+# One keep-alive session for every avatar call (no fresh TCP/TLS handshake per request),
+# explicit timeouts, and a background dispatcher so /interact never waits on
+# streaming.task. The base URL is configurable so tests can point it at a local stub.
+_SHARED_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+DEFAULT_BASE_URL = "https://api.heygen.com/v1"
+
+
+class HeyGenClient:
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, connect_timeout=3.05, read_timeout=15,
+                 retries=2, pool_size=10, dispatch_workers=4):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Retry only when the request provably did not take effect: connection failures
+        # and 429/503, which HeyGen returns before doing any work. Read timeouts and
+        # gateway errors (502/504: the request may have reached HeyGen) are not retried,
+        # since a repeated streaming.task would make the avatar say the sentence twice.
+        retry = Retry(
+            total=retries, connect=retries, read=0, status=retries,
+            status_forcelist=(429, 503), allowed_methods=frozenset({"POST"}),
+            backoff_factor=0.3, respect_retry_after_header=True, raise_on_status=False,
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Tasks for one avatar session always land on the same worker, so they stay in order
+        self._queues = [queue.Queue() for _ in range(max(1, dispatch_workers))]
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.dispatched = 0
+        self.failed = 0
+
+    def _post(self, endpoint, json=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {'X-API-KEY': self.api_key}
+        resp = self.session.post(f"{self.base_url}/{endpoint}", json=json, headers=headers, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json() if resp.content else {}
+
+    # --- Session lifecycle ---
+
+    def create_token(self):
+        return self._post("streaming.create_token")['data']['token']
+
+    def new_session(self, token, avatar_id, quality="medium", video_encoding="VP8"):
+        body = {"version": "v2", "avatar_id": avatar_id, "quality": quality, "video_encoding": video_encoding}
+        return self._post("streaming.new", json=body, token=token)['data']
+
+    def start_session(self, token, session_id):
+        return self._post("streaming.start", json={"session_id": session_id}, token=token)
+
+    def stop_session(self, token, session_id):
+        return self._post("streaming.stop", json={"session_id": session_id}, token=token)
+
+    def send_task(self, token, session_id, text, task_type="repeat"):
+        return self._post("streaming.task", json={"session_id": session_id, "text": text, "task_type": task_type}, token=token)
+
+    # --- Fire-and-forget dispatch ---
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        with self._workers_lock:
+            if self._workers:
+                return
+            for i, q in enumerate(self._queues):
+                t = threading.Thread(target=self._worker_loop, args=(q,), name=f"heygen-dispatch-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def _worker_loop(self, q):
+        while True:
+            fn, args = q.get()
+            try:
+                fn(*args)
+                with self._stats_lock:
+                    self.dispatched += 1
+            except Exception as e:
+                with self._stats_lock:
+                    self.failed += 1
+                print(f"HeyGen Error ({fn.__name__}): {e}")
+            finally:
+                q.task_done()
+
+    def dispatch(self, session_id, fn, *args):
+        """Queues fn(*args) on the worker that owns session_id and returns immediately."""
+        self._ensure_workers()
+        self._queues[zlib.crc32(str(session_id).encode()) % len(self._queues)].put((fn, args))
+
+    def send_task_async(self, token, session_id, text, task_type="repeat"):
+        self.dispatch(session_id, self.send_task, token, session_id, text, task_type)
+
+    def stop_session_async(self, token, session_id):
+        self.dispatch(session_id, self.stop_session, token, session_id)
+
+    def flush(self):
+        """Blocks until every queued call has been sent (used by tests and shutdown)."""
+        for q in self._queues:
+            q.join()
+
+    def stats(self):
+        return {
+            "queued": sum(q.qsize() for q in self._queues),
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+        }
+
+
+def get_heygen_client(config):
+    """Returns the process-wide HeyGenClient, creating it on first use."""
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None:
+        with _CLIENT_LOCK:
+            if _SHARED_CLIENT is None:
+                _SHARED_CLIENT = HeyGenClient(
+                    config.get('HEYGEN_API_KEY'),
+                    base_url=config.get('HEYGEN_BASE_URL', DEFAULT_BASE_URL),
+                    connect_timeout=config.get('HEYGEN_CONNECT_TIMEOUT', 3.05),
+                    read_timeout=config.get('HEYGEN_READ_TIMEOUT', 15),
+                    retries=config.get('HEYGEN_RETRIES', 2),
+                    dispatch_workers=config.get('HEYGEN_DISPATCH_WORKERS', 4),
+                )
+    return _SHARED_CLIENT
@@ -1,12 +1,19 @@
 import fitz  # PyMuPDF
 import io
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
 import json
 import numpy as np
 import easyocr
 from PIL import Image
+from flask import current_app
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from app.services.llm_factory import LLMFactory
+from app.services import extraction_cache
+from app.services.skill_matcher import match_skills
+from app.services.pdf_render import render_page_png, get_render_pool
 import torch
 
 # --- Global Caching for OCR ---
@@ -22,14 +29,62 @@ def get_ocr_reader():
         _SHARED_OCR_READER = easyocr.Reader(['en'], gpu=torch.cuda.is_available())
     return _SHARED_OCR_READER
 
+# --- Shared pool for independent LLM calls ---
+# LLM calls are network-bound, so a thread pool lets independent chains overlap.
+_LLM_POOL = None
+
+def get_llm_pool():
+    global _LLM_POOL
+    if _LLM_POOL is None:
+        _LLM_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+    return _LLM_POOL
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, round(time.perf_counter() - started, 3)
+
+def _ocr_image(reader, png_bytes):
+    """Runs EasyOCR over a rendered page and returns its text."""
+    img = Image.open(io.BytesIO(png_bytes)).convert("RGB")
+    # detail=0 returns strings; paragraph=True attempts to merge lines
+    results = reader.readtext(np.array(img), detail=0, paragraph=True)
+    return "\n".join(results) if results else ""
+
 class JDAnalyzer:
     def __init__(self):
         self.llm = LLMFactory.get_ollama_tool()
         # Note: We no longer initialize self.reader here to prevent bottlenecks.
 
-    def extract_text_from_pdf(self, pdf_path):
-        """Extracts text from PDF using OCR (EasyOCR) only if necessary."""
-        all_text = ""
+    @staticmethod
+    def _page_hash(doc, page):
+        """Hashes a page's content stream and embedded images without rendering it."""
+        hasher = hashlib.md5()
+        hasher.update(page.read_contents() or b"")
+        for img in page.get_images(full=True):
+            hasher.update(doc.xref_stream_raw(img[0]) or b"")
+        return hasher.hexdigest()
+
+    def extract_text_from_pdf(self, pdf_path, content_hash=None):
+        """
+        Extracts text from PDF using OCR (EasyOCR) only if necessary.
+        Results are cached by file content hash (and OCR output by page hash), so
+        re-uploaded documents skip PyMuPDF and EasyOCR entirely.
+        """
+        if content_hash is None:
+            content_hash = extraction_cache.file_hash(pdf_path)
+        cached = extraction_cache.get_document_text(content_hash)
+        if cached:
+            print(f"Extraction cache hit for {pdf_path}")
+            return cached
+
+        dpi = current_app.config.get('OCR_DPI', 300)
+        max_ocr_pages = current_app.config.get('OCR_MAX_PAGES', 20)
+
+        # One slot per page, in page order; image-only pages are filled in after OCR
+        page_texts = []
+        ocr_pages = []  # (slot, page index, page hash)
+        truncated = False
         try:
             doc = fitz.open(pdf_path)
             for i in range(doc.page_count):
@@ -44,37 +99,72 @@ class JDAnalyzer:
                     except Exception:
                         page_text = ""
 
-                # 2. If text exists, use it. If not, Fallback to OCR.
+                # 2. If text exists, use it. If not, Fallback to (cached) OCR.
                 if page_text and page_text.strip():
-                    all_text += page_text.strip() + "\n\n"
+                    page_texts.append(page_text.strip())
+                    continue
+
+                page_hash = self._page_hash(doc, page)
+                cached_page = extraction_cache.get_page_text(page_hash)
+                if cached_page is not None:
+                    page_texts.append(cached_page)
+                elif len(ocr_pages) < max_ocr_pages:
+                    page_texts.append(None)
+                    ocr_pages.append((len(page_texts) - 1, i, page_hash))
                 else:
-                    # ONLY load the OCR reader if we actually hit an image-only page
-                    print(f"Page {i+1} appears to be an image. Running OCR...")
-                    reader = get_ocr_reader()
-                    
-                    pix = page.get_pixmap(dpi=300)
-                    img_bytes = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-                    img_arr = np.array(img)
-                    
-                    # detail=0 returns strings; paragraph=True attempts to merge lines
-                    results = reader.readtext(img_arr, detail=0, paragraph=True)
-                    page_text = "\n".join(results) if results else ""
-                    
-                    if page_text and page_text.strip():
-                        all_text += page_text + "\n\n"
+                    truncated = True
+                    print(f"Page {i+1} skipped: OCR budget of {max_ocr_pages} pages reached")
             doc.close()
+
+            for slot, page_hash, page_text in self._ocr_pages(pdf_path, ocr_pages, dpi):
+                page_texts[slot] = page_text
+                extraction_cache.put_page_text(page_hash, page_text)
         except Exception as e:
             print(f"Error processing PDF {pdf_path}: {e}")
             return None
 
+        all_text = "".join(text + "\n\n" for text in page_texts if text and text.strip())
+
         if not all_text or not all_text.strip():
             msg = "File is blank or unreadable"
             print(f"{msg}: {pdf_path}")
             return None
 
+        # Partial text is not cached: the next upload extracts again, and since OCR'd pages
+        # are cached (and don't count against the budget) it gets further each time
+        if not truncated:
+            extraction_cache.put_document_text(content_hash, all_text)
         return all_text
 
+    def _ocr_pages(self, pdf_path, pages, dpi):
+        """
+        Rasterizes image-only pages in the shared process pool and OCRs each one as soon
+        as it is rendered, so the total time tracks the slowest page rather than the sum.
+        Returns (slot, page_hash, text) tuples.
+        """
+        if not pages:
+            return []
+
+        # ONLY load the OCR reader if we actually hit an image-only page
+        print(f"{len(pages)} page(s) appear to be images. Running OCR...")
+        reader = get_ocr_reader()
+
+        if len(pages) == 1:
+            # Not worth a round-trip to the pool for a single page
+            slot, index, page_hash = pages[0]
+            return [(slot, page_hash, _ocr_image(reader, render_page_png(pdf_path, index, dpi)))]
+
+        render_pool = get_render_pool(current_app.config.get('OCR_RENDER_WORKERS'))
+        with ThreadPoolExecutor(max_workers=current_app.config.get('OCR_WORKERS', 2)) as ocr_pool:
+            rendering = {
+                render_pool.submit(render_page_png, pdf_path, index, dpi): (slot, page_hash)
+                for slot, index, page_hash in pages
+            }
+            recognizing = {}
+            for fut in as_completed(rendering):
+                recognizing[ocr_pool.submit(_ocr_image, reader, fut.result())] = rendering[fut]
+            return [(slot, page_hash, fut.result()) for fut, (slot, page_hash) in recognizing.items()]
+
     def _invoke_chain(self, template, variables):
         """Helper to run a LangChain prompt."""
         prompt = PromptTemplate(
@@ -100,30 +190,44 @@ class JDAnalyzer:
         return self._invoke_chain(prompt, {"text": text, "text_type": context_label})
 
     def get_comparison(self, resume_skills, jd_skills):
-        """Returns common and missing skills as JSON objects."""
-        
-        common_prompt = """
-        Given these lists:
-        Resume Skills: {resume_skills}
-        JD Skills: {jd_skills}
-        
-        Identify ONLY skills in BOTH lists.
-        Return EXACTLY in this JSON format: {{ "common_skills": [...] }}
         """
-        
-        missing_prompt = """
-        Given these lists:
-        Resume Skills: {resume_skills}
-        JD Skills: {jd_skills}
-        
-        Identify ONLY skills in JD but NOT in Resume.
-        Return EXACTLY in this JSON format: {{ "skills_to_learn": [...] }}
+        Returns common and missing skills as JSON objects, computed locally.
+        Ambiguous near-matches are counted as missing; use compare_and_generate_questions
+        to have the LLM settle them.
+        """
+        common, missing, ambiguous = match_skills(resume_skills, jd_skills)
+        missing = missing + [jd_skill for jd_skill, _ in ambiguous]
+        return {"common_skills": common}, {"skills_to_learn": missing}
+
+    def compare_and_generate_questions(self, resume_skills, jd_skills):
+        """
+        Matches skills deterministically, then makes a single LLM call that both settles
+        the ambiguous near-matches and generates the interview questions.
+        Returns (common, missing, questions) as JSON objects.
         """
+        common, missing, ambiguous = match_skills(resume_skills, jd_skills)
 
-        common_raw = self._invoke_chain(common_prompt, {"resume_skills": resume_skills, "jd_skills": jd_skills})
-        missing_raw = self._invoke_chain(missing_prompt, {"resume_skills": resume_skills, "jd_skills": jd_skills})
+        prompt = """
+        You are an expert technical interviewer.
+        Skills the candidate has that the job requires: {common_json}
+        Possible matches to verify, as [job skill, closest candidate skill] pairs: {ambiguous_json}
         
-        return self._clean_json(common_raw), self._clean_json(missing_raw)
+        1. For each possible match, decide whether the candidate skill really covers the job skill.
+        2. Using the confirmed skills, generate exactly 10 practical, non-generic interview questions.
+        Return ONLY JSON: {{ "confirmed_matches": ["job skill", ...], "questions": ["q1", "q2", ...] }}
+        """
+        raw = self._invoke_chain(prompt, {
+            "common_json": json.dumps(common),
+            "ambiguous_json": json.dumps(ambiguous),
+        })
+        result = self._clean_json(raw) or {}
+
+        confirmed = {str(s).lower() for s in result.get("confirmed_matches", []) or []}
+        for jd_skill, _ in ambiguous:
+            (common if jd_skill.lower() in confirmed else missing).append(jd_skill)
+
+        questions = {"questions": result.get("questions", [])} if result else None
+        return {"common_skills": common}, {"skills_to_learn": missing}, questions
 
     def generate_interview_questions(self, common_skills_json_str):
         """Generates 10 interview questions based on common skills."""
@@ -137,6 +241,66 @@ class JDAnalyzer:
         raw = self._invoke_chain(prompt, {"common_json": str(common_skills_json_str)})
         return self._clean_json(raw)
 
+    def run_concurrently(self, calls, timeout=None):
+        """
+        Runs independent calls in parallel. `calls` maps a name to (fn, *args).
+        Returns (results, timings); a call that fails or outlives the timeout yields None.
+        """
+        pool = get_llm_pool()
+        started = time.perf_counter()
+        futures = {name: pool.submit(_timed, fn, *args) for name, (fn, *args) in calls.items()}
+
+        results, timings = {}, {}
+        for name, fut in futures.items():
+            remaining = None if timeout is None else max(0.0, timeout - (time.perf_counter() - started))
+            try:
+                results[name], timings[name] = fut.result(timeout=remaining)
+            except FutureTimeout:
+                print(f"LLM call '{name}' timed out after {timeout}s")
+                results[name], timings[name] = None, None
+            except Exception as e:
+                print(f"LLM call '{name}' failed: {e}")
+                results[name], timings[name] = None, None
+        return results, timings
+
+    def analyze_resume(self, resume_text, jd_skills, jd_text=None, timeout=None):
+        """
+        Full resume-vs-JD analysis along the shortest dependency chain:
+        resume skill extraction runs alongside JD skill extraction (only needed when the
+        JD has none stored), then one combined comparison/questions call. Returns a dict
+        with skills, comparison, questions and a per-call latency breakdown.
+        """
+        started = time.perf_counter()
+        calls = {"resume_skills": (self.extract_skills, resume_text, False)}
+        if not jd_skills and jd_text:
+            calls["jd_skills"] = (self.extract_skills, jd_text, True)
+        results, timings = self.run_concurrently(calls, timeout)
+
+        resume_skills = results["resume_skills"]
+        jd_skills = results.get("jd_skills") or jd_skills
+        common, missing, questions = None, None, None
+        if resume_skills:
+            comparison, comparison_timing = self.run_concurrently(
+                {"comparison": (self.compare_and_generate_questions, resume_skills, jd_skills)}, timeout
+            )
+            timings.update(comparison_timing)
+            if comparison["comparison"]:
+                common, missing, questions = comparison["comparison"]
+            else:
+                # Model unavailable: the deterministic comparison still gives the skill gap
+                common, missing = self.get_comparison(resume_skills, jd_skills)
+
+        timings["total"] = round(time.perf_counter() - started, 3)
+        print(f"Resume analysis latency breakdown: {timings}")
+        return {
+            "resume_skills": resume_skills,
+            "jd_skills": jd_skills,
+            "common": common,
+            "missing": missing,
+            "questions": questions,
+            "timings": timings,
+        }
+
     def _clean_json(self, raw_str):
         """Cleans LLM output to valid dict."""
         cleaned = raw_str.strip().strip("'").strip('"').replace("\\'", "'")
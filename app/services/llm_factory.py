@@ -1,21 +1,242 @@
-import os
+import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from flask import current_app
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_ollama import OllamaLLM
-from langchain_community.llms import Ollama
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+# --- Shared LLM Client Registry ---
+# Clients are built once per (provider, model, base_url, temperature) and reused by
+# every request and worker thread, so their HTTP connection pools stay warm instead
+# of paying client setup and a TCP/TLS handshake on each /interact or analysis call.
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+_ROUTER = None
+
+
+class LLMStats(BaseCallbackHandler):
+    """Call counters and latency for one cached client (attached as a LangChain callback)."""
+
+    def __init__(self, provider, model, base_url=None, temperature=None):
+        self.provider = provider
+        self.model = model
+        self.base_url = base_url
+        self.temperature = temperature
+        self._lock = threading.Lock()
+        self._started = {}
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.last_error = None
+        self.last_success_at = None
+
+    def _start(self, run_id):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id, error=None):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            self.calls += 1
+            if started is not None:
+                self.last_latency = time.perf_counter() - started
+                self.total_latency += self.last_latency
+            if error is None:
+                self.last_success_at = time.time()
+            else:
+                self.errors += 1
+                self.last_error = str(error)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "model": self.model,
+                "base_url": self.base_url,
+                "temperature": self.temperature,
+                "calls": self.calls,
+                "errors": self.errors,
+                "in_flight": len(self._started),
+                "avg_latency": round(self.total_latency / self.calls, 3) if self.calls else None,
+                "last_latency": round(self.last_latency, 3) if self.last_latency is not None else None,
+                "last_error": self.last_error,
+                "last_success_at": self.last_success_at,
+            }
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; after `reset_timeout`
+    seconds one probe call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class LLMRouter:
+    """
+    Sends each call to the fastest healthy backend for its call type, falling through
+    to the next backend on error or timeout. Backends are tried in preference order
+    until each has a few latency samples for that call type.
+    """
+    MIN_SAMPLES = 3
+
+    def __init__(self, backends, timeout=90.0, failure_threshold=3, reset_timeout=30.0, window=50):
+        self.backends = backends  # [(name, zero-arg client getter)], in preference order
+        self.timeout = timeout
+        self.window = window
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name, _ in backends}
+        self._latencies = {}  # (call_type, backend) -> deque of seconds
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-call")
+
+    def _samples(self, call_type, name):
+        with self._lock:
+            return list(self._latencies.get((call_type, name), ()))
+
+    def _record_latency(self, call_type, name, seconds):
+        with self._lock:
+            self._latencies.setdefault((call_type, name), deque(maxlen=self.window)).append(seconds)
+
+    def _ordered(self, call_type):
+        def key(item):
+            idx, (name, _) = item
+            samples = self._samples(call_type, name)
+            if len(samples) < self.MIN_SAMPLES:
+                return (0, idx, 0.0)
+            return (1, 0, _percentile(samples, 50))
+        return [backend for _, backend in sorted(enumerate(self.backends), key=key)]
+
+    def invoke(self, call_type, messages, timeout=None):
+        timeout = timeout or self.timeout
+        last_error = None
+        for name, get_client in self._ordered(call_type):
+            breaker = self.breakers[name]
+            if not breaker.allow():
+                continue
+            started = time.perf_counter()
+            try:
+                client = get_client()
+                # The call keeps running in the pool after a timeout; we just stop waiting for it
+                response = self._executor.submit(client.invoke, messages).result(timeout=timeout)
+            except FutureTimeout:
+                last_error = TimeoutError(f"{name} timed out after {timeout}s")
+                # A timeout is a (lower-bound) latency sample too, so a hanging backend loses its rank
+                self._record_latency(call_type, name, time.perf_counter() - started)
+            except Exception as e:
+                last_error = e
+            else:
+                breaker.record_success()
+                self._record_latency(call_type, name, time.perf_counter() - started)
+                return response
+            breaker.record_failure()
+            logging.warning(f"LLM backend {name} failed for {call_type}: {last_error}")
+        raise last_error or RuntimeError("No LLM backend available (all circuits open).")
+
+    def stats(self):
+        backends = {}
+        for name, _ in self.backends:
+            breaker = self.breakers[name]
+            latency = {}
+            with self._lock:
+                keys = [k for k in self._latencies if k[1] == name]
+            for call_type, _ in keys:
+                samples = self._samples(call_type, name)
+                latency[call_type] = {
+                    "samples": len(samples),
+                    "p50": round(_percentile(samples, 50), 3),
+                    "p95": round(_percentile(samples, 95), 3),
+                }
+            backends[name] = {"state": breaker.state, "failures": breaker.failures, "latency": latency}
+        return backends
+
+
 class LLMFactory:
+    @staticmethod
+    def _get_client(provider, model, base_url, temperature, build):
+        """Returns the cached client for this backend, building it (with stats) on first use."""
+        key = (provider, model, base_url, temperature)
+        entry = _CLIENTS.get(key)
+        if entry is None:
+            with _CLIENTS_LOCK:
+                entry = _CLIENTS.get(key)
+                if entry is None:
+                    stats = LLMStats(provider, model, base_url, temperature)
+                    entry = (build([stats]), stats)
+                    _CLIENTS[key] = entry
+        return entry[0]
+
     @staticmethod
     def get_ollama_chat():
         model = current_app.config.get('OLLAMA_CHAT_MODEL', 'gpt-oss:20b-cloud')
-        return OllamaLLM(model=model)
+        return LLMFactory._get_client(
+            'ollama', model, None, None,
+            lambda callbacks: OllamaLLM(model=model, callbacks=callbacks)
+        )
 
     @staticmethod
     def get_ollama_tool():
         model = current_app.config.get('OLLAMA_TOOL_MODEL', 'gpt-oss:20b-cloud')
         base_url = current_app.config.get('OLLAMA_BASE_URL', 'http://localhost:11434')
-        return Ollama(model=model, base_url=base_url)
+        return LLMFactory._get_client(
+            'ollama', model, base_url, None,
+            lambda callbacks: OllamaLLM(model=model, base_url=base_url, callbacks=callbacks)
+        )
 
     @staticmethod
     def get_google_chat():
@@ -24,11 +245,15 @@ class LLMFactory:
             raise ValueError("GOOGLE_API_KEY is not set in configuration.")
 
         model = current_app.config.get('GOOGLE_CHAT_MODEL', 'gemini-2.5-flash')
-        return ChatGoogleGenerativeAI(
-            model=model,
-            google_api_key=api_key,
-            temperature=0.3,
-            convert_system_message_to_human=False,
+        return LLMFactory._get_client(
+            'google', model, None, 0.3,
+            lambda callbacks: ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                temperature=0.3,
+                convert_system_message_to_human=False,
+                callbacks=callbacks,
+            )
         )
 
     @staticmethod
@@ -37,4 +262,41 @@ class LLMFactory:
             return LLMFactory.get_google_chat()
         except Exception as e:
             logging.warning(f"Gemini failed, falling back to Ollama: {e}")
-            return LLMFactory.get_ollama_chat()
\ No newline at end of file
+            return LLMFactory.get_ollama_chat()
+
+    @staticmethod
+    def get_router():
+        """
+        Shared Gemini/Ollama router (Gemini preferred while latencies are unknown).
+        Gemini is only routed to when GOOGLE_API_KEY is configured.
+        """
+        global _ROUTER
+        if _ROUTER is None:
+            with _CLIENTS_LOCK:
+                if _ROUTER is None:
+                    backends = [("ollama", LLMFactory.get_ollama_chat)]
+                    if current_app.config.get('GOOGLE_API_KEY'):
+                        backends.insert(0, ("gemini", LLMFactory.get_google_chat))
+                    _ROUTER = LLMRouter(
+                        backends,
+                        timeout=current_app.config.get('LLM_CALL_TIMEOUT', 90),
+                        failure_threshold=current_app.config.get('LLM_BREAKER_FAILURES', 3),
+                        reset_timeout=current_app.config.get('LLM_BREAKER_RESET', 30),
+                    )
+        return _ROUTER
+
+    @staticmethod
+    def stats():
+        """Health / latency counters for every client built so far, plus routing state."""
+        return {
+            "clients": [stats.snapshot() for _, stats in list(_CLIENTS.values())],
+            "routing": _ROUTER.stats() if _ROUTER is not None else {},
+        }
+
+    @staticmethod
+    def reset():
+        """Drops all cached clients and routing state (e.g. after a config change)."""
+        global _ROUTER
+        with _CLIENTS_LOCK:
+            _CLIENTS.clear()
+            _ROUTER = None
@@ -0,0 +1,35 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+
+# --- Shared Page Rasterization Pool ---
+# Rendering at OCR resolution is CPU-bound and holds the GIL, so scanned pages are
+# rasterized in worker processes. This module deliberately imports only PyMuPDF so
+# spawned workers start quickly (no torch / EasyOCR / TensorFlow).
+_RENDER_POOL = None
+_RENDER_POOL_LOCK = threading.Lock()
+
+
+def render_page_png(pdf_path, page_index, dpi):
+    """Renders one page to PNG bytes. Runs inside a worker process."""
+    with fitz.open(pdf_path) as doc:
+        return doc.load_page(page_index).get_pixmap(dpi=dpi).tobytes("png")
+
+
+def get_render_pool(max_workers=None):
+    """Returns the process-wide rasterization pool, creating it on first use."""
+    global _RENDER_POOL
+    if _RENDER_POOL is None:
+        with _RENDER_POOL_LOCK:
+            if _RENDER_POOL is None:
+                workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+                # 'spawn' avoids forking a process that already has ML runtime threads.
+                # Workers re-import the entry script, so run.py builds the app only
+                # under its __main__ guard.
+                _RENDER_POOL = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _RENDER_POOL
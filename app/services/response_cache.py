@@ -0,0 +1,94 @@
+import ast
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Coding Round Response Cache ---
+# Many candidates ask for hints on the same question and resubmit identical code.
+# Results are memoized in-process (LRU + TTL) and persisted through code_checks.cache_key,
+# so a repeat submission skips the LLM round-trip even after a restart.
+
+
+def normalize_question(question):
+    return re.sub(r"\s+", " ", (question or "").strip().lower()).rstrip(" .?!")
+
+
+def code_fingerprint(code, language):
+    """Python code is compared by AST (ignores comments/formatting); other code by normalized text."""
+    code = code or ""
+    if (language or "").lower() == "python":
+        try:
+            return ast.dump(ast.parse(code), include_attributes=False)
+        except (SyntaxError, ValueError):
+            pass  # Broken code: fall back to text so the syntax error still gets evaluated once
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    return "\n".join(line for line in lines if line.strip())
+
+
+def _digest(*parts):
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def evaluation_key(question, language, code):
+    language = (language or "").lower()
+    return "eval:" + _digest(normalize_question(question), language, code_fingerprint(code, language))
+
+
+def hint_key(question):
+    return "hint:" + _digest(normalize_question(question))
+
+
+def tests_key(question):
+    return "tests:" + _digest(normalize_question(question))
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_db_hit(self):
+        with self._lock:
+            self.db_hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.db_hits) / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,159 @@
+"""
+Executed as a standalone script inside the sandbox subprocess (never imported by the app).
+Reads {"code", "function_name", "tests", "timeout", "limits", "drop_to", "result_fd", "nonce"}
+as JSON on stdin, calls the candidate's function with each test's args and writes
+{"nonce", "results", "error"} to the private result pipe. The runner never sees the expected
+values (the parent compares outputs itself), and stdout/stderr point at /dev/null while
+candidate code runs, so printing or forging a result does not change the score.
+"""
+import ast
+import copy
+import json
+import os
+import signal
+import sys
+import time
+
+# Modules interview solutions commonly use, imported while the interpreter's own
+# files are still readable (the sandbox user may not be able to read them later)
+import bisect, collections, functools, heapq, itertools, operator, re, string  # noqa: E401,F401
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+
+class TestTimeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise TestTimeout()
+
+
+MAX_MESSAGE = 200
+
+
+def _describe(exc):
+    """Exception type and a bounded first line of its message."""
+    message = str(exc).splitlines()[0] if str(exc) else ""
+    return f"{type(exc).__name__}: {message[:MAX_MESSAGE]}" if message else type(exc).__name__
+
+
+def _normalize(value):
+    """Tuples become lists etc., so results compare like the JSON test expectations."""
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def _entry_point(code, namespace, function_name):
+    """The named function if defined, else the last top-level function, else a LeetCode-style Solution method."""
+    if function_name and callable(namespace.get(function_name)):
+        return namespace[function_name]
+    tree = ast.parse(code)
+    functions = [n.name for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    if functions:
+        return namespace[functions[-1]]
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == "Solution":
+            methods = [m.name for m in node.body if isinstance(m, ast.FunctionDef) and not m.name.startswith("_")]
+            if methods:
+                name = function_name if function_name in methods else methods[0]
+                return getattr(namespace["Solution"](), name)
+    return None
+
+
+def _call_with_timeout(fn, timeout):
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def run(payload):
+    timeout = float(payload.get("timeout", 2.0))
+    out = {"results": [], "error": None}
+    namespace = {"__name__": "__solution__"}
+    try:
+        _call_with_timeout(lambda: exec(compile(payload["code"], "<solution>", "exec"), namespace), timeout)
+        fn = _entry_point(payload["code"], namespace, payload.get("function_name"))
+        if fn is None:
+            out["error"] = "No function found to test."
+            return out
+    except TestTimeout:
+        out["error"] = f"Timed out after {timeout}s while loading the code."
+        return out
+    except BaseException as e:
+        out["error"] = _describe(e)
+        return out
+
+    for i, test in enumerate(payload.get("tests", []), 1):
+        args = test.get("args", [])
+        if not isinstance(args, list):
+            args = [args]
+        result = {"test_case": i, "actual_output": None}
+        started = time.perf_counter()
+        try:
+            result["actual_output"] = _normalize(_call_with_timeout(lambda: fn(*copy.deepcopy(args)), timeout))
+        except TestTimeout:
+            result["error"] = f"Timed out after {timeout}s"
+        except BaseException as e:
+            result["error"] = _describe(e)
+        result["time_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        out["results"].append(result)
+    return out
+
+
+def _apply_limits(limits):
+    """Caps CPU time, memory and processes, and forbids file writes, before any candidate code runs."""
+    if resource is None or not limits:
+        return
+    cpu = int(limits.get("cpu_seconds", 10))
+    memory = int(limits.get("memory_bytes", 256 * 1024 * 1024))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    # No fork/exec of helpers (only enforced for non-root users, see _drop_privileges)
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def _drop_privileges(ids):
+    """Switches to the unprivileged sandbox user; refuses to run candidate code as root."""
+    if ids:
+        uid, gid = ids
+        os.setgroups([])
+        os.setgid(gid)
+        os.setuid(uid)
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        raise SystemExit("Refusing to run submitted code as root.")
+
+
+def _silence_std_streams():
+    """Points fds 1 and 2 at /dev/null: whatever the candidate prints or writes there is dropped."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+
+
+def main():
+    payload = json.load(sys.stdin)
+    # The only channel the parent reads results from, opened before any candidate code runs
+    results = os.fdopen(int(payload["result_fd"]), "w")
+    _apply_limits(payload.get("limits"))
+    _drop_privileges(payload.get("drop_to"))
+    _silence_std_streams()
+    signal.signal(signal.SIGALRM, _alarm)
+    out = run(payload)
+    out["nonce"] = payload.get("nonce")
+    results.write(json.dumps(out, default=repr))
+    results.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import re
+
+# --- Sentence Chunking for Streamed Replies ---
+# The avatar can start speaking as soon as the first sentence is complete, so the
+# LLM token stream is cut at sentence boundaries instead of waiting for the reply.
+
+# Terminal punctuation (plus closing quotes/brackets) followed by whitespace, or a line break.
+# Requiring the whitespace means "3.5" or a trailing "." split across chunks never cuts early.
+_BOUNDARY_RE = re.compile(r"[.!?]+[\"')\]]*(?=\s)|\n+")
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = {"e.g.", "i.e.", "etc.", "vs.", "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st."}
+
+
+def chunk_text(chunk):
+    """LangChain streams strings (LLMs) or message chunks (chat models)."""
+    if hasattr(chunk, 'content'):
+        return chunk.content or ""
+    return chunk or ""
+
+
+def _find_boundary(buffer, min_chars):
+    for m in _BOUNDARY_RE.finditer(buffer):
+        candidate = buffer[:m.end()].strip()
+        if not candidate:
+            continue
+        last_word = candidate.split()[-1].lower()
+        if last_word in ABBREVIATIONS or re.fullmatch(r"[a-z]\.", last_word):
+            continue
+        # Very short fragments ("Okay.") are merged into the next sentence
+        if len(candidate) < min_chars:
+            continue
+        return m.end()
+    return None
+
+
+def iter_sentences(chunks, min_chars=12):
+    """Yields complete sentences from an iterable of text chunks, then any remaining tail."""
+    buffer = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        while True:
+            cut = _find_boundary(buffer, min_chars)
+            if cut is None:
+                break
+            sentence, buffer = buffer[:cut].strip(), buffer[cut:]
+            if sentence:
+                yield sentence
+
+    tail = buffer.strip()
+    if tail:
+        yield tail
@@ -0,0 +1,129 @@
+import json
+import re
+from app.services.llm_factory import LLMFactory
+
+# --- Interview Transcript Analysis ---
+# Shared by the analytics routes and the background analysis workers. Generated
+# analyses are stored in session_analyses keyed by a transcript digest, so each
+# transcript version is sent to the model at most once.
+
+
+def parse_scores_from_text(text):
+    """Extracts numerical scores from LLM analysis text."""
+    if not text:
+        return None, None
+
+    try:
+        j = json.loads(text)
+        return (float(j.get('technical')) if j.get('technical') is not None else None,
+                float(j.get('emotional')) if j.get('emotional') is not None else None)
+    except Exception:
+        pass
+
+    def find_score(name):
+        # Group the alternation so the capture group is always part of the same branch
+        pattern_num = rf'(?:{name})[^0-9\n]*([0-9]+(?:\.[0-9]+)?)'
+        m = re.search(pattern_num, text, re.I)
+        if m and m.group(1):
+            return float(m.group(1))
+        pattern_frac = rf'(?:{name})[^/]*([0-9]+)\/([0-9]+)'
+        m = re.search(pattern_frac, text, re.I)
+        if m and m.group(1) and m.group(2):
+            return float(m.group(1)) / float(m.group(2)) * 10.0
+        return None
+
+    tech = find_score('technical')
+    emo = find_score('emotional|emotion')
+    return tech, emo
+
+
+def format_transcript(rows):
+    """Renders message rows as the plain-text transcript the analysis prompt expects."""
+    transcript = ""
+    for row in rows:
+        transcript += f"[{row['timestamp']}] {row['role'].upper()}: {row['message']}\n"
+        if row['emotion_context'] and row['emotion_context'] != "{}":
+            transcript += f"  [EMOTION]: {row['emotion_context']}\n"
+    return transcript
+
+
+def run_analysis(transcript):
+    llm = LLMFactory.get_ollama_chat()
+    prompt = f"Analyze this interview transcript for technical and emotional performance. Provide a Technical Score (0-10) and Emotional Score (0-10) and constructive feedback:\n{transcript}"
+    analysis_text = llm.invoke(prompt)
+    if hasattr(analysis_text, 'content'):
+        analysis_text = analysis_text.content
+    return analysis_text
+
+
+def transcript_digest(db, chat_id):
+    """Messages are append-only, so (count, last id) identifies a transcript version."""
+    row = db.execute("SELECT COUNT(*) AS n, MAX(id) AS last_id FROM messages WHERE chat_id = ?", (chat_id,)).fetchone()
+    return f"{row['n']}:{row['last_id'] or 0}"
+
+
+def get_saved_analysis(db, chat_id, digest):
+    """Returns the stored analysis if it was generated from this exact transcript."""
+    row = db.execute(
+        "SELECT analysis FROM session_analyses WHERE chat_id = ? AND transcript_digest = ?", (chat_id, digest)
+    ).fetchone()
+    return row['analysis'] if row else None
+
+
+def save_analysis(db, chat_id, digest, analysis_text):
+    db.execute("""
+        INSERT OR REPLACE INTO session_analyses (chat_id, transcript_digest, analysis, created_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (chat_id, digest, analysis_text))
+
+
+def load_scores(db, chat_id):
+    """Latest score of each type (rows are appended when a newer analysis replaces them)."""
+    rows = db.execute(
+        "SELECT score_type, score_value FROM evaluation_scores WHERE chat_id = ? ORDER BY id ASC", (chat_id,)
+    ).fetchall()
+    scores = {"technical": None, "emotional": None, "code": None}
+    for r in rows:
+        scores[r["score_type"]] = r["score_value"]
+    return scores
+
+
+def save_missing_scores(db, chat_id, username, scores, analysis_text, replace=False):
+    """
+    Parses scores from the analysis and inserts those not already stored, or all of
+    them when replace is set (the analysis was regenerated for a newer transcript).
+    """
+    new_tech, new_emo = parse_scores_from_text(analysis_text)
+
+    # Fallbacks
+    if new_tech is None: new_tech = 5.0
+    if new_emo is None: new_emo = 5.0
+
+    if replace or scores['technical'] is None:
+        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES (?, ?, ?, ?)",
+                   (chat_id, username, 'technical', new_tech))
+        scores['technical'] = new_tech
+    if replace or scores['emotional'] is None:
+        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES (?, ?, ?, ?)",
+                   (chat_id, username, 'emotional', new_emo))
+        scores['emotional'] = new_emo
+
+
+def analyze_chat(db, chat_id, username):
+    """Generates (or reuses) the analysis for the chat's current transcript and stores scores."""
+    digest = transcript_digest(db, chat_id)
+    analysis_text = get_saved_analysis(db, chat_id, digest)
+    regenerated = analysis_text is None
+    if regenerated:
+        rows = db.execute(
+            "SELECT role, message, emotion_context, timestamp FROM messages WHERE chat_id = ? ORDER BY id ASC",
+            (chat_id,)
+        ).fetchall()
+        analysis_text = run_analysis(format_transcript(rows))
+        save_analysis(db, chat_id, digest, analysis_text)
+
+    scores = load_scores(db, chat_id)
+    # Scores from an analysis of an older transcript are superseded, not kept
+    save_missing_scores(db, chat_id, username, scores, analysis_text, replace=regenerated)
+    db.commit()
+    return analysis_text, scores
@@ -0,0 +1,152 @@
+import time
+import secrets
+import sqlite3
+from flask import g, session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SecureCookieSession
+from app.db import get_db
+
+# --- Server-Side Sessions ---
+# The cookie only carries a random session id; session data lives in the
+# server_sessions table. The bulky resume analysis (skills, questions) is kept in
+# a separate column and only read by the routes that use it, so the 5/s
+# /track_emotion requests neither send it nor deserialize it.
+_serializer = TaggedJSONSerializer()
+PURGE_INTERVAL = 3600  # seconds between sweeps of expired rows
+_UNSET = object()
+
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.previous_sid = None      # id replaced by rotate(), deleted on save
+        self.pending_analysis = _UNSET  # analysis context to store with the row on save
+
+    def rotate(self):
+        """Moves the session to a fresh id; the old id stops working once the response is saved."""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class SQLiteSessionInterface(SessionInterface):
+    def __init__(self):
+        self._last_purge = 0.0
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                row = get_db().execute(
+                    "SELECT data, expires_at FROM server_sessions WHERE id = ? AND expires_at > ?", (sid, time.time())
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                # Database not initialized yet (no server_sessions table): behave as logged out
+                print(f"Session store unavailable: {e}")
+                row = None
+            if row:
+                return ServerSession(_serializer.loads(row['data']), sid=sid, expires_at=row['expires_at'])
+        # Unknown or expired ids are never reused
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        db = get_db()
+        if session.previous_sid:
+            db.execute("DELETE FROM server_sessions WHERE id = ?", (session.previous_sid,))
+            db.commit()
+
+        if not session:
+            # Cleared (logout): drop the row and the cookie
+            if session.modified and not session.new:
+                db.execute("DELETE FROM server_sessions WHERE id = ?", (session.sid,))
+                db.commit()
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        now = time.time()
+        lifetime = self._lifetime(app)
+        # Unchanged sessions only extend their row once half the lifetime has passed,
+        # so read-only requests (emotion frames, polling) never write
+        analysis = session.pending_analysis
+        if analysis is not _UNSET:
+            db.execute("""
+                INSERT INTO server_sessions (id, data, analysis, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    data = excluded.data, analysis = excluded.analysis, expires_at = excluded.expires_at
+            """, (session.sid, _serializer.dumps(dict(session)), _serializer.dumps(analysis) if analysis else None,
+                  now + lifetime))
+            db.commit()
+        elif session.new or session.modified or session.expires_at - now < lifetime / 2:
+            db.execute("""
+                INSERT INTO server_sessions (id, data, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+            """, (session.sid, _serializer.dumps(dict(session)), now + lifetime))
+            if now - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = now
+                db.execute("DELETE FROM server_sessions WHERE expires_at < ?", (now,))
+            db.commit()
+
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name, session.sid, expires=self.get_expiration_time(app, session), httponly=httponly,
+                domain=domain, path=path, secure=secure, samesite=samesite,
+            )
+
+
+def regenerate_session():
+    """
+    Gives the current session a new id, keeping its data. Call it when the user logs in
+    so an id planted before login (session fixation) never becomes authenticated.
+    """
+    if isinstance(session, ServerSession):
+        session.rotate()
+
+
+# --- Resume analysis context (per session, loaded on demand) ---
+
+def load_analysis_context():
+    """Returns the current session's analysis context (skills, questions, analyzed JD id) or {}."""
+    if 'analysis_context' not in g:
+        sid = getattr(session, 'sid', None)
+        if sid is None:
+            # Plain cookie sessions (SESSION_BACKEND=cookie) keep it in the session itself
+            context = session.get('analysis_context') or {}
+        else:
+            row = get_db().execute("SELECT analysis FROM server_sessions WHERE id = ?", (sid,)).fetchone()
+            context = _serializer.loads(row['analysis']) if row and row['analysis'] else {}
+        g.analysis_context = context
+    return g.analysis_context
+
+
+def save_analysis_context(context):
+    """
+    Replaces the current session's analysis context ({} clears it). With server-side
+    sessions it is written together with the session row at the end of the request,
+    so a session that is never saved (no cookie) leaves no row behind.
+    """
+    g.analysis_context = context
+    if not isinstance(session, ServerSession):
+        # Plain cookie sessions (SESSION_BACKEND=cookie) keep it in the session itself
+        session['analysis_context'] = context
+        return
+    session.pending_analysis = context
@@ -0,0 +1,175 @@
+import re
+from difflib import SequenceMatcher
+
+# --- Deterministic Skill Matching ---
+# Resume vs. JD comparison used to be two LLM round-trips. Most of it is plain set
+# matching once skill names are normalized, so we do that locally and only leave
+# genuinely ambiguous pairs (e.g. "ML" vs "deep learning frameworks") to the LLM.
+
+# alias -> canonical name (all lowercase, already normalized)
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "golang": "go",
+    "c sharp": "c#",
+    "csharp": "c#",
+    "cpp": "c++",
+    "node": "nodejs",
+    "node js": "nodejs",
+    "react js": "react",
+    "reactjs": "react",
+    "vue js": "vue",
+    "vuejs": "vue",
+    "angularjs": "angular",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "mssql": "sql server",
+    "ms sql": "sql server",
+    "k8s": "kubernetes",
+    "aws": "amazon web services",
+    "gcp": "google cloud platform",
+    "google cloud": "google cloud platform",
+    "azure cloud": "azure",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "llm": "large language models",
+    "llms": "large language models",
+    "genai": "generative ai",
+    "tf": "tensorflow",
+    "sklearn": "scikit-learn",
+    "scikit learn": "scikit-learn",
+    "scikit": "scikit-learn",
+    "torch": "pytorch",
+    "rest": "rest apis",
+    "restful apis": "rest apis",
+    "rest api": "rest apis",
+    "restful": "rest apis",
+    "ci cd": "ci/cd",
+    "cicd": "ci/cd",
+    "oop": "object-oriented programming",
+    "object oriented programming": "object-oriented programming",
+    "dsa": "data structures and algorithms",
+    "data structures & algorithms": "data structures and algorithms",
+    "git hub": "github",
+    "version control": "git",
+    "communication skills": "communication",
+    "team work": "teamwork",
+    "team player": "teamwork",
+    "problem-solving": "problem solving",
+    "problem solving skills": "problem solving",
+}
+
+# Words that qualify a skill without changing what it is
+FILLER_WORDS = {
+    "programming", "language", "languages", "skills", "skill", "development", "framework",
+    "basics", "basic", "experience", "with", "in", "of", "knowledge", "proficiency",
+    "proficient", "strong", "advanced", "familiarity", "understanding", "hands-on",
+}
+
+
+def _drop_fillers(s):
+    words = [w for w in s.split(" ") if w not in FILLER_WORDS]
+    return " ".join(words) if words else s
+
+
+# Canonical names are aliases of themselves. Aliases are looked up before filler words are
+# dropped ("natural language processing" must not become "natural processing"), then again
+# with fillers dropped so "Object Oriented Programming skills" still resolves.
+_CANONICAL = set(SKILL_ALIASES.values())
+_ALIASES_WITHOUT_FILLERS = {}
+for _name in [*SKILL_ALIASES, *_CANONICAL]:
+    _ALIASES_WITHOUT_FILLERS.setdefault(_drop_fillers(_name), SKILL_ALIASES.get(_name, _name))
+
+# Pairs scoring in this band are neither a clear match nor a clear miss
+FUZZY_MATCH = 0.88
+FUZZY_AMBIGUOUS = 0.6
+
+_SPLIT_RE = re.compile(r"[,;\n•|]+")
+_BULLET_RE = re.compile(r"^[\s\-\*\d\.\)]+")
+_SPACE_RE = re.compile(r"[\s_]+")
+
+
+def parse_skills(text):
+    """Splits an LLM 'comma-separated list' (which may also use bullets/newlines) into skills."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        items = text
+    else:
+        # Drop a leading 'Skills:' label if the model echoed it
+        text = re.sub(r"^\s*skills\s*:\s*", "", str(text), flags=re.I)
+        items = _SPLIT_RE.split(text)
+
+    skills, seen = [], set()
+    for item in items:
+        item = _BULLET_RE.sub("", str(item)).strip().strip(".").strip()
+        if item and normalize(item) not in seen:
+            seen.add(normalize(item))
+            skills.append(item)
+    return skills
+
+
+def normalize(skill):
+    """Lowercases, collapses whitespace, applies the alias table and drops filler words."""
+    s = skill.lower().strip()
+    s = re.sub(r"\(.*?\)", "", s)           # "Python (3.x)" -> "python"
+    s = re.sub(r"\.js\b", " js", s)         # "node.js" -> "node js"
+    s = re.sub(r"(?<=[a-z])\s+v?\d+(\.\d+)*(\.x)?$", "", s)  # "python 3.10" -> "python"
+    s = _SPACE_RE.sub(" ", s).strip(" .")
+    if s in SKILL_ALIASES:
+        return SKILL_ALIASES[s]
+    if s in _CANONICAL:
+        return s
+    s = _drop_fillers(s)                    # "proficiency in python programming" -> "python"
+    return _ALIASES_WITHOUT_FILLERS.get(s, s)
+
+
+def _tokens(canonical):
+    return set(re.findall(r"[a-z0-9#+/]+", canonical))
+
+
+def similarity(a, b):
+    """Similarity of two canonical skills: the better of token overlap and edit ratio."""
+    if a == b:
+        return 1.0
+    ta, tb = _tokens(a), _tokens(b)
+    jaccard = len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+    return max(jaccard, SequenceMatcher(None, a, b).ratio())
+
+
+def match_skills(resume_skills, jd_skills):
+    """
+    Compares resume and JD skills without an LLM.
+    Returns (common, missing, ambiguous) where common/missing are lists of JD skill
+    names and ambiguous is a list of (jd_skill, closest_resume_skill) pairs.
+    """
+    resume = {normalize(s): s for s in parse_skills(resume_skills)}
+    common, missing, ambiguous = [], [], []
+
+    for jd_skill in parse_skills(jd_skills):
+        canonical = normalize(jd_skill)
+        if canonical in resume:
+            common.append(jd_skill)
+            continue
+
+        best, best_score = None, 0.0
+        for candidate in resume:
+            score = similarity(canonical, candidate)
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best_score >= FUZZY_MATCH:
+            common.append(jd_skill)
+        elif best_score >= FUZZY_AMBIGUOUS:
+            ambiguous.append((jd_skill, resume[best]))
+        else:
+            missing.append(jd_skill)
+
+    return common, missing, ambiguous
@@ -0,0 +1,174 @@
+import ast
+
+# --- Pre-LLM Static Checks ---
+# During live rounds many submissions don't even parse. These checks run in
+# microseconds and answer such submissions directly, so only viable code reaches
+# the sandbox / model.
+
+# Languages whose structure is delimited by brackets (bracket balance is checked)
+BRACE_LANGUAGES = {"java", "javascript", "js", "typescript", "ts", "c", "cpp", "c++", "c#", "csharp", "go", "kotlin", "swift"}
+_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+# Lexemes that can hold unbalanced brackets or quotes besides plain string/char literals
+REGEX_LANGUAGES = {"javascript", "js", "typescript", "ts"}                 # /[{"]/
+TRIPLE_QUOTE_LANGUAGES = {"kotlin", "swift", "c#", "csharp", "java"}       # """...""" (Java text blocks)
+VERBATIM_LANGUAGES = {"c#", "csharp"}                                      # @"C:\path\"
+# After these a '/' starts a regex literal rather than a division
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+
+
+def _is_stub_body(body):
+    """True if a block only holds pass / ... / a docstring / raise NotImplementedError."""
+    for stmt in body:
+        if isinstance(stmt, ast.Pass):
+            continue
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and (
+                stmt.value.value is Ellipsis or isinstance(stmt.value.value, str)):
+            continue
+        if isinstance(stmt, ast.Raise) and stmt.exc is not None:
+            exc = stmt.exc.func if isinstance(stmt.exc, ast.Call) else stmt.exc
+            if isinstance(exc, ast.Name) and exc.id == "NotImplementedError":
+                continue
+        return False
+    return True
+
+
+def _check_python(code):
+    try:
+        tree = ast.parse(code)
+        # Full compile also catches e.g. 'return' outside a function
+        compile(tree, "<submission>", "exec")
+    except SyntaxError as e:
+        kind = "indentation_error" if isinstance(e, IndentationError) else "syntax_error"
+        where = f" on line {e.lineno}" if e.lineno else ""
+        return kind, f"{type(e).__name__}{where}: {e.msg}"
+
+    functions = [n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    top_level = [n for n in tree.body if not isinstance(n, (ast.Import, ast.ImportFrom, ast.FunctionDef,
+                                                            ast.AsyncFunctionDef, ast.ClassDef))]
+    if _is_stub_body(top_level) and all(_is_stub_body(f.body) for f in functions):
+        if functions:
+            return "stub", "Every function body is a stub (pass / ... / NotImplementedError)."
+        return "empty", "No executable code was submitted."
+    return None
+
+
+def _regex_allowed(code, i):
+    """True if a '/' at i starts a regex literal (judged by the token before it)."""
+    j = i - 1
+    while j >= 0 and code[j] in " \t\r\n":
+        j -= 1
+    if j < 0 or code[j] in _REGEX_PRECEDERS:
+        return True
+    end = j + 1
+    while j >= 0 and (code[j].isalnum() or code[j] in "_$"):
+        j -= 1
+    return code[j + 1:end] in _REGEX_KEYWORDS
+
+
+def _regex_end(code, i):
+    """Index of the '/' closing the regex literal starting at i, or -1 (then it was a division)."""
+    j, in_class = i + 1, False
+    while j < len(code) and code[j] != "\n":
+        c = code[j]
+        if c == "\\":
+            j += 1
+        elif in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "/":
+            return j if j > i + 1 else -1
+        j += 1
+    return -1
+
+
+def _verbatim_end(code, i):
+    """Index of the quote closing the C# verbatim string opened at i ('""' is an escaped quote), or -1."""
+    j = i + 1
+    while j < len(code):
+        if code[j] == '"':
+            if code.startswith('""', j):
+                j += 2
+                continue
+            return j
+        j += 1
+    return -1
+
+
+def _check_brackets(code, language=""):
+    """
+    Bracket balance, skipping string/char literals and // and /* */ comments, plus the
+    language's other literals: JS/TS regexes, triple-quoted and C# verbatim strings.
+    """
+    stack = []
+    i, line, n = 0, 1, len(code)
+    while i < n:
+        ch = code[i]
+        if ch == "\n":
+            line += 1
+        elif code.startswith("//", i):
+            i = code.find("\n", i)
+            if i == -1:
+                break
+            continue
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end == -1:
+                return "syntax_error", f"Unterminated block comment starting on line {line}."
+            line += code.count("\n", i, end)
+            i = end + 2
+            continue
+        elif ch == "/" and language in REGEX_LANGUAGES and _regex_allowed(code, i) and _regex_end(code, i) != -1:
+            i = _regex_end(code, i)
+        elif code.startswith('"""', i) and language in TRIPLE_QUOTE_LANGUAGES:
+            end = code.find('"""', i + 3)
+            if end == -1:
+                return "syntax_error", f"Unterminated multiline string starting on line {line}."
+            line += code.count("\n", i, end)
+            i = end + 2
+        elif ch == '"' and language in VERBATIM_LANGUAGES and "@" in code[max(0, i - 2):i]:
+            end = _verbatim_end(code, i)
+            if end == -1:
+                return "syntax_error", f"Unterminated verbatim string on line {line}."
+            line += code.count("\n", i, end)
+            i = end
+        elif ch in "\"'`":
+            j = i + 1
+            while j < n and code[j] != ch:
+                if code[j] == "\\":
+                    j += 1
+                elif code[j] == "\n" and ch != "`":
+                    break
+                j += 1
+            if j >= n or code[j] != ch:
+                return "syntax_error", f"Unterminated string literal on line {line}."
+            line += code.count("\n", i, j)
+            i = j
+        elif ch in "([{":
+            stack.append((ch, line))
+        elif ch in _PAIRS:
+            if not stack or stack[-1][0] != _PAIRS[ch]:
+                return "syntax_error", f"Unexpected '{ch}' on line {line}."
+            stack.pop()
+        i += 1
+    if stack:
+        ch, opened = stack[-1]
+        return "syntax_error", f"'{ch}' opened on line {opened} is never closed."
+    return None
+
+
+def static_check(code, language):
+    """
+    Returns (kind, message) when the submission can be answered without the model
+    (empty / syntax_error / indentation_error / stub), or None if it is viable.
+    """
+    if not code or not code.strip():
+        return "empty", "No code was submitted."
+    language = (language or "").lower()
+    if language == "python":
+        return _check_python(code)
+    if language in BRACE_LANGUAGES:
+        return _check_brackets(code, language)
+    return None
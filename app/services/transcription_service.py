@@ -0,0 +1,179 @@
+import os
+import time
+import queue
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from faster_whisper import WhisperModel, decode_audio
+
+# Whisper expects 16 kHz mono float32 input
+SAMPLE_RATE = 16000
+
+# --- Process-wide Whisper Pool ---
+# Loading a WhisperModel allocates the full set of weights, so we keep a small
+# pool of warm instances and let each /interact request borrow one.
+_SHARED_TRANSCRIBER = None
+_TRANSCRIBER_LOCK = threading.Lock()
+
+
+def default_pool_size():
+    """One model per couple of cores, capped so memory stays reasonable."""
+    return max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+class TranscriptionService:
+    def __init__(self, model_size="tiny.en", device="cpu", compute_type="int8",
+                 pool_size=None, cpu_threads=None, acquire_timeout=30):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.pool_size = pool_size or default_pool_size()
+        # Split the cores between pooled models so they don't oversubscribe the CPU
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // self.pool_size)
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._create_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "decode_total": 0.0,
+            "decode_max": 0.0,
+        }
+
+    def _load_model(self):
+        return WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+
+    def _try_create(self):
+        """Creates a new model if the pool is not yet full, otherwise returns None."""
+        with self._create_lock:
+            if self._created >= self.pool_size:
+                return None
+            self._created += 1
+        try:
+            return self._load_model()
+        except Exception:
+            with self._create_lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def acquire(self):
+        """Borrows a warm model from the pool, loading one lazily if there is room."""
+        try:
+            model = self._idle.get_nowait()
+        except queue.Empty:
+            model = self._try_create()
+            if model is None:
+                try:
+                    model = self._idle.get(timeout=self.acquire_timeout)
+                except queue.Empty:
+                    raise TimeoutError("No transcription model became available in time.")
+        try:
+            yield model
+        finally:
+            self._idle.put(model)
+
+    def warm_up(self):
+        """Loads every model in the pool up front so the first interviews don't pay for it."""
+        while True:
+            model = self._try_create()
+            if model is None:
+                break
+            self._idle.put(model)
+        print(f"Whisper pool ready: {self._created} x {self.model_size} ({self.cpu_threads} threads each)")
+
+    def transcribe(self, audio, **kwargs):
+        """Transcribes a file path, file object or float32 array; returns (text, timings)."""
+        queued_at = time.perf_counter()
+        with self.acquire() as model:
+            started_at = time.perf_counter()
+            segments, _ = model.transcribe(audio, **kwargs)
+            # Segments are lazy: decoding happens while we iterate, so do it under the lease
+            text = " ".join(s.text for s in segments)
+            finished_at = time.perf_counter()
+
+        timings = {
+            "queue_wait": round(started_at - queued_at, 4),
+            "decode": round(finished_at - started_at, 4),
+        }
+        self._record(timings)
+        return text, timings
+
+    def _record(self, timings):
+        with self._stats_lock:
+            s = self._stats
+            s["requests"] += 1
+            s["queue_wait_total"] += timings["queue_wait"]
+            s["queue_wait_max"] = max(s["queue_wait_max"], timings["queue_wait"])
+            s["decode_total"] += timings["decode"]
+            s["decode_max"] = max(s["decode_max"], timings["decode"])
+
+    def stats(self):
+        """Returns pool occupancy and queue-wait vs. decode timings."""
+        with self._stats_lock:
+            s = dict(self._stats)
+        count = s["requests"] or 1
+        return {
+            "model_size": self.model_size,
+            "pool_size": self.pool_size,
+            "loaded": self._created,
+            "idle": self._idle.qsize(),
+            "requests": s["requests"],
+            "avg_queue_wait": round(s["queue_wait_total"] / count, 4),
+            "max_queue_wait": round(s["queue_wait_max"], 4),
+            "avg_decode": round(s["decode_total"] / count, 4),
+            "max_decode": round(s["decode_max"], 4),
+        }
+
+
+def decode_upload(stream, max_in_memory_bytes=10 * 1024 * 1024):
+    """
+    Decodes an uploaded audio stream (webm/wav/...) into a 16 kHz float32 array.
+    The bytes stay in memory unless the upload exceeds max_in_memory_bytes, in which
+    case they spill to a private temp file (never the process working directory).
+    """
+    with tempfile.SpooledTemporaryFile(max_size=max_in_memory_bytes) as buf:
+        shutil.copyfileobj(stream, buf, 65536)
+        buf.seek(0)
+        return decode_audio(buf, sampling_rate=SAMPLE_RATE)
+
+
+def get_transcriber(config):
+    """Returns the process-wide TranscriptionService, creating it on first use."""
+    global _SHARED_TRANSCRIBER
+    if _SHARED_TRANSCRIBER is None:
+        with _TRANSCRIBER_LOCK:
+            if _SHARED_TRANSCRIBER is None:
+                _SHARED_TRANSCRIBER = TranscriptionService(
+                    model_size=config.get('WHISPER_MODEL_SIZE', 'tiny.en'),
+                    device=config.get('WHISPER_DEVICE', 'cpu'),
+                    compute_type=config.get('WHISPER_COMPUTE_TYPE', 'int8'),
+                    pool_size=config.get('WHISPER_POOL_SIZE'),
+                    cpu_threads=config.get('WHISPER_CPU_THREADS'),
+                )
+    return _SHARED_TRANSCRIBER
+
+
+def warm_up_in_background(config):
+    """Starts loading the pool on a daemon thread so app startup isn't blocked."""
+    transcriber = get_transcriber(config)
+
+    def _run():
+        try:
+            transcriber.warm_up()
+        except Exception as e:
+            print(f"Whisper warm-up failed: {e}")
+
+    threading.Thread(target=_run, name="whisper-warmup", daemon=True).start()
+    return transcriber
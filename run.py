@@ -7,9 +7,11 @@ warnings.filterwarnings('ignore', category=DeprecationWarning)
 warnings.filterwarnings('ignore', category=FutureWarning)
 warnings.filterwarnings('ignore', category=UserWarning)
 
-app = create_app()
-
 if __name__ == '__main__':
+    # Built only when run as a script: spawned worker processes (e.g. the PDF render
+    # pool) re-import this module and must not start a second app.
+    app = create_app()
+
     # Initialize DB tables automatically on first run if needed
     with app.app_context():
         from app.db import init_db
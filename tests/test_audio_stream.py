@@ -0,0 +1,144 @@
+import threading
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app
+from app.db import init_db, get_db
+from app.services.audio_stream import AudioStream
+from app.services.transcription_service import SAMPLE_RATE
+
+class FakeTranscriber:
+    def __init__(self):
+        self.segments = []
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, **kwargs):
+        with self.lock:
+            self.segments.append(len(audio) / SAMPLE_RATE)
+            n = len(self.segments)
+        return f" part {n}", {"queue_wait": 0.0, "decode": 0.01}
+
+def tone(seconds):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def silence(seconds):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(SAMPLE_RATE * seconds)) * 0.0003).astype(np.float32)
+
+def pcm16(samples):
+    return (samples * 32767).astype('<i2').tobytes()
+
+def feed_in_chunks(stream, samples, chunk_seconds=0.25):
+    status = None
+    step = int(SAMPLE_RATE * chunk_seconds)
+    for i in range(0, len(samples), step):
+        status = stream.feed_pcm16(pcm16(samples[i:i + step]))
+    return status
+
+@pytest.fixture
+def transcriber():
+    return FakeTranscriber()
+
+@pytest.fixture
+def stream(transcriber):
+    return AudioStream(transcriber, ThreadPoolExecutor(max_workers=2), pause_ms=300, end_ms=900)
+
+def test_segments_are_transcribed_at_pauses_while_streaming(stream, transcriber):
+    audio = np.concatenate([silence(0.5), tone(1.0), silence(0.45), tone(0.8), silence(0.5)])
+    status = feed_in_chunks(stream, audio)
+
+    # Both segments were cut (and sent to Whisper) before the candidate finished
+    assert status["segments"] == 2
+    assert status["end_of_utterance"] is False
+    text, timings = stream.finish()
+    assert text == "part 1 part 2"
+    assert timings["segments"] == 2
+    # Leading silence is not transcribed; segments are the speech plus short padding
+    assert 1.0 <= transcriber.segments[0] < 1.5
+    assert 0.8 <= transcriber.segments[1] < 1.3
+
+def test_end_of_utterance_after_a_long_pause(stream):
+    status = feed_in_chunks(stream, np.concatenate([tone(0.6), silence(1.2)]))
+    assert status["end_of_utterance"] is True
+    assert stream.finish()[0] == "part 1"
+
+def test_silence_and_clicks_never_reach_whisper(stream, transcriber):
+    feed_in_chunks(stream, np.concatenate([silence(1.0), tone(0.03), silence(1.5)]))
+    status = stream.status()
+    assert status["end_of_utterance"] is False
+    assert stream.finish()[0] == ""
+    assert transcriber.segments == []
+
+def test_trailing_speech_is_transcribed_on_finish(stream, transcriber):
+    feed_in_chunks(stream, tone(0.7))
+    assert stream.status()["speaking"] is True
+    assert stream.finish()[0] == "part 1"
+    with pytest.raises(ValueError):
+        stream.feed(tone(0.1))
+
+class EchoLLM:
+    def invoke(self, messages):
+        return "Tell me more."
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, transcriber):
+    monkeypatch.setattr('app.routes.interview.get_transcriber', lambda config: transcriber)
+    monkeypatch.setattr('app.routes.interview.LLMFactory.get_ollama_chat', staticmethod(lambda: EchoLLM()))
+    monkeypatch.setattr('app.routes.interview._speak', lambda token, sid, text: None)
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test'})
+    with app.app_context():
+        init_db()
+        get_db().execute("INSERT INTO chats (id, username) VALUES ('c1', 'tester')")
+        get_db().commit()
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+                sess['chat_id'] = 'c1'
+            yield client
+
+def test_streamed_utterance_gets_an_interact_reply(client):
+    stream_id = client.post('/audio_stream').get_json()["stream_id"]
+    audio = pcm16(np.concatenate([tone(0.8), silence(0.5), tone(0.5)]))
+    for i in range(0, len(audio), 8000):
+        r = client.post(f'/audio_stream/{stream_id}', data=audio[i:i + 8000],
+                        content_type='application/octet-stream')
+        assert r.status_code == 200
+
+    r = client.post(f'/audio_stream/{stream_id}/finish', data={'emotion_context': '{}'})
+    assert r.get_json() == {"user_text": "part 1 part 2", "gemini_text": "Tell me more."}
+    rows = get_db().execute("SELECT role, message FROM messages WHERE chat_id = 'c1' ORDER BY id").fetchall()
+    assert [(r['role'], r['message']) for r in rows] == [('user', "part 1 part 2"), ('ai', "Tell me more.")]
+
+    # Finished streams are gone
+    assert client.post(f'/audio_stream/{stream_id}/finish').status_code == 404
+
+def test_streams_belong_to_their_user(client):
+    stream_id = client.post('/audio_stream').get_json()["stream_id"]
+    with client.session_transaction() as sess:
+        sess['user_id'] = 2
+    assert client.post(f'/audio_stream/{stream_id}', data=b'\x00\x00').status_code == 404
+
+def test_noise_floor_follows_a_loud_background(stream, transcriber):
+    rng = np.random.default_rng(1)
+    hum = (rng.standard_normal(int(SAMPLE_RATE * 2.0)) * 0.02).astype(np.float32)  # about -34 dBFS
+    status = feed_in_chunks(stream, np.concatenate([hum, hum[:SAMPLE_RATE // 2] + tone(0.5)[:SAMPLE_RATE // 2], hum]))
+    assert status["segments"] == 1
+    assert stream.finish()[0] == "part 1"
+    assert transcriber.segments[0] < 1.0
+
+def test_streams_are_capped_per_user(transcriber):
+    from app.services.audio_stream import AudioStreamRegistry
+    registry = AudioStreamRegistry(transcriber, max_per_owner=2)
+    first, second, third = (registry.create(owner=1) for _ in range(3))
+    other = registry.create(owner=2)
+    assert registry.get(first.id, owner=1) is None
+    assert registry.get(second.id, owner=1) is second and registry.get(third.id, owner=1) is third
+    assert registry.get(other.id, owner=2) is other
+    with pytest.raises(ValueError):
+        registry.create(owner=None)
+
+def test_opening_a_stream_requires_login(client):
+    with client.session_transaction() as sess:
+        sess.pop('user_id')
+    assert client.post('/audio_stream').status_code == 401
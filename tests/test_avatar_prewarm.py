@@ -0,0 +1,109 @@
+import time
+import threading
+import pytest
+from app import create_app
+from app.db import init_db
+from app.services.avatar_prewarm import AvatarPrewarmer
+
+class FakeHeyGen:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def create_token(self):
+        if self.fail:
+            raise RuntimeError("HeyGen down")
+        with self.lock:
+            self.count += 1
+            self.calls.append("create_token")
+            return f"tok-{self.count}"
+
+    def new_session(self, token, avatar_id):
+        self.calls.append("new")
+        return {"session_id": f"sess-{token}", "url": "wss://livekit", "access_token": "lk"}
+
+    def start_session(self, token, session_id):
+        self.calls.append(("start", session_id))
+
+    def stop_session_async(self, token, session_id):
+        self.calls.append(("stop", session_id))
+
+    def stats(self):
+        return {"queued": 0, "dispatched": 0, "failed": 0}
+
+def test_claim_returns_the_prewarmed_session():
+    client = FakeHeyGen()
+    prewarmer = AvatarPrewarmer(client, "avatar-1")
+    assert prewarmer.prewarm(1) is True
+    assert prewarmer.prewarm(1) is False  # one warm session per user
+
+    token, data = prewarmer.claim(1)
+    assert token == "tok-1" and data['session_id'] == "sess-tok-1"
+    assert prewarmer.claim(1) is None
+    assert prewarmer.stats() == {"pending": 0, "hits": 1, "misses": 1, "expired": 0}
+
+def test_expired_and_discarded_sessions_are_stopped():
+    client = FakeHeyGen()
+    prewarmer = AvatarPrewarmer(client, "avatar-1", ttl=0)
+    prewarmer.prewarm(1)
+    prewarmer._pending[1][1].result()
+    assert prewarmer.claim(1) is None
+    assert ("stop", "sess-tok-1") in client.calls
+    assert prewarmer.stats()["expired"] == 1
+
+    prewarmer.ttl = 60
+    prewarmer.prewarm(2)
+    prewarmer._pending[2][1].result()
+    prewarmer.discard(2)
+    assert ("stop", "sess-tok-2") in client.calls
+
+def test_unclaimed_sessions_are_stopped_at_the_ttl_without_further_calls():
+    client = FakeHeyGen()
+    prewarmer = AvatarPrewarmer(client, "avatar-1", ttl=0.2)
+    prewarmer.prewarm(1)
+    deadline = time.monotonic() + 5
+    while ("stop", "sess-tok-1") not in client.calls and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert ("stop", "sess-tok-1") in client.calls
+    assert prewarmer.expired == 1 and not prewarmer._pending
+
+def test_failed_prewarm_is_a_miss():
+    prewarmer = AvatarPrewarmer(FakeHeyGen(fail=True), "avatar-1")
+    prewarmer.prewarm(1)
+    assert prewarmer.claim(1) is None
+    assert prewarmer.stats()["misses"] == 1
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    fake = FakeHeyGen()
+    monkeypatch.setattr('app.services.avatar_prewarm.get_heygen_client', lambda config: fake)
+    monkeypatch.setattr('app.routes.interview.get_heygen_client', lambda config: fake)
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test',
+                      'HEYGEN_API_KEY': 'key', 'HEYGEN_AVATAR_ID': 'avatar-1', 'HEYGEN_PREWARM_ENABLED': True})
+    with app.app_context():
+        init_db()
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 7
+                sess['username'] = 'tester'
+            fake.client = client
+            yield fake
+
+def test_enter_interview_prewarms_and_start_only_starts(fake):
+    client = fake.client
+    assert client.post('/start_chat_session', json={'jd_id': 1}).status_code == 200
+
+    r = client.post('/start_session')
+    assert r.status_code == 200
+    assert r.get_json()['session_id'] == "sess-tok-1"
+    assert fake.calls == ["create_token", "new", ("start", "sess-tok-1")]
+    assert client.get('/heygen_stats').get_json()["prewarm"]["hits"] == 1
+
+def test_stop_session_releases_an_unclaimed_warm_session(fake):
+    client = fake.client
+    client.post('/start_chat_session', json={'jd_id': 1})
+    client.application.extensions["avatar_prewarm"]._pending[7][1].result()
+    client.post('/stop_session')
+    assert ("stop", "sess-tok-1") in fake.calls
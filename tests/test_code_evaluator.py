@@ -0,0 +1,100 @@
+import json
+import pytest
+from app import create_app
+from app.db import init_db, get_db
+from app.services.code_evaluator import CodeEvaluator
+from app.services.code_sandbox import CodeSandbox
+
+class CountingRouter:
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, call_type, messages):
+        self.calls.append(call_type)
+        if call_type == "hint":
+            return "Think about two pointers."
+        if call_type == "test_cases":
+            return json.dumps({"function_name": "reverse", "tests": [
+                {"args": ["abc"], "expected": "cba"}, {"args": [""], "expected": ""}]})
+        if call_type == "code_feedback":
+            return "Clean and idiomatic."
+        return json.dumps({"passed": True, "score": "3/3", "feedback": "Correct", "test_results": []})
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test'})
+    router = CountingRouter()
+    monkeypatch.setattr('app.services.code_evaluator.LLMFactory.get_router', staticmethod(lambda: router))
+    with app.app_context():
+        init_db()
+        app.router = router
+        yield app
+
+def test_identical_submissions_hit_the_cache(app):
+    ce = CodeEvaluator()
+    code = "def rev(s):\n    return s[::-1]\n"
+    reformatted = "# reverse it\ndef rev(s):\n\n    return s[::-1]   # slicing\n"
+
+    first = ce.evaluate(code, "python", "Write a function that reverses a string.", user_id=1)
+    second = ce.evaluate(reformatted, "Python", "write a function that reverses a string", user_id=2)
+    assert first == second
+    assert app.router.calls == ["code_eval"]
+    assert ce.cache.stats()["hits"] == 1
+
+    # Different code is a different key
+    ce.evaluate("def rev(s):\n    return ''.join(reversed(s))\n", "python", "Write a function that reverses a string.")
+    assert app.router.calls == ["code_eval", "code_eval"]
+
+    # Every submission is still recorded for the candidate's history
+    assert get_db().execute("SELECT COUNT(*) FROM code_checks WHERE status = 'True'").fetchone()[0] == 3
+
+def test_cache_survives_restart_through_code_checks(app):
+    CodeEvaluator().get_hint("Write a function that reverses a string.")
+    CodeEvaluator().evaluate("print(1)", "python", "Print one")
+    assert app.router.calls == ["hint", "code_eval"]
+
+    restarted = CodeEvaluator()
+    assert restarted.get_hint("Write a function that reverses a string.") == "Think about two pointers."
+    assert restarted.evaluate("print( 1 )", "python", "Print one")["score"] == "3/3"
+    assert app.router.calls == ["hint", "code_eval"]
+    assert restarted.cache.stats()["db_hits"] == 2
+
+@pytest.mark.skipif(not CodeSandbox().isolated, reason="needs root (unshare + setuid) for sandbox isolation")
+def test_python_is_scored_by_running_tests(app):
+    ce = CodeEvaluator(sandbox=CodeSandbox(timeout=1))
+    result = ce.evaluate("def reverse(s):\n    return s[::-1]\n", "python", "Reverse a string")
+    assert result["score"] == "2/2" and result["passed"] is True
+    assert result["execution"] == "local"
+    assert result["feedback"] == "Clean and idiomatic."
+
+    # Test cases are generated once per question; the score comes from execution, not the model
+    wrong = ce.evaluate("def reverse(s):\n    return s\n", "python", "Reverse a string")
+    assert wrong["score"] == "1/2" and wrong["passed"] is False
+    assert wrong["test_results"][0]["actual_output"] == "abc"
+    assert app.router.calls == ["test_cases", "code_feedback", "code_feedback"]
+
+def test_broken_or_stub_code_never_reaches_the_model(app):
+    ce = CodeEvaluator(sandbox=CodeSandbox(timeout=1))
+    syntax = ce.evaluate("def reverse(s)\n    return s[::-1]\n", "python", "Reverse a string")
+    indent = ce.evaluate("def reverse(s):\nreturn s\n", "python", "Reverse a string")
+    stub = ce.evaluate("def reverse(s):\n    pass\n", "python", "Reverse a string")
+    braces = ce.evaluate("function f(s) { return s.split('').reverse().join(''); ", "javascript", "Reverse a string")
+    assert syntax["static_check"] == "syntax_error" and "line 1" in syntax["feedback"]
+    assert indent["static_check"] == "indentation_error"
+    assert stub["static_check"] == "stub"
+    assert braces["static_check"] == "syntax_error"
+    assert app.router.calls == []
+
+def test_resubmitting_the_same_code_reuses_the_previous_result(app):
+    ce = CodeEvaluator()
+    first = ce.evaluate("print(1)", "python", "Print one", user_id=7)
+    ce.cache = type(ce.cache)()  # even with a cold cache
+    again = ce.evaluate("print(1)  # same", "python", "Print one", user_id=7)
+    assert again["duplicate"] is True and again["score"] == first["score"]
+    assert app.router.calls == ["code_eval"]
+
+def test_evaluate_code_requires_login(app):
+    client = app.test_client()
+    r = client.post('/evaluate_code', json={"code": "print(1)", "language": "python", "question": "Print one"})
+    assert r.status_code == 401
+    assert app.router.calls == []
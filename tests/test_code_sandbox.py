@@ -0,0 +1,87 @@
+import json
+import pytest
+from app.services.code_sandbox import CodeSandbox
+
+pytestmark = pytest.mark.skipif(not CodeSandbox().isolated, reason="needs root (unshare + setuid) for sandbox isolation")
+
+TESTS = [{"args": ["abc"], "expected": "cba"}, {"args": [""], "expected": ""}, {"args": ["ab"], "expected": "ba"}]
+
+def test_runs_tests_and_reports_real_results():
+    run = CodeSandbox(timeout=1).run_python("def rev(s):\n    print('debug')\n    return s[::-1]\n", TESTS)
+    assert run["error"] is None
+    assert [r["passed"] for r in run["results"]] == [True, True, True]
+    assert all("time_ms" in r for r in run["results"])
+    # Candidate output is swallowed: it neither corrupts the result nor reaches the client
+    assert "debug" not in json.dumps(run)
+
+def test_wrong_answers_and_infinite_loops_fail_individually():
+    code = "def rev(s):\n    while s == '':\n        pass\n    return s\n"
+    run = CodeSandbox(timeout=0.5).run_python(code, TESTS)
+    passed = [r["passed"] for r in run["results"]]
+    assert passed == [False, False, False]
+    assert run["results"][0]["actual_output"] == "abc"
+    assert "Timed out" in run["results"][1]["error"]
+
+def test_memory_limit_and_syntax_errors():
+    sandbox = CodeSandbox(timeout=1, memory_mb=128)
+    run = sandbox.run_python("def f(x):\n    return [0] * (10 ** 9)\n", [{"args": [1], "expected": 1}])
+    assert "MemoryError" in run["results"][0]["error"]
+
+    run = sandbox.run_python("def f(x) return x", [{"args": [1], "expected": 1}])
+    assert run["results"] == []
+    assert run["error"].startswith("SyntaxError")
+
+def test_code_runs_unprivileged_without_network_or_subprocesses():
+    code = (
+        "import os\n"
+        "def probe(what):\n"
+        "    if what == 'uid':\n"
+        "        return os.getuid()\n"
+        "    if what == 'net':\n"
+        "        return [l.split(':')[0].strip() for l in open('/proc/net/dev').read().splitlines()[2:]]\n"
+        "    pid = os.fork()\n"
+        "    if pid == 0:\n"
+        "        os._exit(0)\n"
+        "    return 'forked'\n"
+    )
+    run = CodeSandbox(timeout=1).run_python(code, [{"args": ["uid"], "expected": 0}, {"args": ["net"], "expected": []},
+                                                   {"args": ["fork"], "expected": None}])
+    uid, net, fork = run["results"]
+    assert uid["actual_output"] != 0
+    assert net["actual_output"] == ["lo"]
+    assert fork["error"].startswith("BlockingIOError")
+
+def test_refuses_to_run_without_isolation():
+    sandbox = CodeSandbox(timeout=1, user="root")
+    assert not sandbox.isolated
+    run = sandbox.run_python("def f(x):\n    return x\n", [{"args": [1], "expected": 1}])
+    assert run["results"] == [] and "isolation" in run["error"]
+
+def test_solution_class_and_tuple_results():
+    code = "class Solution:\n    def pair(self, a, b):\n        return (b, a)\n"
+    run = CodeSandbox(timeout=1).run_python(code, [{"args": [1, 2], "expected": [2, 1]}])
+    assert run["results"][0]["passed"] is True
+
+def test_code_cannot_forge_its_own_results():
+    forge_stdout = (
+        "import os\n"
+        "fake = b'{\"results\": [{\"passed\": true}, {\"passed\": true}, {\"passed\": true}], \"error\": null}'\n"
+        "os.write(1, fake)\n"
+        "os._exit(0)\n"
+    )
+    run = CodeSandbox(timeout=1).run_python(forge_stdout, TESTS)
+    assert run["results"] == [] and run["error"].startswith("Execution failed")
+
+    # Even writing to every open descriptor cannot claim passes without the right outputs
+    forge_pipe = (
+        "import os, json\n"
+        "fake = json.dumps({'results': [{'actual_output': 'nope'}] * 3, 'error': None}).encode()\n"
+        "for fd in range(3, 64):\n"
+        "    try:\n"
+        "        os.write(fd, fake)\n"
+        "    except OSError:\n"
+        "        pass\n"
+        "os._exit(0)\n"
+    )
+    run = CodeSandbox(timeout=1).run_python(forge_pipe, TESTS)
+    assert not any(r["passed"] for r in run["results"])
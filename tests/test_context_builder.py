@@ -0,0 +1,112 @@
+import pytest
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from app import create_app
+from app.db import init_db, get_db
+from app.services.context_builder import ContextBuilder, estimate_tokens
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+class SummaryRouter:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, call_type, messages):
+        assert call_type == "context_summary"
+        self.prompts.append(messages[-1].content)
+        return FakeResponse(f"Summary v{len(self.prompts)}: candidate discussed Python.")
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    router = SummaryRouter()
+    monkeypatch.setattr('app.services.context_builder.LLMFactory.get_router', staticmethod(lambda: router))
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test'})
+    app.router_stub = router
+    with app.app_context():
+        init_db()
+        get_db().execute("INSERT INTO chats (id, username) VALUES ('c1', 'tester')")
+        get_db().commit()
+        yield app
+
+def add_turns(db, n, start=0):
+    for i in range(start, start + n):
+        db.execute("INSERT INTO messages (chat_id, role, message) VALUES ('c1', 'user', ?)", (f"Answer {i}",))
+        db.execute("INSERT INTO messages (chat_id, role, message) VALUES ('c1', 'ai', ?)", (f"Question {i}?",))
+    db.commit()
+
+def wait_for_summaries(builder):
+    # Single worker: this returns once every earlier summary job has finished
+    builder._executor.submit(lambda: None).result()
+
+def test_recent_window_and_emotion_at_the_end(app):
+    db = get_db()
+    add_turns(db, 2)
+    builder = ContextBuilder(app, recent_messages=6)
+    messages = builder.build(db, 'c1', "I like Flask", '{"happy": 0.9}', "Python", "Flask", ["Q1", "Q2"])
+
+    assert isinstance(messages[0], SystemMessage)
+    assert "Questions: ['Q1', 'Q2']" in messages[0].content
+    assert [type(m) for m in messages[1:-1]] == [HumanMessage, AIMessage] * 2
+    assert messages[-1].content.startswith("I like Flask")
+    assert '[Candidate emotion: {"happy": 0.9}]' in messages[-1].content
+    assert "happy" not in messages[0].content
+
+def test_static_prefix_is_cached_per_chat(app):
+    builder = ContextBuilder(app)
+    first = builder.system_prefix('c1', "Python", "Flask", ["Q1"])
+    assert builder.system_prefix('c1', "Python", "Flask", ["Q1"]) is first
+    assert builder.system_prefix('c1', "Python", "Flask", ["Q1", "Q2"]) is not first
+    assert builder.stats()["prefix_cache"]["hits"] == 1
+
+def test_prefix_drops_trailing_questions_beyond_half_the_budget(app):
+    builder = ContextBuilder(app, token_budget=400)
+    questions = [f"Question number {i} about distributed systems?" for i in range(100)]
+    prefix = builder.system_prefix('c1', "Python", "Flask", questions)
+    assert estimate_tokens(prefix) <= 200
+    assert "Question number 0" in prefix and "Question number 99" not in prefix
+
+def test_older_turns_are_folded_into_a_rolling_summary(app):
+    db = get_db()
+    add_turns(db, 5)  # 10 messages, recent window 4 -> 6 fall out
+    builder = ContextBuilder(app, recent_messages=4, summary_batch=4)
+    builder.build(db, 'c1', "Next", "{}", "Python", "Flask", [])
+    wait_for_summaries(builder)
+
+    row = db.execute("SELECT summary, through_message_id FROM chat_summaries WHERE chat_id = 'c1'").fetchone()
+    assert row['summary'] == "Summary v1: candidate discussed Python."
+    assert row['through_message_id'] == 6
+    assert "Answer 0" in app.router_stub.prompts[0] and "Answer 3" not in app.router_stub.prompts[0]
+
+    messages = builder.build(db, 'c1', "Next", "{}", "Python", "Flask", [])
+    assert "Summary v1" in messages[0].content
+    assert [m.content for m in messages[1:-1]] == ["Answer 3", "Question 3?", "Answer 4", "Question 4?"]
+
+    # Incremental: the next summary only sees the new turns plus the previous summary
+    add_turns(db, 2, start=5)
+    builder.build(db, 'c1', "Next", "{}", "Python", "Flask", [])
+    wait_for_summaries(builder)
+    assert "Summary v1" in app.router_stub.prompts[1]
+    assert "Answer 2" not in app.router_stub.prompts[1] and "Answer 4" in app.router_stub.prompts[1]
+    assert builder.stats()["summaries"] == 2
+
+def test_turns_awaiting_summary_stay_verbatim(app):
+    db = get_db()
+    add_turns(db, 3)  # 6 messages, recent window 4 -> 2 left it, fewer than a summary batch
+    builder = ContextBuilder(app, recent_messages=4, summary_batch=4)
+    messages = builder.build(db, 'c1', "Next", "{}", "Python", "Flask", [])
+    wait_for_summaries(builder)
+
+    assert app.router_stub.prompts == []
+    assert [m.content for m in messages[1:3]] == ["Answer 0", "Question 0?"]
+    assert len(messages) == 8  # system + all 6 unsummarized messages + latest
+
+def test_token_budget_bounds_history(app):
+    db = get_db()
+    for i in range(3):
+        db.execute("INSERT INTO messages (chat_id, role, message) VALUES ('c1', 'user', ?)", ("word " * 400,))
+    db.commit()
+    builder = ContextBuilder(app, token_budget=1000, recent_messages=6, summary_batch=100)
+    messages = builder.build(db, 'c1', "Next", "{}", "Python", "Flask", [])
+    assert sum(estimate_tokens(m.content) for m in messages) <= 1000
+    assert len(messages) == 3  # system + the one long answer that fits + latest
@@ -0,0 +1,43 @@
+import sqlite3
+from app import create_app
+from app.db import init_db, get_db, migrate_db, MIGRATIONS
+
+def _app(path):
+    return create_app({'TESTING': True, 'DATABASE_URI': str(path), 'SECRET_KEY': 'test'})
+
+def test_connections_use_wal_and_hot_paths_use_indexes(tmp_path):
+    with _app(tmp_path / "fresh.db").app_context():
+        init_db()
+        db = get_db()
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert db.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1][0]
+
+        plan = " ".join(r[-1] for r in db.execute(
+            "EXPLAIN QUERY PLAN SELECT role, message FROM messages WHERE chat_id = ? ORDER BY id DESC LIMIT 6", ('c',)))
+        assert "idx_messages_chat_id" in plan
+        plan = " ".join(r[-1] for r in db.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM job_descriptions WHERE user_id = ? AND content_hash = ?", (1, 'h')))
+        assert "idx_job_descriptions_user_hash" in plan
+
+def test_migrations_upgrade_an_old_database(tmp_path):
+    path = tmp_path / "old.db"
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE code_checks (id INTEGER PRIMARY KEY, user_id INTEGER, question_context TEXT)")
+    legacy.execute("INSERT INTO code_checks (user_id, question_context) VALUES (1, 'q')")
+    legacy.commit()
+    legacy.close()
+
+    with _app(path).app_context():
+        init_db()
+        db = get_db()
+        columns = [r['name'] for r in db.execute("PRAGMA table_info(code_checks)")]
+        assert 'cache_key' in columns
+        assert db.execute("SELECT COUNT(*) FROM code_checks").fetchone()[0] == 1
+        tables = {r['name'] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {'extraction_cache', 'ocr_page_cache', 'analysis_jobs', 'session_analyses'} <= tables
+        indexes = {r['name'] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_analysis_jobs_active' in indexes
+        # Re-running is a no-op
+        migrate_db()
+        assert db.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1][0]
@@ -0,0 +1,129 @@
+import time
+from app.services.emotion_service import EmotionService
+
+class DummyDetector:
+    def detect_emotions(self, frame):
+        return []
+
+def _face(**emotions):
+    base = {"angry": 0.0, "disgust": 0.0, "fear": 0.0, "happy": 0.0, "sad": 0.0, "surprise": 0.0, "neutral": 0.0}
+    base.update(emotions)
+    return {"emotions": base}
+
+def test_sessions_are_averaged_independently():
+    svc = EmotionService(detector=DummyDetector())
+    svc._log_results([_face(happy=1.0)], "chat-a")
+    svc._log_results([_face(happy=0.5)], "chat-a")
+    svc._log_results([_face(sad=1.0)], "chat-b")
+
+    a = svc.get_and_reset_average("chat-a")
+    b = svc.get_and_reset_average("chat-b")
+    assert a["happy"] == 0.75 and a["sad"] == 0.0
+    assert b["sad"] == 1.0 and b["happy"] == 0.0
+
+    # Reading resets only that session's window
+    assert svc.get_and_reset_average("chat-a")["happy"] == 0.0
+
+def test_idle_sessions_are_evicted():
+    svc = EmotionService(detector=DummyDetector(), session_ttl=5)
+    svc._log_results([_face(neutral=1.0)], "stale")
+    svc._sessions["stale"].last_seen -= 10
+    svc._last_eviction -= 120
+
+    svc._log_results([_face(neutral=1.0)], "fresh")
+    assert "stale" not in svc._sessions
+    assert "fresh" in svc._sessions
+
+class ValueDetector:
+    def __init__(self):
+        self.frames = []
+
+    def detect_emotions(self, frame):
+        self.frames.append(frame)
+        return [_face(happy=float(frame))]
+
+def test_latest_frame_wins_when_session_is_behind(monkeypatch):
+    svc = EmotionService(detector=ValueDetector(), scene_threshold=0)
+    monkeypatch.setattr(svc, '_ensure_worker', lambda: None)
+
+    svc.submit_frame(0.1, "chat-a")
+    svc.submit_frame(0.9, "chat-a")
+    svc.submit_frame(0.5, "chat-b")
+
+    batch = {key: frame for key, frame, _ in svc._take_batch()}
+    assert batch == {"chat-a": 0.9, "chat-b": 0.5}
+    assert svc.stats()["dropped"] == 1
+
+def test_worker_processes_queued_frames():
+    detector = ValueDetector()
+    svc = EmotionService(detector=detector, scene_threshold=0)
+    svc.submit_frame(1.0, "chat-a")
+
+    deadline = time.time() + 5
+    while svc.stats()["processed"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert detector.frames == [1.0]
+    assert svc.stats()["passes"] >= 1
+    assert svc.get_and_reset_average("chat-a")["happy"] == 1.0
+
+def test_binary_frames_are_downscaled_on_decode():
+    import cv2
+    import numpy as np
+    ok, jpeg = cv2.imencode(".jpg", np.zeros((720, 1280, 3), dtype=np.uint8))
+    assert ok
+
+    svc = EmotionService(detector=DummyDetector(), max_frame_width=320, decode_reduction=2)
+    frame = svc.decode_frame_bytes(jpeg.tobytes())
+    assert frame.shape[:2] == (180, 320)
+    assert svc.decode_frame_bytes(b"not a jpeg") is None
+
+class CountingDetector:
+    def __init__(self):
+        self.calls = 0
+
+    def detect_emotions(self, frame):
+        self.calls += 1
+        return [_face(happy=1.0)]
+
+def test_unchanged_frames_reuse_previous_emotions():
+    import base64
+    import cv2
+    import numpy as np
+    still = base64.b64encode(cv2.imencode(".jpg", np.full((120, 160, 3), 100, np.uint8))[1]).decode()
+    moved = base64.b64encode(cv2.imencode(".jpg", np.full((120, 160, 3), 200, np.uint8))[1]).decode()
+
+    detector = CountingDetector()
+    svc = EmotionService(detector=detector, scene_threshold=4.0, max_skip=2)
+    for _ in range(4):
+        svc.process_frame(still, "chat-a")
+    svc.process_frame(moved, "chat-a")
+
+    # frame 1 detected, 2-3 skipped, 4 forced by max_skip, 5 is a scene change
+    assert detector.calls == 3
+    stats = svc.stats()
+    assert stats["frames_skipped"] == 2 and stats["frames_detected"] == 3
+    # Skipped frames still count towards the average with the reused vector
+    assert svc._sessions["chat-a"].count == 5
+
+def test_dropped_frames_never_become_the_scene_reference(monkeypatch):
+    import numpy as np
+    detector = CountingDetector()
+    svc = EmotionService(detector=detector, scene_threshold=4.0)
+    monkeypatch.setattr(svc, '_ensure_worker', lambda: None)
+    dark, bright = np.full((120, 160, 3), 50, np.uint8), np.full((120, 160, 3), 200, np.uint8)
+
+    svc.submit_frame(dark, "chat-a")
+    svc.submit_frame(bright, "chat-a")  # replaces the queued dark frame
+    assert svc.stats()["frames_detected"] == 0
+    assert svc._sessions["chat-a"].last_thumb is None
+
+    (key, frame, thumb), = svc._take_batch()
+    svc._log_results(detector.detect_emotions(frame), key, thumb)
+    assert svc.stats()["frames_detected"] == 1
+
+    # The analysed (bright) frame is the reference, not the dropped dark one
+    svc.submit_frame(bright.copy(), "chat-a")
+    assert svc.stats()["frames_skipped"] == 1
+    svc.submit_frame(dark, "chat-a")
+    assert svc.stats()["pending"] == 1
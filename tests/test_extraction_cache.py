@@ -0,0 +1,95 @@
+import fitz
+import pytest
+from app import create_app
+from app.db import init_db, get_db
+from app.services import extraction_cache
+from app.services.jd_analyzer import JDAnalyzer
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'DATABASE_URI': str(tmp_path / "test.db"),
+        'SECRET_KEY': 'test',
+        'EXTRACTION_CACHE_MAX_DOCUMENTS': 2,
+    })
+    with app.app_context():
+        init_db()
+        yield app
+
+def _make_pdf(path, text):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+def test_repeat_extraction_skips_pymupdf(app, tmp_path, monkeypatch):
+    pdf = tmp_path / "resume.pdf"
+    _make_pdf(pdf, "Python, Flask, SQL")
+
+    analyzer = JDAnalyzer()
+    first = analyzer.extract_text_from_pdf(str(pdf))
+    assert "Flask" in first
+
+    def boom(*args, **kwargs):
+        raise AssertionError("PDF should not be re-parsed")
+    monkeypatch.setattr('app.services.jd_analyzer.fitz.open', boom)
+
+    assert analyzer.extract_text_from_pdf(str(pdf)) == first
+
+def test_cache_is_size_bounded(app):
+    for i in range(5):
+        extraction_cache.put_document_text(f"hash-{i}", f"text {i}")
+    count = get_db().execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+    assert count == 2
+
+class ShadeReader:
+    """Stands in for EasyOCR: 'reads' each page as its gray level."""
+    def readtext(self, img, detail=0, paragraph=True):
+        return [f"shade {int(img.mean())}"]
+
+def test_scanned_pages_are_ocred_in_page_order(app, tmp_path, monkeypatch):
+    doc = fitz.open()
+    for shade in (40, 120, 200):
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 50, 50), False)
+        pix.set_rect(pix.irect, (shade, shade, shade))
+        doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=pix)
+    pdf = tmp_path / "scan.pdf"
+    doc.save(str(pdf))
+    doc.close()
+
+    monkeypatch.setattr('app.services.jd_analyzer.get_ocr_reader', lambda: ShadeReader())
+    app.config['OCR_DPI'] = 20
+
+    text = JDAnalyzer().extract_text_from_pdf(str(pdf))
+    shades = [line for line in text.split("\n") if line]
+    assert len(shades) == 3
+    values = [int(line.split()[1]) for line in shades]
+    assert values == sorted(values)
+
+    # Pages are cached individually for the next document that shares them
+    assert get_db().execute("SELECT COUNT(*) FROM ocr_page_cache").fetchone()[0] == 3
+
+def test_text_cut_short_by_the_ocr_budget_is_not_cached(app, tmp_path, monkeypatch):
+    doc = fitz.open()
+    for shade in (40, 120, 200):
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 50, 50), False)
+        pix.set_rect(pix.irect, (shade, shade, shade))
+        doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=pix)
+    pdf = tmp_path / "scan.pdf"
+    doc.save(str(pdf))
+    doc.close()
+
+    monkeypatch.setattr('app.services.jd_analyzer.get_ocr_reader', lambda: ShadeReader())
+    app.config['OCR_DPI'] = 20
+    app.config['OCR_MAX_PAGES'] = 2
+
+    first = JDAnalyzer().extract_text_from_pdf(str(pdf))
+    assert len([line for line in first.split("\n") if line]) == 2
+    assert get_db().execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0] == 0
+
+    # Cached pages don't use up the budget, so the next pass completes the document
+    second = JDAnalyzer().extract_text_from_pdf(str(pdf))
+    assert len([line for line in second.split("\n") if line]) == 3
+    assert get_db().execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0] == 1
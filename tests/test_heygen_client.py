@@ -0,0 +1,99 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from app.services.heygen_client import HeyGenClient
+
+class StubHeyGen(BaseHTTPRequestHandler):
+    """Minimal local stand-in for the HeyGen streaming API."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)) or 0)
+        endpoint = self.path.rsplit("/", 1)[-1]
+        with server.lock:
+            server.calls.append((endpoint, json.loads(body) if body else None, dict(self.headers)))
+            server.ports.add(self.client_address[1])
+            fail = server.fail_next > 0
+            if fail:
+                server.fail_next -= 1
+        if fail:
+            self._reply(server.fail_status, {"error": "busy"})
+        elif endpoint == "streaming.create_token":
+            self._reply(200, {"data": {"token": "tok-1"}})
+        elif endpoint == "streaming.new":
+            self._reply(200, {"data": {"session_id": "sess-1", "url": "wss://livekit", "access_token": "lk"}})
+        else:
+            self._reply(200, {"code": 100})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHeyGen)
+    server.calls, server.ports, server.fail_next, server.lock = [], set(), 0, threading.Lock()
+    server.fail_status = 503
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(stub):
+    return HeyGenClient("key-1", base_url=f"http://127.0.0.1:{stub.server_address[1]}/v1", retries=2)
+
+def test_session_lifecycle_uses_api_key_then_bearer_token(client, stub):
+    token = client.create_token()
+    data = client.new_session(token, "avatar-1")
+    client.start_session(token, data['session_id'])
+
+    assert token == "tok-1" and data['session_id'] == "sess-1"
+    assert [c[0] for c in stub.calls] == ["streaming.create_token", "streaming.new", "streaming.start"]
+    assert stub.calls[0][2].get('X-API-KEY') == "key-1"
+    assert stub.calls[1][1]['avatar_id'] == "avatar-1"
+    assert stub.calls[2][2].get('Authorization') == "Bearer tok-1"
+
+def test_calls_reuse_one_keep_alive_connection(client, stub):
+    for i in range(5):
+        client.send_task("tok-1", "sess-1", f"Sentence {i}.")
+    assert len(stub.calls) == 5
+    assert len(stub.ports) == 1
+
+def test_async_tasks_are_sent_in_order(client, stub):
+    for i in range(20):
+        client.send_task_async("tok-1", "sess-1", f"Sentence {i}.")
+    client.stop_session_async("tok-1", "sess-1")
+    client.flush()
+
+    assert [c[1]['text'] for c in stub.calls[:-1]] == [f"Sentence {i}." for i in range(20)]
+    assert stub.calls[-1][0] == "streaming.stop"
+    assert client.stats() == {"queued": 0, "dispatched": 21, "failed": 0}
+
+def test_overloaded_responses_are_retried(client, stub):
+    stub.fail_next = 2
+    client.send_task("tok-1", "sess-1", "Hello.")
+    assert len(stub.calls) == 3
+
+def test_gateway_errors_are_not_retried(client, stub):
+    # A 502/504 may come back after HeyGen already accepted the task
+    stub.fail_next, stub.fail_status = 2, 502
+    with pytest.raises(requests.HTTPError):
+        client.send_task("tok-1", "sess-1", "Hello.")
+    assert len(stub.calls) == 1
+
+def test_async_failures_are_counted_not_raised(client, stub):
+    stub.fail_next = 10
+    client.send_task_async("tok-1", "sess-1", "Hello.")
+    client.flush()
+    assert client.stats()["failed"] == 1
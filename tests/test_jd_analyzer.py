@@ -0,0 +1,38 @@
+import time
+from app.services.jd_analyzer import JDAnalyzer
+
+def _analyzer(extract_delay=0.0, comparison=None):
+    analyzer = JDAnalyzer.__new__(JDAnalyzer)
+
+    def extract_skills(text, is_jd=False):
+        time.sleep(extract_delay)
+        return "Python, Go" if is_jd else "Python"
+    analyzer.extract_skills = extract_skills
+    if comparison is not None:
+        analyzer.compare_and_generate_questions = comparison
+    return analyzer
+
+def test_independent_skill_extractions_overlap():
+    analyzer = _analyzer(
+        extract_delay=0.3,
+        comparison=lambda r, j: ({"common_skills": ["Python"]}, {"skills_to_learn": ["Go"]}, {"questions": ["q"]}),
+    )
+    result = analyzer.analyze_resume("resume text", jd_skills=None, jd_text="jd text")
+
+    assert result["jd_skills"] == "Python, Go"
+    assert result["questions"] == {"questions": ["q"]}
+    # Both 0.3s extractions ran side by side rather than back to back
+    assert result["timings"]["total"] < 0.55
+    assert set(result["timings"]) >= {"resume_skills", "jd_skills", "comparison", "total"}
+
+def test_comparison_timeout_falls_back_to_local_matching():
+    def slow(r, j):
+        time.sleep(1)
+        return None
+    analyzer = _analyzer(comparison=slow)
+    result = analyzer.analyze_resume("resume text", jd_skills="Python, Go", timeout=0.2)
+
+    assert result["timings"]["comparison"] is None
+    assert result["common"] == {"common_skills": ["Python"]}
+    assert result["missing"] == {"skills_to_learn": ["Go"]}
+    assert result["questions"] is None
@@ -0,0 +1,98 @@
+import time
+from langchain_core.language_models.fake import FakeListLLM
+from app import create_app
+from app.services.llm_factory import LLMFactory, LLMStats, LLMRouter, CircuitBreaker
+
+def test_clients_are_cached_per_backend():
+    app = create_app({'TESTING': True, 'OLLAMA_CHAT_MODEL': 'model-a', 'OLLAMA_TOOL_MODEL': 'model-a'})
+    LLMFactory.reset()
+    with app.app_context():
+        chat = LLMFactory.get_ollama_chat()
+        assert LLMFactory.get_ollama_chat() is chat
+        # Same model but a different base_url is a different backend
+        assert LLMFactory.get_ollama_tool() is not chat
+
+        app.config['OLLAMA_CHAT_MODEL'] = 'model-b'
+        assert LLMFactory.get_ollama_chat() is not chat
+    assert len(LLMFactory.stats()['clients']) == 3
+    LLMFactory.reset()
+
+def test_stats_record_calls_and_errors():
+    stats = LLMStats('fake', 'fake-model')
+    llm = FakeListLLM(responses=["ok"], callbacks=[stats])
+    assert llm.invoke("hello") == "ok"
+
+    snap = stats.snapshot()
+    assert snap['calls'] == 1
+    assert snap['errors'] == 0
+    assert snap['in_flight'] == 0
+    assert snap['last_latency'] is not None
+
+class ScriptedLLM:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay, self.fail, self.calls = delay, fail, 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return "ok"
+
+def test_breaker_opens_then_half_opens_for_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()          # the single half-open probe
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_router_falls_back_and_recovers_after_transient_failure():
+    gemini, ollama = ScriptedLLM(fail=True), ScriptedLLM()
+    router = LLMRouter([("gemini", lambda: gemini), ("ollama", lambda: ollama)],
+                       failure_threshold=1, reset_timeout=0.05)
+    assert router.invoke("hint", "q") == "ok"
+    assert router.stats()["gemini"]["state"] == "open"
+
+    # While open, Gemini is skipped entirely
+    router.invoke("hint", "q")
+    assert gemini.calls == 1
+
+    # After the reset timeout a probe succeeds and Gemini is used again
+    gemini.fail = False
+    time.sleep(0.06)
+    router.invoke("hint", "q")
+    assert gemini.calls == 2
+    assert router.stats()["gemini"]["state"] == "closed"
+
+def test_router_prefers_fastest_backend_and_times_out_slow_calls():
+    slow, fast = ScriptedLLM(delay=0.05), ScriptedLLM()
+    router = LLMRouter([("slow", lambda: slow), ("fast", lambda: fast)], timeout=1.0)
+    for _ in range(LLMRouter.MIN_SAMPLES):
+        router.invoke("code_eval", "q")
+    # Only "slow" has samples so far; "fast" is sampled next, then wins on p50
+    for _ in range(LLMRouter.MIN_SAMPLES + 2):
+        router.invoke("code_eval", "q")
+    assert fast.calls >= 2
+    assert router._ordered("code_eval")[0][0] == "fast"
+
+    hung = ScriptedLLM(delay=0.5)
+    router = LLMRouter([("hung", lambda: hung), ("fast", lambda: fast)], timeout=0.05)
+    assert router.invoke("code_eval", "q") == "ok"
+    assert router.stats()["hung"]["failures"] == 1
+    # The timeout counts as a latency sample for ranking
+    assert router._samples("code_eval", "hung")[0] >= 0.05
+
+def test_router_leaves_out_gemini_without_an_api_key():
+    LLMFactory.reset()
+    with create_app({'TESTING': True, 'GOOGLE_API_KEY': None}).app_context():
+        assert [name for name, _ in LLMFactory.get_router().backends] == ["ollama"]
+    LLMFactory.reset()
+    with create_app({'TESTING': True, 'GOOGLE_API_KEY': 'key'}).app_context():
+        assert [name for name, _ in LLMFactory.get_router().backends] == ["gemini", "ollama"]
+    LLMFactory.reset()
@@ -0,0 +1,69 @@
+import io
+import json
+import time
+import pytest
+from app import create_app
+from app.db import init_db, get_db
+from app.services.sentence_stream import iter_sentences
+
+def test_sentences_complete_across_chunk_boundaries():
+    chunks = ["Thanks for sha", "ring that. Can you", " explain how Flask hand", "les routing? Take your time"]
+    assert list(iter_sentences(chunks)) == [
+        "Thanks for sharing that.",
+        "Can you explain how Flask handles routing?",
+        "Take your time",
+    ]
+
+def test_no_split_on_decimals_abbreviations_or_short_fragments():
+    chunks = ["Great. Python 3", ".11 added faster tracebacks, e.g. in asyncio. ", "Why?"]
+    assert list(iter_sentences(chunks)) == [
+        "Great. Python 3.11 added faster tracebacks, e.g. in asyncio.",
+        "Why?",
+    ]
+
+class StreamingLLM:
+    def stream(self, messages):
+        yield from ["Good answer. ", "Now, what is a ", "Python decorator? Explain briefly."]
+
+class FakeTranscriber:
+    def transcribe(self, samples):
+        return "I like Python", {"queue_wait": 0.0, "decode": 0.0}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test'})
+    monkeypatch.setattr('app.routes.interview.decode_upload', lambda stream, limit: [0.0] * 16000)
+    monkeypatch.setattr('app.routes.interview.get_transcriber', lambda config: FakeTranscriber())
+    monkeypatch.setattr('app.routes.interview.LLMFactory.get_ollama_chat', staticmethod(lambda: StreamingLLM()))
+    with app.app_context():
+        init_db()
+        get_db().execute("INSERT INTO chats (id, username) VALUES ('c1', 'tester')")
+        get_db().commit()
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['chat_id'] = 'c1'
+            yield client
+
+def test_interact_streams_reply_sentence_by_sentence(client, monkeypatch):
+    spoken = []
+    monkeypatch.setattr('app.routes.interview._speak', lambda token, sid, text: spoken.append(text))
+    with client.session_transaction() as sess:
+        sess['session_token'], sess['session_id'] = 'tok', 'sid'
+
+    r = client.post('/interact', data={'audio': (io.BytesIO(b'x'), 'audio.webm'), 'stream': '1'})
+    events = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+
+    assert r.mimetype == 'application/x-ndjson'
+    assert [e['type'] for e in events] == ['user_text', 'sentence', 'sentence', 'sentence', 'done']
+    assert events[1]['text'] == "Good answer."
+    assert events[-1]['gemini_text'] == "Good answer. Now, what is a Python decorator? Explain briefly."
+
+    # Each sentence went to the avatar, in order
+    deadline = time.time() + 5
+    while len(spoken) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert spoken == [e['text'] for e in events if e['type'] == 'sentence']
+
+    rows = get_db().execute("SELECT role, message FROM messages WHERE chat_id = 'c1' ORDER BY id").fetchall()
+    assert [r['role'] for r in rows] == ['user', 'ai']
+    assert rows[1]['message'] == events[-1]['gemini_text']
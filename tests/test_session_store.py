@@ -0,0 +1,108 @@
+import pytest
+from flask import session
+from app import create_app
+from app.db import init_db, get_db
+from app.services.session_store import load_analysis_context, save_analysis_context
+
+QUESTIONS = [f"Tell me about distributed systems topic number {i}." for i in range(40)]
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test'})
+
+    @app.route('/_save_analysis')
+    def _save_analysis():
+        save_analysis_context({'resume_skills': 'Python', 'questions': QUESTIONS})
+        return "ok"
+
+    @app.route('/_load_analysis')
+    def _load_analysis():
+        return {"analysis": load_analysis_context(), "user": session.get('username')}
+
+    with app.app_context():
+        init_db()
+        yield app
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['username'] = 'tester'
+        yield client
+
+def session_cookie(client):
+    return client.get_cookie('session').value
+
+def test_cookie_only_carries_the_session_id(client):
+    sid = session_cookie(client)
+    row = get_db().execute("SELECT data FROM server_sessions WHERE id = ?", (sid,)).fetchone()
+    assert 'tester' in row['data']
+    assert 'tester' not in sid and len(sid) < 64
+
+def test_analysis_context_is_stored_apart_and_loaded_on_demand(client):
+    client.get('/_save_analysis')
+    assert len(session_cookie(client)) < 64
+
+    body = client.get('/_load_analysis').get_json()
+    assert body["analysis"]["questions"] == QUESTIONS
+    assert body["user"] == 'tester'
+    with client.session_transaction() as sess:
+        assert 'questions' not in sess
+
+def test_read_only_requests_do_not_write_the_session(client):
+    sid = session_cookie(client)
+    before = get_db().execute("SELECT expires_at FROM server_sessions WHERE id = ?", (sid,)).fetchone()[0]
+    client.get('/')
+    client.get('/_load_analysis')
+    after = get_db().execute("SELECT expires_at FROM server_sessions WHERE id = ?", (sid,)).fetchone()[0]
+    assert after == before
+
+def test_logout_deletes_the_stored_session(client):
+    sid = session_cookie(client)
+    client.get('/logout')
+    assert get_db().execute("SELECT 1 FROM server_sessions WHERE id = ?", (sid,)).fetchone() is None
+    assert client.get_cookie('session') is None
+
+def test_unknown_session_ids_start_a_fresh_session(app):
+    with app.test_client() as client:
+        client.set_cookie('session', 'forged-id')
+        with client.session_transaction() as sess:
+            assert 'user_id' not in sess
+            sess['username'] = 'someone'
+        assert session_cookie(client) != 'forged-id'
+
+def test_cookie_backend_keeps_analysis_in_the_session(tmp_path):
+    app = create_app({'TESTING': True, 'DATABASE_URI': str(tmp_path / "test.db"), 'SECRET_KEY': 'test',
+                      'SESSION_BACKEND': 'cookie'})
+    with app.test_request_context('/'):
+        save_analysis_context({'questions': ['Q1']})
+        assert session['analysis_context'] == {'questions': ['Q1']}
+
+def test_login_issues_a_new_session_id(app):
+    get_db().execute("INSERT INTO users (username, password) VALUES ('tester', 'pw')")
+    get_db().commit()
+    with app.test_client() as client:
+        client.get('/_load_analysis')
+        with client.session_transaction() as sess:
+            sess['theme'] = 'dark'
+        planted = session_cookie(client)
+
+        client.post('/login', data={'username': 'tester', 'password': 'pw'})
+        sid = session_cookie(client)
+        assert sid != planted
+        assert get_db().execute("SELECT 1 FROM server_sessions WHERE id = ?", (planted,)).fetchone() is None
+        with client.session_transaction() as sess:
+            assert sess['username'] == 'tester' and sess['theme'] == 'dark'
+
+def test_failed_login_does_not_store_the_password(app):
+    with app.test_client() as client:
+        client.post('/login', data={'username': 'nobody', 'password': 'hunter2'})
+        row = get_db().execute("SELECT data FROM server_sessions WHERE id = ?", (session_cookie(client),)).fetchone()
+        assert 'nobody' in row['data'] and 'hunter2' not in row['data']
+
+def test_analysis_of_an_unsaved_session_leaves_no_row(app):
+    with app.test_client() as client:
+        client.get('/_save_analysis')
+        assert client.get_cookie('session') is None
+    assert get_db().execute("SELECT COUNT(*) FROM server_sessions").fetchone()[0] == 0
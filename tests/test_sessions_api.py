@@ -1,3 +1,4 @@
+import time
 import pytest
 from app import create_app
 from app.db import init_db, get_db
@@ -14,7 +15,7 @@ def app(tmp_path, monkeypatch):
         'DATABASE_URI': str(db_path),
         'SECRET_KEY': 'test'
     })
-    monkeypatch.setattr('app.routes.api.LLMFactory.get_ollama_chat', staticmethod(lambda: DummyLLM()))
+    monkeypatch.setattr('app.services.session_analysis.LLMFactory.get_ollama_chat', staticmethod(lambda: DummyLLM()))
     with app.app_context():
         init_db()
         yield app
@@ -48,4 +49,156 @@ def test_start_submit_and_dashboard(client, app):
     data = r3.get_json()
     codes = [e for e in data['evaluation_scores'] if e['score_type']=='code' and e['chat_id']==chat_id]
     assert len(codes) == 1
-    assert abs(float(codes[0]['score_value']) - 8.5) < 1e-6
\ No newline at end of file
+    assert abs(float(codes[0]['score_value']) - 8.5) < 1e-6
+
+def test_session_analysis_is_persisted_until_new_messages(client, app, monkeypatch):
+    calls = []
+    class CountingLLM(DummyLLM):
+        def invoke(self, *args, **kwargs):
+            calls.append(1)
+            return super().invoke(*args, **kwargs)
+    monkeypatch.setattr('app.services.session_analysis.LLMFactory.get_ollama_chat', staticmethod(lambda: CountingLLM()))
+
+    with app.app_context():
+        db = get_db()
+        for role, msg in [('ai', 'Hi'), ('user', 'Hello'), ('ai', 'Tell me about Flask')]:
+            db.execute("INSERT INTO messages (chat_id, role, message) VALUES (?,?,?)", ('c1', role, msg))
+        db.commit()
+
+    first = client.get('/get_session_details/c1').get_json()
+    assert first['analysis_status'] in ('queued', 'running', 'done')
+    _wait_for_analysis(client, 'c1')
+    second = client.get('/get_session_details/c1').get_json()
+    third = client.get('/analytics/c1')
+    assert third.status_code == 200
+    assert len(calls) == 1
+    assert second['analysis'] == third.get_json()['analysis']
+    assert second['evaluation_scores']['technical'] == 8.0
+
+    # A new message invalidates the stored analysis
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO messages (chat_id, role, message) VALUES (?,?,?)", ('c1', 'user', 'It is a web framework'))
+        db.commit()
+    stale = client.get('/get_session_details/c1').get_json()
+    assert second['scores_stale'] is False
+    assert stale['scores_stale'] is True
+    _wait_for_analysis(client, 'c1')
+    fresh = client.get('/get_session_details/c1').get_json()
+    assert len(calls) == 2
+    assert fresh['scores_stale'] is False
+    assert client.get('/analytics/c1').status_code == 200
+
+def test_new_messages_replace_the_stored_scores(client, app, monkeypatch):
+    replies = iter(["technical: 4\nemotional: 6", "technical: 9\nemotional: 8"])
+    class ScriptedLLM:
+        def invoke(self, *args, **kwargs):
+            return next(replies)
+    monkeypatch.setattr('app.services.session_analysis.LLMFactory.get_ollama_chat', staticmethod(lambda: ScriptedLLM()))
+
+    def add_message(msg):
+        with app.app_context():
+            db = get_db()
+            db.execute("INSERT INTO messages (chat_id, role, message) VALUES (?,?,?)", ('c5', 'user', msg))
+            db.commit()
+
+    for msg in ('Hi', 'Hello', 'Flask'):
+        add_message(msg)
+    client.get('/analytics/c5')
+    _wait_for_analysis(client, 'c5')
+    assert client.get('/get_session_details/c5').get_json()['evaluation_scores']['technical'] == 4.0
+
+    add_message('It is a web framework')
+    pending = client.get('/get_session_details/c5').get_json()
+    assert pending['scores_stale'] is True
+    _wait_for_analysis(client, 'c5')
+    details = client.get('/get_session_details/c5').get_json()
+    assert details['scores_stale'] is False
+    assert details['evaluation_scores']['technical'] == 9.0
+    assert details['evaluation_scores']['emotional'] == 8.0
+
+def test_session_data_uses_counters_and_keyset_pagination(client, app):
+    with app.app_context():
+        db = get_db()
+        for i in range(5):
+            db.execute("INSERT INTO chats (id, username, started_at) VALUES (?, 'tester', ?)",
+                       (f"chat{i}", f"2024-01-0{i + 1} 10:00:00"))
+        for _ in range(3):
+            db.execute("INSERT INTO messages (chat_id, role, message) VALUES ('chat4', 'user', 'hi')")
+        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES ('chat4', 'tester', 'technical', 6)")
+        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES ('chat4', 'tester', 'technical', 8)")
+        db.execute("INSERT INTO evaluation_scores (chat_id, username, score_type, score_value) VALUES ('chat3', 'tester', 'technical', 4)")
+        db.commit()
+    with client.session_transaction() as sess:
+        sess['username'] = 'tester'
+
+    page = client.get('/get_session_data?limit=2').get_json()
+    assert [s['chat_id'] for s in page['sessions']] == ['chat4', 'chat3']
+    assert page['sessions'][0]['message_count'] == 3
+    assert page['sessions'][0]['scores']['technical'] == 8  # latest score wins
+    assert page['score_averages']['technical'] == 6.0
+    assert page['next_before']
+
+    seen = [s['chat_id'] for s in page['sessions']]
+    while page['next_before']:
+        page = client.get('/get_session_data', query_string={'limit': 2, 'before': page['next_before']}).get_json()
+        seen += [s['chat_id'] for s in page['sessions']]
+    assert seen == ['chat4', 'chat3', 'chat2', 'chat1', 'chat0']
+
+def test_concurrent_analysis_requests_share_one_job(app, monkeypatch):
+    from app.services.analysis_jobs import AnalysisJobQueue
+    queue = AnalysisJobQueue(app)
+    monkeypatch.setattr(queue, 'start', lambda: None)  # keep the job queued
+
+    db = get_db()
+    first = queue.enqueue(db, 'c2', 'tester')
+    second = queue.enqueue(db, 'c2', 'tester')
+    assert first['id'] == second['id']
+    assert first['status'] == 'queued'
+
+    # Once claimed and finished, a new request gets a fresh job
+    job = queue._claim(db)
+    assert job['id'] == first['id']
+    assert queue._claim(db) is None
+    queue._finish(db, job['id'], 'done')
+    assert queue.enqueue(db, 'c2', 'tester')['id'] != first['id']
+
+def test_status_polling_requeues_a_stale_analysis(client, app, monkeypatch):
+    from app.services.analysis_jobs import AnalysisJobQueue
+    monkeypatch.setattr(AnalysisJobQueue, 'start', lambda self: None)  # keep jobs queued
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO messages (chat_id, role, message) VALUES ('c6', 'user', 'hi')")
+        db.execute("INSERT INTO analysis_jobs (chat_id, status) VALUES ('c6', 'done')")
+        db.commit()
+
+    assert client.get('/analysis_status/c6').get_json()['status'] == 'queued'
+    assert client.get('/analysis_status/unknown').get_json()['status'] == 'none'
+
+def test_claim_skips_a_job_finished_after_it_was_selected(app):
+    from app.services.analysis_jobs import AnalysisJobQueue
+    db = get_db()
+    db.execute("INSERT INTO analysis_jobs (chat_id, status, started_at) VALUES ('c7', 'running', datetime('now', '-1 hour'))")
+    db.commit()
+
+    class FinishingDB:
+        """Lets another worker finish the job between the SELECT and the claiming UPDATE."""
+        def execute(self, sql, params=()):
+            if sql.lstrip().startswith('UPDATE'):
+                db.execute("UPDATE analysis_jobs SET status = 'done' WHERE chat_id = 'c7'")
+            return db.execute(sql, params)
+        def commit(self):
+            db.commit()
+
+    assert AnalysisJobQueue(app, stale_after=60)._claim(FinishingDB()) is None
+    assert AnalysisJobQueue.latest_job(db, 'c7')['status'] == 'done'
+
+def _wait_for_analysis(client, chat_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f'/analysis_status/{chat_id}').get_json()['status']
+        if status == 'done':
+            return
+        assert status != 'failed'
+        time.sleep(0.05)
+    raise AssertionError("analysis did not finish")
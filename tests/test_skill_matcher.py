@@ -0,0 +1,41 @@
+from app.services.skill_matcher import match_skills, normalize, parse_skills
+
+def test_aliases_and_filler_words_normalize():
+    assert normalize("Node.js") == normalize("node") == "nodejs"
+    assert normalize("K8s") == "kubernetes"
+    assert normalize("Proficiency in Python programming") == "python"
+    assert normalize("Python 3.10") == "python"
+
+def test_aliases_match_skills_whose_names_contain_filler_words():
+    assert normalize("NLP") == normalize("Natural Language Processing") == "natural language processing"
+    assert normalize("OOP") == normalize("Object-Oriented Programming") == "object-oriented programming"
+    assert normalize("LLMs") == normalize("Large Language Models") == "large language models"
+    assert normalize("Object Oriented Programming skills") == "object-oriented programming"
+    common, missing, _ = match_skills("NLP, OOP, LLMs", "Natural Language Processing, Object-Oriented Programming, Large Language Models")
+    assert missing == []
+    assert len(common) == 3
+
+def test_parse_skills_handles_bullets_and_duplicates():
+    assert parse_skills("Skills: Python, Flask\n- SQL\n- python") == ["Python", "Flask", "SQL"]
+
+def test_match_skills_splits_common_missing_and_ambiguous():
+    common, missing, ambiguous = match_skills(
+        "Python, ReactJS, ML, Postgres, Docker",
+        "Python 3, React, Machine Learning, PostgreSQL, Kubernetes, Deep Learning",
+    )
+    assert common == ["Python 3", "React", "Machine Learning", "PostgreSQL"]
+    assert missing == ["Kubernetes"]
+    assert ambiguous == [("Deep Learning", "ML")]
+
+def test_single_llm_call_settles_ambiguous_skills():
+    from app.services.jd_analyzer import JDAnalyzer
+    calls = []
+    analyzer = JDAnalyzer.__new__(JDAnalyzer)
+    analyzer._invoke_chain = lambda template, variables: calls.append(variables) or \
+        '{"confirmed_matches": ["Deep Learning"], "questions": ["q1", "q2"]}'
+
+    common, missing, questions = analyzer.compare_and_generate_questions("Python, ML", "Python, Deep Learning, Go")
+    assert len(calls) == 1
+    assert common == {"common_skills": ["Python", "Deep Learning"]}
+    assert missing == {"skills_to_learn": ["Go"]}
+    assert questions == {"questions": ["q1", "q2"]}
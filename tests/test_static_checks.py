@@ -0,0 +1,29 @@
+from app.services.static_checks import static_check
+
+def test_viable_code_passes():
+    assert static_check("def f(x):\n    return x * 2\n", "python") is None
+    assert static_check("int main() { char c = '}'; /* { */ return 0; } // }", "cpp") is None
+    # Unknown languages are left to the model
+    assert static_check("puts 'hi'", "ruby") is None
+
+def test_python_problems_are_classified():
+    assert static_check("   \n", "python")[0] == "empty"
+    assert static_check("# todo\n", "python")[0] == "empty"
+    assert static_check("return 1\n", "python")[0] == "syntax_error"
+    assert static_check("def f():\n    '''doc'''\n    raise NotImplementedError()\n", "python")[0] == "stub"
+    assert static_check("class Solution:\n    def f(self):\n        ...\n", "python")[0] == "stub"
+
+def test_bracket_languages():
+    kind, message = static_check("public class A {\n  void f() {\n}\n", "java")
+    assert kind == "syntax_error" and "line 1" in message
+    assert static_check('let s = "unterminated;\n', "javascript")[0] == "syntax_error"
+
+def test_language_specific_literals_are_skipped():
+    assert static_check('const re = /[{"]/g;\nfunction f(s) { return s.replace(/\\//, "") }', "javascript") is None
+    assert static_check("const half = (a + b) / 2 / 1; const r = x.match(/[)]+/);", "typescript") is None
+    assert static_check('fun f() {\n  val s = """\n  {"a": "("\n  """\n}', "kotlin") is None
+    assert static_check('let s = """\n  quote: " and ] here\n  """\nfunc f() { }', "swift") is None
+    assert static_check('class A { string p = @"C:\\path\\"; string q = @"say ""}"" now"; }', "c#") is None
+    # Still caught inside those languages
+    assert static_check('fun f() {\n  val s = """ never closed\n}', "kotlin")[0] == "syntax_error"
+    assert static_check('class A { void f() { var p = @"C:\\"; }', "csharp")[0] == "syntax_error"
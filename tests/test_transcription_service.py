@@ -0,0 +1,64 @@
+import io
+import wave
+import threading
+import numpy as np
+from app.services.transcription_service import TranscriptionService, decode_upload, SAMPLE_RATE
+
+def _wav_bytes(seconds=0.5, rate=8000):
+    t = np.linspace(0, seconds, int(rate * seconds), endpoint=False)
+    pcm = (np.sin(2 * np.pi * 440 * t) * 10000).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+class FakeSegment:
+    def __init__(self, text):
+        self.text = text
+
+class FakeWhisper:
+    def transcribe(self, audio, **kwargs):
+        return iter([FakeSegment("hello"), FakeSegment("world")]), None
+
+def test_pool_reuses_models_and_records_timings(monkeypatch):
+    loads = []
+    svc = TranscriptionService(pool_size=2, cpu_threads=1)
+    monkeypatch.setattr(svc, '_load_model', lambda: loads.append(1) or FakeWhisper())
+
+    text, timings = svc.transcribe("ignored.wav")
+    assert text == "hello world"
+    assert set(timings) == {"queue_wait", "decode"}
+
+    # Sequential calls borrow the same warm model instead of loading a new one
+    svc.transcribe("ignored.wav")
+    assert len(loads) == 1
+    stats = svc.stats()
+    assert stats["requests"] == 2
+    assert stats["loaded"] == 1
+
+def test_pool_never_exceeds_size(monkeypatch):
+    svc = TranscriptionService(pool_size=2, cpu_threads=1)
+    monkeypatch.setattr(svc, '_load_model', lambda: FakeWhisper())
+
+    threads = [threading.Thread(target=svc.transcribe, args=("x.wav",)) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert svc.stats()["loaded"] <= 2
+    assert svc.stats()["requests"] == 8
+
+def test_decode_upload_resamples_in_memory():
+    samples = decode_upload(io.BytesIO(_wav_bytes(seconds=0.5, rate=8000)))
+    assert samples.dtype == np.float32
+    # 8 kHz input comes back at Whisper's 16 kHz
+    assert abs(len(samples) - SAMPLE_RATE // 2) < 200
+
+def test_decode_upload_spills_large_uploads():
+    # A tiny threshold forces the spooled file onto disk; the result is identical
+    data = _wav_bytes()
+    small = decode_upload(io.BytesIO(data), max_in_memory_bytes=16)
+    big = decode_upload(io.BytesIO(data))
+    assert np.array_equal(small, big)